@@ -0,0 +1,194 @@
+"""
+Benchmarks for k-means, the Davies-Bouldin-Index and the distance and centroid functions.
+
+Times every function on synthetic Gaussian blobs for several combinations of the number of points n,
+dimensions d and clusters k, recording the best wall time of a few repeats and the peak memory allocated.
+
+Usage, from the repository root:
+    PYTHONPATH=. python benchmarks/benchmark.py --preset small --output results.json
+    PYTHONPATH=. python benchmarks/benchmark.py --preset small --compare results.json
+
+With --compare, every result that is slower or needs more memory than the stored baseline by more than the
+threshold is reported as regression, and the exit code is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from thb_dmc.davies_bouldin_index import davies_bouldin_index, labelled_davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer, assign_labels, assign_points_to_clusters, kmeans
+from thb_dmc.metrics import pairwise_distances
+from thb_dmc.vector_util import euclidean_distance, block_distance, simple_centroid
+
+# (n, d, k) combinations per preset
+PRESETS = {
+    "small": [(1000, 2, 2), (1000, 16, 10), (10000, 2, 10), (10000, 32, 50)],
+    "medium": [(100000, 2, 10), (100000, 32, 100), (1000000, 8, 10), (100000, 128, 200), (10000, 512, 1000)],
+    "large": [(1000000, 32, 100), (1000000, 128, 1000), (10000000, 2, 10), (10000000, 16, 100),
+              (1000000, 512, 200)],
+}
+
+# The tuple based functions are not run above these numbers of points, they would only measure Python overhead
+TUPLE_API_MAX_POINTS = 100000
+SCALAR_CALLS = 100000
+KMEANS_ITERATIONS = 5
+
+
+def make_blobs(num_points: int, num_dimensions: int, num_clusters: int, seed: int = 0):
+    """
+    :return: (n, d) matrix of points drawn from k Gaussian blobs and the blob of every point
+    """
+    rng = numpy.random.default_rng(seed)
+    centers = rng.uniform(-10.0, 10.0, size=(num_clusters, num_dimensions))
+    labels = rng.integers(num_clusters, size=num_points)
+    points = rng.standard_normal((num_points, num_dimensions))
+    points += centers[labels]
+    return points, labels
+
+
+def measure(function, repeat: int) -> dict:
+    """
+    Runs the function repeat times without tracing the allocations, which would slow down allocation heavy
+    Python code far more than numpy code, and once more while tracing them.
+
+    :return: Best wall time in seconds of the untraced runs and the peak of memory allocated during the traced
+                        run in bytes
+    """
+    best_seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best_seconds, "peak_bytes": peak_bytes}
+
+
+def cases(num_points: int, num_dimensions: int, num_clusters: int, seed: int):
+    """
+    :return: Generator of (name, function) pairs to measure for one combination of n, d and k
+    """
+    points, labels = make_blobs(num_points, num_dimensions, num_clusters, seed)
+    centroids = points[:num_clusters].copy()
+    start = tuple(("c{}".format(i), tuple(centroid)) for i, centroid in enumerate(centroids.tolist()))
+
+    yield "assign_labels", lambda: assign_labels(points, centroids)
+    yield "assign_labels_block", lambda: assign_labels(points, centroids, block_distance)
+    yield "assign_labels_kd_tree", lambda: assign_labels(points, centroids, centroid_index="kd_tree")
+    yield "kmeans_iterations", lambda: _iterate(ArrayKmeanClusterer(points, start), KMEANS_ITERATIONS)
+    yield "kmeans_iterations_accelerated", lambda: _iterate(ArrayKmeanClusterer(points, start, accelerated=True),
+                                                            KMEANS_ITERATIONS)
+    single_points = points.astype(numpy.float32)
+    yield "kmeans_iterations_float32", lambda: _iterate(ArrayKmeanClusterer(single_points, start), KMEANS_ITERATIONS)
+    yield "labelled_davies_bouldin_index", lambda: labelled_davies_bouldin_index(points, labels)
+    yield "pairwise_distances", lambda: pairwise_distances(points[:min(num_points, 10000)], centroids)
+
+    if num_points <= TUPLE_API_MAX_POINTS:
+        point_tuples = [tuple(point) for point in points.tolist()]
+        clusters = [[point for point, label in zip(point_tuples, labels.tolist()) if label == j]
+                    for j in range(num_clusters)]
+        clusters = [cluster for cluster in clusters if cluster]
+        yield "assign_points_to_clusters", lambda: assign_points_to_clusters(point_tuples, start)
+        yield "kmeans", lambda: kmeans(point_tuples, start)
+        yield "davies_bouldin_index", lambda: davies_bouldin_index(clusters)
+        yield "simple_centroid", lambda: simple_centroid(point_tuples)
+
+    pairs = [(tuple(a), tuple(b)) for a, b in zip(points[:SCALAR_CALLS:2].tolist(), points[1:SCALAR_CALLS:2].tolist())]
+    yield "euclidean_distance", lambda: [euclidean_distance(a, b) for a, b in pairs]
+    yield "block_distance", lambda: [block_distance(a, b) for a, b in pairs]
+
+
+def _iterate(clusterer, iterations: int):
+    for _ in range(iterations):
+        try:
+            next(clusterer)
+        except StopIteration:
+            break
+
+
+def run(preset: str, repeat: int, seed: int) -> dict:
+    results = []
+    for num_points, num_dimensions, num_clusters in PRESETS[preset]:
+        for name, function in cases(num_points, num_dimensions, num_clusters, seed):
+            result = {"name": name, "n": num_points, "d": num_dimensions, "k": num_clusters}
+            result.update(measure(function, repeat))
+            results.append(result)
+            print("{name:32} n={n:<9} d={d:<4} k={k:<5} {seconds:10.4f}s {peak_bytes:>14,}B".format(**result),
+                  file=sys.stderr)
+    return {
+        "meta": {
+            "preset": preset,
+            "repeat": repeat,
+            "seed": seed,
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_seconds: float = 0.0) -> list:
+    """
+    :param min_seconds: Time differences up to this many seconds are considered noise and never a regression
+    :return: Descriptions of all results that are worse than the matching baseline result by more than the threshold
+    """
+    key = lambda result: (result["name"], result["n"], result["d"], result["k"])
+    baseline_results = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        reference = baseline_results.get(key(result))
+        if reference is None:
+            continue
+        for measure_name, tolerance in (("seconds", min_seconds), ("peak_bytes", 0)):
+            if result[measure_name] > max(reference[measure_name] * (1.0 + threshold),
+                                          reference[measure_name] + tolerance):
+                regressions.append("{} n={} d={} k={}: {} {:.4g} -> {:.4g}".format(
+                    result["name"], result["n"], result["d"], result["k"], measure_name,
+                    reference[measure_name], result[measure_name]))
+    return regressions
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best time is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to write the results to as JSON, stdout by default")
+    parser.add_argument("--compare", help="JSON file of earlier results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown or memory growth that counts as regression")
+    parser.add_argument("--min-seconds", type=float, default=0.01,
+                        help="slowdowns up to this many seconds are ignored as noise")
+    arguments = parser.parse_args(arguments)
+
+    results = run(arguments.preset, arguments.repeat, arguments.seed)
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(results, output, indent=2)
+    elif not arguments.compare:
+        json.dump(results, sys.stdout, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), arguments.threshold,
+                                  arguments.min_seconds)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        print("{} regressions".format(len(regressions)))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
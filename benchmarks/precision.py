@@ -0,0 +1,89 @@
+"""
+Benchmark of k-means on points stored as float32 against float64.
+
+Clusters every dataset from the same k-means++ seeding once with float64 and once with float32 points, and reports
+the best wall time of final_result, the peak memory allocated during it, the memory of the points and the number of
+labels that differ from the float64 ones. The datasets are the ones in data/ plus synthetic Gaussian blobs.
+
+Usage, from the repository root:
+    PYTHONPATH=. python benchmarks/precision.py
+    PYTHONPATH=. python benchmarks/precision.py --preset medium --accelerated
+
+The exit code is 1 if the labels of a dataset in data/ differ.
+"""
+import argparse
+import os
+import sys
+
+import numpy
+
+from benchmark import PRESETS, make_blobs, measure
+from thb_dmc.csv_reader import read_csv
+from thb_dmc.kmeans import ArrayKmeanClusterer
+from thb_dmc.seeding import kmeans_plus_plus
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+# File, read_csv arguments and k per dataset in data/
+DATASETS = [
+    ("two.csv", {"delimiter": " "}, 3),
+    ("zoo_numeric.csv", {"delimiter": " ", "columns": list(range(17))}, 7),
+]
+
+
+def datasets(preset: str, seed: int):
+    """
+    :return: Generator of (name, float64 points, k, whether the labels have to be identical)
+    """
+    for file_name, arguments, num_clusters in DATASETS:
+        yield file_name, read_csv(os.path.join(DATA, file_name), **arguments).values, num_clusters, True
+    for num_points, num_dimensions, num_clusters in PRESETS[preset]:
+        points, _ = make_blobs(num_points, num_dimensions, num_clusters, seed)
+        yield "blobs n={} d={}".format(num_points, num_dimensions), points, num_clusters, False
+
+
+def compare(points: numpy.ndarray, num_clusters: int, accelerated: bool, repeat: int, seed: int) -> dict:
+    """
+    :return: Measurements of the float64 and the float32 clustering and the number of differing labels
+    """
+    start = kmeans_plus_plus(points, num_clusters, random_state=seed)
+    result = {}
+    labels = {}
+    for dtype in (numpy.float64, numpy.float32):
+        # Stored in the type up front, like a dataset written with that dtype
+        typed_points = points.astype(dtype)
+        clusterer = ArrayKmeanClusterer(typed_points, start, accelerated=accelerated)
+        labels[dtype] = clusterer.final_result()
+        measurement = measure(lambda: ArrayKmeanClusterer(typed_points, start, accelerated=accelerated).final_result(),
+                              repeat)
+        measurement["points_bytes"] = typed_points.nbytes
+        measurement["iterations"] = clusterer.iteration
+        result[numpy.dtype(dtype).name] = measurement
+    result["differing_labels"] = int(numpy.count_nonzero(labels[numpy.float64] != labels[numpy.float32]))
+    return result
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best time is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--accelerated", action="store_true", help="use the accelerated assignment")
+    arguments = parser.parse_args(arguments)
+
+    print("{:28} {:>4} {:>10} {:>10} {:>8} {:>14} {:>14} {:>9} {:>9}".format(
+        "dataset", "k", "f64 s", "f32 s", "speedup", "f64 peak B", "f32 peak B", "points", "differing"))
+    failed = False
+    for name, points, num_clusters, identical in datasets(arguments.preset, arguments.seed):
+        result = compare(points, num_clusters, arguments.accelerated, arguments.repeat, arguments.seed)
+        double, single = result["float64"], result["float32"]
+        print("{:28} {:>4} {:>10.4f} {:>10.4f} {:>7.2f}x {:>14,} {:>14,} {:>8.2f}x {:>9}".format(
+            name, num_clusters, double["seconds"], single["seconds"], double["seconds"] / single["seconds"],
+            double["peak_bytes"], single["peak_bytes"], double["points_bytes"] / single["points_bytes"],
+            result["differing_labels"]))
+        failed = failed or (identical and result["differing_labels"] > 0)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,21 @@
-from thb_dmc.kmeans import KmeanClusterer
-from thb_dmc.davies_bouldin_index import davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer
+from thb_dmc.davies_bouldin_index import DaviesBouldinTracker
+
+
+def print_clusterings(meaner):
+    # The tracker only revisits the clusters that changed since the previous step
+    tracker = DaviesBouldinTracker(meaner.points, len(meaner.names), q=1)
+    for labels in meaner:
+        dbi = tracker.update(labels)
+        print("Clustering: {}\nDBI: {}".format(labels.tolist(), dbi))
+
 
 if __name__ == '__main__':
     POINTS = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
     INITIAL_CENTERS = (('c1', (3, 2),), ('c2', (6, 2)))
 
-    MEANER = KmeanClusterer(POINTS)
-
-    for clustering in MEANER:
-        clusters = clustering.values()
-        dbi = davies_bouldin_index(clusters)
-        print("Clustering: {}\nDBI: {}".format(clustering, dbi))
-
-    MEANER = KmeanClusterer(POINTS, INITIAL_CENTERS)
+    MEANER = ArrayKmeanClusterer(POINTS)
+    print_clusterings(MEANER)
 
-    for clustering in MEANER:
-        clusters = clustering.values()
-        dbi = davies_bouldin_index(clusters)
-        print("Clustering: {}\nDBI: {}".format(clustering, dbi))
+    MEANER = ArrayKmeanClusterer(POINTS, INITIAL_CENTERS)
+    print_clusterings(MEANER)
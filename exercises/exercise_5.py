@@ -5,9 +5,11 @@ from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 import math
 
+from thb_dmc.csv_reader import read_csv
+
 
 def main():
-    two = np.genfromtxt('data/two.csv')
+    two = read_csv('data/two.csv', delimiter=" ").values
     two = StandardScaler().fit_transform(two)
     pca = PCA()
     pca.fit(two)
@@ -18,8 +20,6 @@ def main():
         "Q1a)\nVariance weights:\nÂ1: {}\nÂ2: {}".format(pca.explained_variance_ratio_[0],
                                                          pca.explained_variance_ratio_[1]))
 
-    two = pca.transform(two)
-
     pcaed = pca.transform(two)
 
     pcaed_corr = np.corrcoef(pcaed.transpose())
@@ -40,11 +40,11 @@ def main():
 
     print("Q2a)\nBinäre werden zu 0 und 1")
 
-    zoo = np.genfromtxt("data/zoo_german.csv", delimiter=",",
-                        skip_header=1,
-                        usecols=list(range(1, 13)) + list(range(15, 18)),
-                        dtype=bool,
-                        encoding="iso-8859-1")
+    zoo = read_csv("data/zoo_german.csv", delimiter=",",
+                   skip_rows=1,
+                   columns=list(range(1, 13)) + list(range(15, 17)),
+                   dtype=bool,
+                   encoding="iso-8859-1").values
 
     print("Q2b)\nLädt csv mit utf8 statt iso88591 mit Komma Deleimiter, "
           "nutz nur zeilen 1-12,15-16, skipt header zeile und setzt datentypen zu boolean")
@@ -59,15 +59,7 @@ def main():
 
     print("Q2c)\nOg shape: {}\nSelectedShape: {}".format(zoo.shape, selected.shape))
 
-    holes = np.genfromtxt('data/two_missing.csv', delimiter=",")
-
-    averages = np.nanmean(holes, axis=0)
-
-    fixed = np.copy(holes)
-    for i in range(0, holes.shape[0]):
-        for j in range(0, holes.shape[1]):
-            if math.isnan(holes[i,j]):
-                fixed[i,j] = averages[j]
+    fixed = read_csv('data/two_missing.csv', delimiter=",", impute="mean").values
 
     fixed_corr = np.corrcoef(fixed.transpose())
 
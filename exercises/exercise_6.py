@@ -1,19 +1,18 @@
-import numpy as np
 from sklearn import svm
 from sklearn.model_selection import cross_val_score
 from sklearn.metrics import confusion_matrix, classification_report
 from csv import reader
 
+from thb_dmc.csv_reader import read_csv
+
 
 def main():
-    zoo_int = np.genfromtxt("data/zoo_numeric.csv", delimiter=" ",
-                            dtype=int,
-                            usecols=list(range(0, 17)),
-                            encoding="iso-8859-1")
-    zoo_int_labels = np.genfromtxt("data/zoo_numeric.csv", delimiter=" ",
-                                   dtype=int,
-                                   usecols=[17],
-                                   encoding="iso-8859-1")
+    zoo_int, zoo_int_labels = read_csv("data/zoo_numeric.csv", delimiter=" ",
+                                       columns=list(range(0, 17)),
+                                       label_column=17,
+                                       dtype=int,
+                                       label_dtype=int,
+                                       encoding="iso-8859-1")
     clf = svm.SVC(kernel="linear")
     clf.fit(zoo_int, zoo_int_labels)
 
@@ -34,7 +33,7 @@ def main():
 
     my_test_predicted = my_clf.predict(my_test)
 
-    mapping = whatever()
+    mapping = whatever(zoo_int_labels)
     names = [0] * len(mapping)
     for key in mapping:
         names[key] = mapping[key]
@@ -44,7 +43,7 @@ def main():
     pass
 
 
-def whatever():
+def whatever(zoo_int):
     names = []
     with open("data/zoo_german.csv", "r", encoding="iso-8859-1") as zf:
         csv_reader = reader(zf, delimiter=",")
@@ -56,10 +55,6 @@ def whatever():
             else:
                 names.append(row[len(row) - 1])
                 line_count += 1
-    zoo_int = np.genfromtxt("data/zoo_numeric.csv", delimiter=" ",
-                            usecols=[17],
-                            dtype=int,
-                            encoding="iso-8859-1")
     mapping = dict()
     for i in range(0, len(names)):
         mapping[zoo_int[i]] = names[i]
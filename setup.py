@@ -4,7 +4,7 @@ setup(
     name='thb_dmc',
     version='0.1',
     packages=['thb_dmc'],
-    install_requires=[],
+    install_requires=['numpy'],
     url='https://github.com/marvinlwenzel/thb_dmc_ss19',
     license='MIT',
     author='Marvin Lukas Wenzel',
@@ -14,12 +14,11 @@ setup(
     classifiers=[
         'Development Status :: 3 - Alpha',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
 
     ],
     keywords='thb data datamining',
-    python_requires='>=3.6.*, <4',
+    python_requires='>=3.8.*, <4',
     extras_require={
         'test': ['pyhamcrest'],
     },
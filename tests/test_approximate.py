@@ -0,0 +1,88 @@
+import numpy
+from hamcrest import assert_that, equal_to, close_to, less_than_or_equal_to, greater_than_or_equal_to
+
+from thb_dmc.approximate import uniform_sample, lightweight_coreset, approximate_kmeans, \
+    approximate_davies_bouldin_index
+from thb_dmc.davies_bouldin_index import labelled_davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer, KmeanClusterer
+
+
+def _blobs(seed, num_points=20000):
+    rng = numpy.random.RandomState(seed)
+    centers = numpy.array(((0.0, 0.0), (20.0, 0.0), (0.0, 20.0)))
+    labels = rng.randint(3, size=num_points)
+    return centers[labels] + rng.normal(size=(num_points, 2)), labels
+
+
+START = (('c1', (1.0, 1.0)), ('c2', (15.0, 1.0)), ('c3', (1.0, 15.0)))
+
+
+def test_uniform_sample_of_batches_and_matrix():
+    points, _ = _blobs(1, 1000)
+
+    sample, weights, num_points = uniform_sample(points, 100, random_state=2)
+    assert_that(sample.shape, equal_to((100, 2)))
+    assert_that(num_points, equal_to(1000))
+    assert_that(weights.sum(), close_to(1000, 0.000001))
+
+    batches = (points[start:start + 64] for start in range(0, 1000, 64))
+    sample, weights, num_points = uniform_sample(batches, 100, random_state=2)
+    assert_that(sample.shape, equal_to((100, 2)))
+    assert_that(num_points, equal_to(1000))
+    rows = set(map(tuple, points.tolist()))
+    assert_that(all(tuple(row) in rows for row in sample.tolist()), equal_to(True))
+
+    sample, weights, num_points = uniform_sample(iter([points[:10]]), 100)
+    assert_that(sample.shape, equal_to((10, 2)))
+    assert_that(weights.tolist(), equal_to([1.0] * 10))
+
+
+def test_coreset_weights_sum_to_number_of_points():
+    points, _ = _blobs(3, 5000)
+    sample, weights, num_points = lightweight_coreset(points, 2000, random_state=4, chunk_size=700)
+    assert_that(sample.shape, equal_to((2000, 2)))
+    assert_that(weights.sum(), close_to(5000, 250))
+
+
+def test_approximate_kmeans_interval_covers_exact_inertia():
+    points, _ = _blobs(5)
+    exact = ArrayKmeanClusterer(points, START)
+    exact.final_result()
+
+    for sampling in ("uniform", "coreset"):
+        result = approximate_kmeans(points, START, sample_size=2000, sampling=sampling, random_state=6)
+        assert_that(result.num_points, equal_to(20000))
+        assert_that(numpy.abs(numpy.array([c for _, c in result.centroids]) - exact.centroids).max(),
+                    less_than_or_equal_to(0.2))
+        assert_that(result.inertia.lower, less_than_or_equal_to(exact.inertia))
+        assert_that(result.inertia.upper, greater_than_or_equal_to(exact.inertia))
+
+
+def test_approximate_kmeans_warm_starts_exact_run():
+    points, _ = _blobs(7, 3000)
+    result = approximate_kmeans(points, START, sample_size=300, random_state=8)
+
+    iterations = len(list(KmeanClusterer([tuple(point) for point in points.tolist()], result.centroids)))
+    assert_that(iterations, less_than_or_equal_to(3))
+
+
+def test_approximate_dbi():
+    points, labels = _blobs(9)
+    exact = labelled_davies_bouldin_index(points, labels)
+
+    estimate = approximate_davies_bouldin_index(points, labels, sample_size=2000, bootstraps=100, random_state=10)
+    assert_that(estimate.lower, less_than_or_equal_to(exact))
+    assert_that(estimate.upper, greater_than_or_equal_to(exact))
+
+    estimate = approximate_davies_bouldin_index(points[:500], labels[:500], sample_size=2000)
+    assert_that(estimate.value, close_to(labelled_davies_bouldin_index(points[:500], labels[:500]), 0.0000001))
+    assert_that(estimate.lower, equal_to(estimate.upper))
+
+
+if __name__ == '__main__':
+    test_uniform_sample_of_batches_and_matrix()
+    test_coreset_weights_sum_to_number_of_points()
+    test_approximate_kmeans_interval_covers_exact_inertia()
+    test_approximate_kmeans_warm_starts_exact_run()
+    test_approximate_dbi()
+    print("Looks good for the approximate k-means")
@@ -0,0 +1,55 @@
+import numpy
+from hamcrest import assert_that, equal_to
+
+from thb_dmc.clustering import Clustering
+from thb_dmc.kmeans import assign_points_to_clusters, assign_clustering, ArrayKmeanClusterer, kmeans
+
+
+def test_sizes_and_members():
+    points = numpy.array([[0.0], [5.0], [1.0], [6.0], [0.0]])
+    clustering = Clustering(numpy.array([0, 1, 0, 1, 0]), numpy.array([[0.0], [5.0], [9.0]]), ["a", "b", "c"],
+                            points)
+    assert_that(len(clustering), equal_to(3))
+    assert_that(clustering.sizes.tolist(), equal_to([3, 2, 0]))
+    assert_that(clustering.members(0).tolist(), equal_to([0, 2, 4]))
+    assert_that(clustering.members(2).tolist(), equal_to([]))
+    assert_that(clustering.member_points(1).tolist(), equal_to([[5.0], [6.0]]))
+    # Both are views into one buffer per clustering
+    assert_that(clustering.members(1).base is clustering.members(0).base, equal_to(True))
+    assert_that(clustering.to_dict(), equal_to({("a", (0.0,)): {(0.0,), (1.0,)},
+                                                ("b", (5.0,)): {(5.0,), (6.0,)},
+                                                ("c", (9.0,)): set()}))
+
+
+def test_empty_clusters_are_sets():
+    result = assign_points_to_clusters([(0, 0), (1, 1)], (("near", (0, 0)), ("far", (10, 10))))
+    assert_that(result[("far", (10, 10))], equal_to(set()))
+    assert_that(isinstance(result[("far", (10, 10))], set), equal_to(True))
+
+
+def test_duplicates_are_kept():
+    points = [(0.0,), (0.0,), (0.0,), (3.0,)]
+    clustering = assign_clustering(points, (("a", (0.0,)),))
+    assert_that(clustering.sizes.tolist(), equal_to([4]))
+    # Every duplicate counts for the centroid
+    result = kmeans(points, (("a", (1.0,)),))
+    assert_that(list(result.keys()), equal_to([("a", (0.75,))]))
+
+
+def test_clusterer_clustering():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    clusterer = ArrayKmeanClusterer(points, start)
+    labels = clusterer.final_result()
+    clustering = clusterer.clustering
+    assert_that(clustering.labels is labels, equal_to(True))
+    assert_that(clustering.sizes.tolist(), equal_to([5, 3]))
+    assert_that(clustering.centroids.tolist(), equal_to([[3.2, 2.8], [7.0, 6.0]]))
+
+
+if __name__ == '__main__':
+    test_sizes_and_members()
+    test_empty_clusters_are_sets()
+    test_duplicates_are_kept()
+    test_clusterer_clustering()
+    print("Looks good for the clustering")
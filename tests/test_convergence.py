@@ -0,0 +1,61 @@
+import numpy
+from hamcrest import assert_that, equal_to, less_than, less_than_or_equal_to
+
+from thb_dmc.convergence import StoppingCriteria, StopReason
+from thb_dmc.kmeans import ArrayKmeanClusterer, KmeanClusterer
+
+
+def _blobs():
+    rng = numpy.random.default_rng(3)
+    centers = rng.uniform(-5, 5, size=(6, 3))
+    points = rng.standard_normal((3000, 3)) + centers[rng.integers(6, size=3000)]
+    start = tuple(("c{}".format(i), tuple(point)) for i, point in enumerate(points[:6].tolist()))
+    return points, start
+
+
+def test_exact_convergence_is_recorded():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    clusterer = KmeanClusterer(points, start, stopping_criteria=StoppingCriteria(max_iterations=100))
+    clusterer.final_result()
+    assert_that(clusterer.stop_reason, equal_to(StopReason.CONVERGED))
+
+
+def test_max_iterations():
+    points, start = _blobs()
+    clusterer = ArrayKmeanClusterer(points, start, stopping_criteria=StoppingCriteria(max_iterations=2))
+    assert_that(len(list(clusterer)), equal_to(2))
+    clusterer.final_result()
+    assert_that(clusterer.stop_reason, equal_to(StopReason.MAX_ITERATIONS))
+
+
+def test_tolerances_stop_before_exact_convergence():
+    points, start = _blobs()
+    exact = ArrayKmeanClusterer(points, start)
+    exact.final_result()
+
+    for criteria, reason in ((StoppingCriteria(max_centroid_shift=1e-2), StopReason.MAX_CENTROID_SHIFT),
+                             (StoppingCriteria(relative_inertia_improvement=1e-3),
+                              StopReason.RELATIVE_INERTIA_IMPROVEMENT),
+                             (StoppingCriteria(reassigned_fraction=1e-2), StopReason.REASSIGNED_FRACTION)):
+        clusterer = ArrayKmeanClusterer(points, start, stopping_criteria=criteria)
+        clusterer.final_result()
+        assert_that(clusterer.stop_reason, equal_to(reason))
+        assert_that(clusterer.iteration, less_than(exact.iteration))
+        assert_that(clusterer.inertia, less_than_or_equal_to(exact.inertia * 1.01))
+
+
+def test_time_budget():
+    points, start = _blobs()
+    clusterer = ArrayKmeanClusterer(points, start, stopping_criteria=StoppingCriteria(time_budget=0.0))
+    clusterer.final_result()
+    assert_that(clusterer.stop_reason, equal_to(StopReason.TIME_BUDGET))
+    assert_that(clusterer.iteration, equal_to(1))
+
+
+if __name__ == '__main__':
+    test_exact_convergence_is_recorded()
+    test_max_iterations()
+    test_tolerances_stop_before_exact_convergence()
+    test_time_budget()
+    print("Looks good for the stopping criteria")
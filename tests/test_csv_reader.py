@@ -0,0 +1,50 @@
+import os
+
+import numpy
+from hamcrest import assert_that, equal_to
+
+from thb_dmc.csv_reader import read_csv, read_csv_chunks, ColumnStatistics
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+def test_chunks_and_labels_in_one_pass():
+    path = os.path.join(DATA, "zoo_numeric.csv")
+    expected = numpy.genfromtxt(path, delimiter=" ", dtype=int)
+    chunks = list(read_csv_chunks(path, delimiter=" ", columns=range(17), label_column=17, dtype=int,
+                                  label_dtype=int, chunk_rows=40))
+    assert_that([chunk.values.shape for chunk in chunks], equal_to([(40, 17), (40, 17), (21, 17)]))
+    assert_that(numpy.concatenate([chunk.values for chunk in chunks]).tolist(), equal_to(expected[:, :17].tolist()))
+    assert_that(numpy.concatenate([chunk.labels for chunk in chunks]).tolist(), equal_to(expected[:, 17].tolist()))
+
+
+def test_booleans_and_encoding():
+    zoo, types = read_csv(os.path.join(DATA, "zoo_german.csv"), skip_rows=1, columns=[1, 2, 13], label_column=17,
+                          dtype=int, encoding="iso-8859-1")
+    assert_that(zoo[:2].tolist(), equal_to([[1, 0, 4], [1, 0, 4]]))
+    assert_that(types[0], equal_to("mammal"))
+
+
+def test_imputation():
+    path = os.path.join(DATA, "two_missing.csv")
+    holes = numpy.genfromtxt(path, delimiter=",")
+    means = numpy.nanmean(holes, axis=0)
+    medians = numpy.nanmedian(holes, axis=0)
+    missing = numpy.isnan(holes)
+
+    statistics = ColumnStatistics()
+    list(read_csv_chunks(path, chunk_rows=16, statistics=statistics))
+    assert_that(numpy.allclose(statistics.means, means), equal_to(True))
+
+    for impute, fill in (("mean", means), ("median", medians)):
+        values = read_csv(path, impute=impute, chunk_rows=16).values
+        assert_that(numpy.isnan(values).any(), equal_to(False))
+        assert_that(values[~missing].tolist(), equal_to(holes[~missing].tolist()))
+        assert_that(numpy.allclose(values[missing], fill[numpy.nonzero(missing)[1]]), equal_to(True))
+
+
+if __name__ == '__main__':
+    test_chunks_and_labels_in_one_pass()
+    test_booleans_and_encoding()
+    test_imputation()
+    print("Looks good for the CSV reader")
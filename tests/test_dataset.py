@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import numpy
+from hamcrest import assert_that, equal_to, calling, raises
+
+from thb_dmc.dataset import convert_csv, open_dataset, write_dataset, read_header
+from thb_dmc.davies_bouldin_index import labelled_davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer
+from thb_dmc.vector_util import as_matrix
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+def test_convert_csv():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "two.bin")
+    assert_that(convert_csv(os.path.join(DATA, "two.csv"), path, delimiter=" ", chunk_rows=10), equal_to((85, 2)))
+    dataset = open_dataset(path)
+    expected = numpy.genfromtxt(os.path.join(DATA, "two.csv"), delimiter=" ")
+    assert_that(dataset.tolist(), equal_to(expected.tolist()))
+
+    convert_csv(os.path.join(DATA, "two_missing.csv"), path)
+    missing = numpy.genfromtxt(os.path.join(DATA, "two_missing.csv"), delimiter=",")
+    assert_that(numpy.array_equal(open_dataset(path), missing, equal_nan=True), equal_to(True))
+    convert_csv(os.path.join(DATA, "two_missing.csv"), path, impute="mean", chunk_rows=10)
+    assert_that(numpy.isnan(open_dataset(path)).any(), equal_to(False))
+    convert_csv(os.path.join(DATA, "two_missing.csv"), path, impute="median", chunk_rows=10)
+    medians = numpy.nanmedian(missing, axis=0)
+    rows, columns = numpy.nonzero(numpy.isnan(missing))
+    assert_that(open_dataset(path)[rows, columns].tolist(), equal_to(medians[columns].tolist()))
+
+    convert_csv(os.path.join(DATA, "zoo_numeric.csv"), path, delimiter=" ", columns=[12, 17])
+    assert_that(read_header(path)[:2], equal_to((101, 2)))
+    del dataset
+    os.remove(path)
+    os.rmdir(directory)
+
+
+def test_clustering_works_on_the_mapped_file():
+    rng = numpy.random.default_rng(4)
+    points = rng.standard_normal((2000, 3))
+    start = (("a", (0.0, 0.0, 0.0)), ("b", (1.0, 1.0, 1.0)), ("c", (-1.0, 0.0, 1.0)))
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "points.bin")
+    write_dataset(path, points)
+    dataset = open_dataset(path)
+
+    assert_that(numpy.shares_memory(as_matrix(dataset), dataset), equal_to(True))
+    labels = ArrayKmeanClusterer(dataset, start).final_result()
+    assert_that(labels.tolist(), equal_to(ArrayKmeanClusterer(points, start).final_result().tolist()))
+    assert_that(labelled_davies_bouldin_index(dataset, labels),
+                equal_to(labelled_davies_bouldin_index(points, labels)))
+    del dataset
+    os.remove(path)
+    os.rmdir(directory)
+
+
+def test_rejects_other_files():
+    assert_that(calling(read_header).with_args(os.path.join(DATA, "two.csv")), raises(ValueError))
+
+
+if __name__ == '__main__':
+    test_convert_csv()
+    test_clustering_works_on_the_mapped_file()
+    test_rejects_other_files()
+    print("Looks good for the datasets")
@@ -1,6 +1,9 @@
-from hamcrest import assert_that, close_to
+import numpy
+from hamcrest import assert_that, close_to, calling, raises
 
-from thb_dmc.davies_bouldin_index import davies_bouldin_index
+from thb_dmc.davies_bouldin_index import davies_bouldin_index, labelled_davies_bouldin_index, \
+    DaviesBouldinTracker
+from thb_dmc.vector_util import block_distance
 
 
 def test_dbi_final():
@@ -12,6 +15,88 @@ def test_dbi_final():
     assert_that(result, close_to(ueb_1_2_c_solution, 0.0000001))
 
 
+def test_labelled_dbi_final():
+    points = numpy.array(((1, 3), (3, 3), (5, 2), (4, 2), (3, 4), (8, 3), (8, 7), (5, 8)), dtype=float)
+    labels = numpy.array((0, 0, 0, 0, 0, 1, 1, 1))
+    ueb_1_2_c_solution = 0.7709959
+
+    result = labelled_davies_bouldin_index(points, labels)
+    assert_that(result, close_to(ueb_1_2_c_solution, 0.0000001))
+
+
+def test_coincident_clusters_raise():
+    clusters = (((1, 1), (1, 1)), ((1, 1),), ((5, 5), (6, 6)))
+    assert_that(calling(davies_bouldin_index).with_args(clusters), raises(ZeroDivisionError))
+
+    points = numpy.array(((1, 1), (1, 1), (1, 1), (5, 5), (6, 6)), dtype=float)
+    labels = numpy.array((0, 0, 1, 2, 2))
+    assert_that(calling(labelled_davies_bouldin_index).with_args(points, labels), raises(ZeroDivisionError))
+
+
+def test_labelled_dbi_matches_clusters():
+    rng = numpy.random.RandomState(5)
+    points = rng.normal(size=(300, 3))
+    labels = rng.randint(6, size=300)
+    clusters = [[tuple(point) for point in points[labels == j].tolist()] for j in range(6)]
+
+    for q in (1, 2):
+        expected = davies_bouldin_index(clusters, dispersion_distance_func=block_distance, q=q)
+        result = labelled_davies_bouldin_index(points, labels, dispersion_distance_func=block_distance, q=q,
+                                               chunk_size=64)
+        assert_that(result, close_to(expected, 0.0000001))
+
+
+def test_weighted_dbi_matches_duplicated_points():
+    rng = numpy.random.RandomState(7)
+    points = rng.normal(size=(60, 2))
+    labels = rng.randint(3, size=60)
+    counts = rng.randint(1, 5, size=60)
+    duplicated = numpy.repeat(points, counts, axis=0)
+    duplicated_labels = numpy.repeat(labels, counts)
+
+    for q in (1, 2):
+        expected = labelled_davies_bouldin_index(duplicated, duplicated_labels, q=q)
+        result = labelled_davies_bouldin_index(points, labels, q=q, weights=counts)
+        assert_that(result, close_to(expected, 0.0000001))
+
+        clusters = [[tuple(point) for point in points[labels == j].tolist()] for j in range(3)]
+        weights = [counts[labels == j].tolist() for j in range(3)]
+        assert_that(davies_bouldin_index(clusters, q=q, weights=weights), close_to(expected, 0.0000001))
+
+
+def test_tracker_follows_label_changes():
+    rng = numpy.random.RandomState(9)
+    points = rng.normal(loc=100.0, size=(400, 2))
+    q1_tracker = DaviesBouldinTracker(points, 4, q=1)
+    q2_tracker = DaviesBouldinTracker(points, 4, q=2)
+
+    labels = rng.randint(4, size=400)
+    for _ in range(5):
+        for q, tracker in ((1, q1_tracker), (2, q2_tracker)):
+            expected = labelled_davies_bouldin_index(points, labels, q=q)
+            assert_that(tracker.update(labels), close_to(expected, expected * 0.0000001))
+        labels = labels.copy()
+        moved = rng.randint(400, size=30)
+        labels[moved] = rng.randint(4, size=30)
+
+
+def test_float32_dbi_matches_float64():
+    rng = numpy.random.RandomState(11)
+    points = rng.normal(loc=1000.0, size=(2000, 4))
+    labels = rng.randint(5, size=2000)
+
+    for q in (1, 2):
+        expected = labelled_davies_bouldin_index(points, labels, q=q)
+        result = labelled_davies_bouldin_index(points.astype(numpy.float32), labels, q=q)
+        assert_that(result, close_to(expected, expected * 0.0001))
+
+
 if __name__ == '__main__':
     test_dbi_final()
+    test_labelled_dbi_final()
+    test_coincident_clusters_raise()
+    test_labelled_dbi_matches_clusters()
+    test_weighted_dbi_matches_duplicated_points()
+    test_tracker_follows_label_changes()
+    test_float32_dbi_matches_float64()
     print("Looks good for the Davies Bouldin Index")
@@ -0,0 +1,82 @@
+import numpy
+from hamcrest import assert_that, equal_to, close_to, greater_than, calling, raises
+
+from thb_dmc.decomposition import PrincipalComponents
+from thb_dmc.davies_bouldin_index import labelled_davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer
+
+
+def _wide(seed, num_points=2000, num_dimensions=60, rank=3):
+    # Three clusters in a three dimensional subspace of a wide space, plus a little noise
+    rng = numpy.random.RandomState(seed)
+    basis = numpy.linalg.qr(rng.normal(size=(num_dimensions, rank)))[0].T
+    centers = numpy.array(((0.0, 0.0, 0.0), (10.0, 0.0, 0.0), (0.0, 10.0, 0.0)))
+    labels = rng.randint(3, size=num_points)
+    latent = centers[labels] + rng.normal(size=(num_points, rank))
+    return 5.0 + latent @ basis + 0.01 * rng.normal(size=(num_points, num_dimensions)), labels
+
+
+def _chunks(points, rows=300):
+    return (points[start:start + rows] for start in range(0, points.shape[0], rows))
+
+
+def test_fit_matches_svd():
+    points, _ = _wide(1)
+    centered = points - points.mean(axis=0)
+    _, singular_values, vectors = numpy.linalg.svd(centered, full_matrices=False)
+
+    pca = PrincipalComponents.fit(_chunks(points), num_components=3)
+    assert_that(pca.num_components, equal_to(3))
+    assert_that(numpy.allclose(pca.explained_variance, singular_values[:3] ** 2 / 1999), equal_to(True))
+    assert_that(numpy.allclose(numpy.abs(numpy.sum(pca.components * vectors[:3], axis=1)), 1.0), equal_to(True))
+    assert_that(pca.explained_variance_ratio.sum(), greater_than(0.99))
+
+
+def test_explained_variance_picks_components():
+    points, _ = _wide(2)
+    assert_that(PrincipalComponents.fit(_chunks(points), explained_variance=0.99).num_components, equal_to(3))
+    assert_that(PrincipalComponents.fit(_chunks(points), explained_variance=0.3).num_components, equal_to(1))
+
+
+def test_randomized_matches_exact():
+    points, _ = _wide(3)
+    exact = PrincipalComponents.fit(_chunks(points), num_components=5)
+    randomized = PrincipalComponents.fit_randomized(points, 5, explained_variance=0.99, random_state=4,
+                                                    chunk_rows=256)
+
+    assert_that(randomized.num_components, equal_to(3))
+    assert_that(randomized.total_variance, close_to(exact.total_variance, 0.000001))
+    assert_that(numpy.allclose(randomized.explained_variance, exact.explained_variance[:3]), equal_to(True))
+    assert_that(numpy.allclose(randomized.components, exact.components[:3], atol=1e-6), equal_to(True))
+
+
+def test_single_point_is_rejected():
+    point = numpy.ones((1, 4))
+    assert_that(calling(PrincipalComponents.fit).with_args([point]), raises(ValueError))
+    assert_that(calling(PrincipalComponents.fit_randomized).with_args(point, 2), raises(ValueError))
+
+
+def test_transform_feeds_kmeans():
+    points, truth = _wide(5)
+    pca = PrincipalComponents.fit(_chunks(points), explained_variance=0.99)
+
+    reduced = pca.transform(points, chunk_rows=128)
+    assert_that(reduced.shape, equal_to((2000, 3)))
+    chunked = numpy.concatenate(list(pca.transform_chunks(_chunks(points))))
+    assert_that(numpy.allclose(chunked, reduced), equal_to(True))
+    assert_that(numpy.allclose(pca.inverse_transform(reduced), points, atol=0.1), equal_to(True))
+
+    start = tuple(("c{}".format(j), tuple(reduced[numpy.flatnonzero(truth == j)[0]])) for j in range(3))
+    labels = ArrayKmeanClusterer(reduced, start).final_result()
+    assert_that(len(set(zip(truth.tolist(), labels.tolist()))), equal_to(3))
+    assert_that(labelled_davies_bouldin_index(reduced, labels),
+                close_to(labelled_davies_bouldin_index(points, labels), 0.01))
+
+
+if __name__ == '__main__':
+    test_fit_matches_svd()
+    test_explained_variance_picks_components()
+    test_randomized_matches_exact()
+    test_single_point_is_rejected()
+    test_transform_feeds_kmeans()
+    print("Looks good for the principal components")
@@ -0,0 +1,41 @@
+import numpy
+from hamcrest import assert_that, equal_to, greater_than
+
+from thb_dmc.kmeans import ArrayKmeanClusterer, kmeans
+from thb_dmc.vector_util import euclidean_distance, block_distance
+
+
+def _blobs(seed, num_points=600, num_centers=5, num_dimensions=3):
+    rng = numpy.random.RandomState(seed)
+    centers = rng.uniform(-10, 10, size=(num_centers, num_dimensions))
+    points = centers[rng.randint(num_centers, size=num_points)] + rng.normal(size=(num_points, num_dimensions))
+    start = tuple(("c{}".format(i), tuple(point)) for i, point in enumerate(points[:num_centers].tolist()))
+    return points, start
+
+
+def test_accelerated_matches_full_scan():
+    for distance_function in (euclidean_distance, block_distance):
+        points, start = _blobs(11)
+        plain = ArrayKmeanClusterer(points, start, distance_function=distance_function)
+        accelerated = ArrayKmeanClusterer(points, start, distance_function=distance_function, accelerated=True)
+
+        plain_steps = [labels.tolist() for labels in plain]
+        accelerated_steps = [labels.tolist() for labels in accelerated]
+        assert_that(accelerated_steps, equal_to(plain_steps))
+
+        accelerated.final_result()
+        assert_that(accelerated.skipped_distance_evaluations, greater_than(0))
+        assert_that(accelerated.distance_evaluations + accelerated.skipped_distance_evaluations,
+                    equal_to(len(plain_steps) * points.shape[0] * len(start)))
+
+
+def test_accelerated_kmeans_ueb_1_2_c():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    assert_that(kmeans(points, start, accelerated=True), equal_to(kmeans(points, start)))
+
+
+if __name__ == '__main__':
+    test_accelerated_matches_full_scan()
+    test_accelerated_kmeans_ueb_1_2_c()
+    print("Looks good for the accelerated k-means")
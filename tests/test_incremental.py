@@ -0,0 +1,159 @@
+import os
+import tempfile
+
+import numpy
+from hamcrest import assert_that, equal_to, less_than, close_to
+
+from thb_dmc.incremental import IncrementalKmeanClusterer, save_state, load_state
+from thb_dmc.kmeans import ArrayKmeanClusterer, KmeanClusterer, kmeans
+
+
+def _blobs(seed, num_points):
+    rng = numpy.random.RandomState(seed)
+    centers = numpy.array(((0.0, 0.0), (6.0, 0.0), (0.0, 6.0), (6.0, 6.0)))
+    return centers[rng.randint(4, size=num_points)] + rng.normal(size=(num_points, 2))
+
+
+START = (('c1', (1.0, 1.0)), ('c2', (5.0, 1.0)), ('c3', (1.0, 5.0)), ('c4', (5.0, 5.0)))
+
+
+def _fitted(points):
+    clusterer = ArrayKmeanClusterer(points, START, accelerated=True)
+    clusterer.final_result()
+    return clusterer.state
+
+
+def _exact(points, state):
+    clusterer = ArrayKmeanClusterer(points, state.named_centroids())
+    labels = clusterer.final_result()
+    return labels, clusterer.assigned_centroids
+
+
+def test_state_of_array_clusterer():
+    points = _blobs(1, 500)
+    state = _fitted(points)
+    assert_that(state.counts.sum(), equal_to(500))
+    assert_that(numpy.allclose(state.sums / state.counts[:, numpy.newaxis], state.centroids), equal_to(True))
+    assert_that(len(state.upper_bounds), equal_to(500))
+
+
+def test_add_points_and_reconverge():
+    points = _blobs(2, 4000)
+    new_points = _blobs(3, 100) + 0.5
+    state = _fitted(points)
+
+    clusterer = IncrementalKmeanClusterer(state, points)
+    clusterer.add(new_points)
+    clusterer.reconverge()
+
+    labels, centroids = _exact(numpy.concatenate((points, new_points)), state)
+    assert_that(clusterer.labels.tolist(), equal_to(labels.tolist()))
+    assert_that(numpy.allclose(clusterer.centroids, centroids), equal_to(True))
+    # Fewer distances than points, where a restart calculates all k distances of every point per iteration
+    assert_that(clusterer.distance_evaluations, less_than(4100))
+
+
+def test_remove_points_and_reconverge():
+    points = _blobs(4, 2000)
+    state = _fitted(points)
+    removed = numpy.arange(0, 2000, 7)
+
+    clusterer = IncrementalKmeanClusterer(state, points)
+    # Points given twice are removed once
+    clusterer.remove(numpy.concatenate((removed, removed[:5], removed[-5:] - 2000)))
+    clusterer.reconverge()
+
+    labels, centroids = _exact(numpy.delete(points, removed, axis=0), state)
+    assert_that(clusterer.labels.tolist(), equal_to(labels.tolist()))
+    assert_that(numpy.allclose(clusterer.centroids, centroids), equal_to(True))
+    assert_that(clusterer.counts.sum(), equal_to(2000 - len(removed)))
+
+
+def test_clusterers_continue_from_state():
+    points = _blobs(2, 4000)
+    new_points = _blobs(3, 100) + 0.5
+    all_points = numpy.concatenate((points, new_points))
+    state = _fitted(points)
+    labels, centroids = _exact(all_points, state)
+
+    clusterer = ArrayKmeanClusterer(all_points, state=state, accelerated=True)
+    next(clusterer)
+    # The bounds of the state settle the old points, the new ones are assigned fully
+    assert_that(clusterer.distance_evaluations, less_than(4100))
+    assert_that(clusterer.final_result().tolist(), equal_to(labels.tolist()))
+    assert_that(numpy.allclose(clusterer.assigned_centroids, centroids), equal_to(True))
+
+    point_tuples = [tuple(point) for point in all_points.tolist()]
+    continued = KmeanClusterer(point_tuples, state=state)
+    assert_that(continued.final_result(), equal_to(kmeans(point_tuples, state.named_centroids())))
+    assert_that(continued.state.labels.tolist(), equal_to(labels.tolist()))
+
+
+def test_state_without_points_or_bounds():
+    points = _blobs(5, 1000)
+    state = _fitted(points)
+
+    clusterer = IncrementalKmeanClusterer(state._replace(labels=None, upper_bounds=None, lower_bounds=None))
+    clusterer.add(_blobs(6, 50))
+    clusterer.reconverge()
+    assert_that(clusterer.counts.sum(), equal_to(1050))
+    assert_that(len(clusterer.labels), equal_to(50))
+
+    clusterer = IncrementalKmeanClusterer(state._replace(upper_bounds=None, lower_bounds=None), points)
+    assert_that(clusterer.reconverge(), equal_to(0))
+    assert_that(clusterer.labels.tolist(), equal_to(state.labels.tolist()))
+
+
+def test_weighted_state_moves_whole_weights():
+    points = _blobs(8, 2000)
+    weights = numpy.random.RandomState(9).randint(1, 6, size=2000).astype(float)
+    new_points = _blobs(10, 50) + 0.5
+    new_weights = numpy.full(50, 3.0)
+    fitted = ArrayKmeanClusterer(points, START, accelerated=True, weights=weights)
+    fitted.final_result()
+
+    clusterer = IncrementalKmeanClusterer(fitted.state, points)
+    clusterer.add(new_points, new_weights)
+    clusterer.remove(numpy.arange(0, 2000, 11))
+    clusterer.reconverge()
+
+    kept = numpy.ones(2000, dtype=bool)
+    kept[numpy.arange(0, 2000, 11)] = False
+    all_points = numpy.concatenate((points[kept], new_points))
+    all_weights = numpy.concatenate((weights[kept], new_weights))
+    exact = ArrayKmeanClusterer(all_points, fitted.state.named_centroids(), weights=all_weights)
+    labels = exact.final_result()
+    assert_that(clusterer.labels.tolist(), equal_to(labels.tolist()))
+    assert_that(numpy.allclose(clusterer.centroids, exact.assigned_centroids), equal_to(True))
+    assert_that(clusterer.counts.sum(), close_to(all_weights.sum(), 0.000001))
+    assert_that(numpy.array_equal(clusterer.state.weights, all_weights), equal_to(True))
+
+
+def test_save_and_load_state():
+    points = _blobs(7, 300)
+    state = _fitted(points)
+    path = os.path.join(tempfile.mkdtemp(), "state.npz")
+
+    save_state(state, path)
+    loaded = load_state(path)
+    assert_that(loaded.names, equal_to(state.names))
+    for field in ("centroids", "sums", "counts", "labels", "upper_bounds", "lower_bounds"):
+        assert_that(numpy.array_equal(getattr(loaded, field), getattr(state, field)), equal_to(True))
+
+    save_state(state._replace(labels=None, upper_bounds=None, lower_bounds=None), path)
+    assert_that(load_state(path).labels, equal_to(None))
+    assert_that(load_state(path).weights, equal_to(None))
+
+    save_state(state._replace(weights=numpy.arange(300.0)), path)
+    assert_that(load_state(path).weights.tolist(), equal_to(list(range(300))))
+
+
+if __name__ == '__main__':
+    test_state_of_array_clusterer()
+    test_add_points_and_reconverge()
+    test_remove_points_and_reconverge()
+    test_clusterers_continue_from_state()
+    test_state_without_points_or_bounds()
+    test_weighted_state_moves_whole_weights()
+    test_save_and_load_state()
+    print("Looks good for the incremental k-means")
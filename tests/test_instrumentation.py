@@ -0,0 +1,41 @@
+from hamcrest import assert_that, equal_to, close_to, greater_than_or_equal_to
+
+from thb_dmc.instrumentation import ProfileCapture
+from thb_dmc.kmeans import ArrayKmeanClusterer, KmeanClusterer
+
+
+def test_hooks_report_every_iteration():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    reported = []
+    clusterer = ArrayKmeanClusterer(points, start, hooks=[reported.append])
+    clusterer.final_result()
+
+    assert_that([stats.iteration for stats in reported], equal_to([1, 2, 3]))
+    assert_that(reported[0].points_changed, equal_to(len(points)))
+    assert_that(reported[-1].points_changed, equal_to(0))
+    assert_that(reported[-1].centroid_shift, equal_to(0.0))
+    assert_that(reported[0].distance_evaluations, equal_to(len(points) * len(start)))
+    assert_that(reported[-1].inertia, close_to(clusterer.inertia, 1e-9))
+    assert_that(min(stats.assignment_seconds for stats in reported), greater_than_or_equal_to(0.0))
+
+
+def test_print_steps(capsys):
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    KmeanClusterer(points, start, print_steps=True).final_result()
+    assert_that(capsys.readouterr().out.count("Iteration"), equal_to(3))
+
+
+def test_profile_capture():
+    points = [(float(i % 7), float(i % 11)) for i in range(500)]
+    with ProfileCapture() as capture:
+        ArrayKmeanClusterer(points, (("a", (0.0, 0.0)), ("b", (6.0, 10.0)))).final_result()
+    assert_that(capture.stats().total_calls, greater_than_or_equal_to(1))
+    assert_that(capture.peak_bytes, greater_than_or_equal_to(1))
+
+
+if __name__ == '__main__':
+    test_hooks_report_every_iteration()
+    test_profile_capture()
+    print("Looks good for the instrumentation")
@@ -0,0 +1,58 @@
+import numpy
+from hamcrest import assert_that, equal_to, less_than, contains_string
+
+from thb_dmc.k_selection import select_k, format_scores
+from thb_dmc.seeding import extend_centroids
+
+
+def _blobs(seed, num_points=1500):
+    rng = numpy.random.RandomState(seed)
+    centers = numpy.array(((0.0, 0.0), (20.0, 0.0), (0.0, 20.0), (20.0, 20.0)))
+    return centers[rng.randint(4, size=num_points)] + rng.normal(size=(num_points, 2))
+
+
+def test_extend_centroids_keeps_existing_ones():
+    points = _blobs(1)
+    existing = points[:2]
+    centroids = extend_centroids(points, existing, 5, random_state=2)
+    assert_that([name for name, _ in centroids], equal_to(['c1', 'c2', 'c3', 'c4', 'c5']))
+    assert_that([centroid for _, centroid in centroids[:2]], equal_to([tuple(row) for row in existing.tolist()]))
+    assert_that(len({centroid for _, centroid in centroids}), equal_to(5))
+
+
+def test_select_k_finds_blobs():
+    points = _blobs(3)
+    selection = select_k(points, range(2, 9), patience=None, random_state=4)
+
+    assert_that([score.k for score in selection.scores], equal_to(list(range(2, 9))))
+    assert_that(selection.best.k, equal_to(4))
+    assert_that(selection.stopped_early, equal_to(False))
+    assert_that(len(selection.best.centroids), equal_to(4))
+    assert_that(format_scores(selection), contains_string("\n    4 "))
+
+
+def test_select_k_stops_once_bottomed_out():
+    points = _blobs(5)
+    selection = select_k(points, range(2, 30), patience=2, random_state=6)
+
+    assert_that(selection.best.k, equal_to(4))
+    assert_that(selection.stopped_early, equal_to(True))
+    assert_that(len(selection.scores), less_than(10))
+
+
+def test_select_k_in_parallel_on_a_sample():
+    points = _blobs(7, num_points=5000)
+    selection = select_k(points, range(2, 8), n_jobs=2, sample_size=1000, patience=None, random_state=8)
+
+    assert_that([score.k for score in selection.scores], equal_to(list(range(2, 8))))
+    assert_that(selection.best.k, equal_to(4))
+    # Every k has k clusters, none stayed empty after starting from the centroids of a smaller k
+    assert_that(len({score.inertia for score in selection.scores}), equal_to(6))
+
+
+if __name__ == '__main__':
+    test_extend_centroids_keeps_existing_ones()
+    test_select_k_finds_blobs()
+    test_select_k_stops_once_bottomed_out()
+    test_select_k_in_parallel_on_a_sample()
+    print("Looks good for the k selection")
@@ -1,6 +1,14 @@
-from hamcrest import assert_that, equal_to, not_
+import os
 
-from thb_dmc.kmeans import KmeanClusterer, kmeans
+import numpy
+from hamcrest import assert_that, equal_to, not_, close_to, calling, raises
+
+from thb_dmc.kmeans import KmeanClusterer, kmeans, assign_labels, ArrayKmeanClusterer, assign_and_sum
+from thb_dmc.csv_reader import read_csv
+from thb_dmc.vector_util import euclidean_distance, block_distance, simple_centroid, deduplicate, cluster_sums, \
+    as_matrix
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
 
 
 def test_kmeans_final_ueb_1_2_c():
@@ -35,8 +43,188 @@ def test_no_double_solution():
         old_sol = sol
 
 
+def _scan_labels(points, centroids, distance_function):
+    return [min(range(len(centroids)), key=lambda j: distance_function(tuple(p), tuple(centroids[j])))
+            for p in points]
+
+
+def test_no_points():
+    assert_that(kmeans([]), equal_to(None))
+    assert_that(list(KmeanClusterer([])), equal_to([]))
+
+    clusterer = ArrayKmeanClusterer([], (('c1', (1.0, 2.0)),))
+    assert_that(clusterer.final_result().tolist(), equal_to([]))
+    assert_that(clusterer.to_dict(), equal_to({('c1', (1.0, 2.0)): set()}))
+
+
+def test_assign_labels_matches_scan():
+    rng = numpy.random.RandomState(3)
+    points = rng.normal(size=(500, 4))
+    centroids = rng.normal(size=(7, 4))
+
+    for distance_function in (euclidean_distance, block_distance):
+        expected = _scan_labels(points, centroids, distance_function)
+        assert_that(assign_labels(points, centroids, distance_function).tolist(), equal_to(expected))
+        assert_that(assign_labels(points, centroids, distance_function, chunk_size=33).tolist(),
+                    equal_to(expected))
+
+
+def test_assign_labels_matches_scan_far_from_origin():
+    rng = numpy.random.RandomState(5)
+    points = rng.normal(size=(2000, 3))
+    centroids = rng.normal(size=(5, 3))
+
+    for offset in (1e6, 1e7, 1e8):
+        expected = _scan_labels(points + offset, centroids + offset, euclidean_distance)
+        assert_that(assign_labels(points + offset, centroids + offset).tolist(), equal_to(expected))
+
+
+def test_assign_labels_custom_distance():
+    points = numpy.array([[0.0], [4.0], [9.0]])
+    centroids = numpy.array([[1.0], [8.0]])
+
+    def squared_distance(x, y):
+        return (x[0] - y[0]) ** 2
+
+    assert_that(assign_labels(points, centroids, squared_distance).tolist(), equal_to([0, 0, 1]))
+
+
+def test_assign_and_sum_matches_separate_passes():
+    rng = numpy.random.RandomState(4)
+    points = rng.normal(size=(700, 3))
+    centroids = rng.normal(size=(5, 3))
+    weights = rng.uniform(size=700)
+
+    for distance_function in (euclidean_distance, block_distance):
+        expected_labels = assign_labels(points, centroids, distance_function)
+        for point_weights in (None, weights):
+            labels, sums, counts = assign_and_sum(points, centroids, distance_function, chunk_size=64,
+                                                  weights=point_weights)
+            expected_sums, expected_counts = cluster_sums(points, expected_labels, 5, point_weights)
+            assert_that(labels.tolist(), equal_to(expected_labels.tolist()))
+            assert_that(numpy.allclose(sums, expected_sums), equal_to(True))
+            assert_that(numpy.allclose(counts, expected_counts), equal_to(True))
+
+
+def test_array_clusterer_ueb_1_2_c():
+    points = numpy.array(((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7)), dtype=float)
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    solution = {('c1', (3.2, 2.8)): {(1, 3), (3, 3), (5, 2), (4, 2), (3, 4)},
+                ('c2', (7.0, 6.0)): {(8, 3), (8, 7), (5, 8)}}
+
+    clusterer = ArrayKmeanClusterer(points, start)
+    labels = clusterer.final_result()
+
+    assert_that(labels.tolist(), equal_to([0, 0, 0, 0, 0, 1, 1, 1]))
+    assert_that(labels.flags.writeable, equal_to(False))
+    assert_that(clusterer.points is points, equal_to(True))
+    assert_that(clusterer.to_dict(), equal_to(solution))
+
+
+def test_array_clusterer_iteration_is_repeatable():
+    points = numpy.array(((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7)), dtype=float)
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    clusterer = ArrayKmeanClusterer(points, start)
+
+    first = [labels.tolist() for labels in clusterer]
+    second = [labels.tolist() for labels in clusterer]
+    assert_that(len(first), equal_to(3))
+    assert_that(first, equal_to(second))
+
+
+def test_weighted_simple_centroid():
+    assert_that(simple_centroid(((0, 0), (4, 8)), weights=(3, 1)), equal_to((1.0, 2.0)))
+    assert_that(simple_centroid(((0, 0), (0, 0), (0, 0), (4, 8))), equal_to((1.0, 2.0)))
+
+
+def test_deduplicate():
+    points = numpy.array(((2, 1), (0, 5), (2, 1), (2, 1), (0, 5), (3, 3)), dtype=float)
+
+    unique, counts = deduplicate(points)
+    assert_that(unique.tolist(), equal_to([[0, 5], [2, 1], [3, 3]]))
+    assert_that(counts.tolist(), equal_to([2, 3, 1]))
+
+    unique, weights = deduplicate(points, weights=numpy.array((1.0, 0.5, 1.0, 1.0, 0.5, 2.0)))
+    assert_that(weights.tolist(), equal_to([1.0, 3.0, 2.0]))
+
+
+def test_weighted_clusterer_matches_duplicated_points():
+    rng = numpy.random.RandomState(11)
+    unique = rng.randint(10, size=(40, 2)).astype(float)
+    counts = rng.randint(1, 6, size=40)
+    duplicated = numpy.repeat(unique, counts, axis=0)
+    start = (('c1', (2, 2)), ('c2', (7, 7)), ('c3', (2, 8)))
+
+    expected = ArrayKmeanClusterer(duplicated, start)
+    expected.final_result()
+    weighted = ArrayKmeanClusterer(unique, start, weights=counts)
+    weighted.final_result()
+
+    assert_that(numpy.allclose(weighted.assigned_centroids, expected.assigned_centroids), equal_to(True))
+    assert_that(weighted.inertia, close_to(expected.inertia, 0.000001))
+    assert_that(weighted.clustering.sizes.sum(), equal_to(40))
+
+
+def test_kmeans_collapse_duplicates():
+    points = [(1, 3), (1, 3), (1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7), (8, 7)]
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+
+    expected = kmeans(points, start)
+    result = kmeans(points, start, collapse_duplicates=True)
+    assert_that(len(result), equal_to(2))
+    for (name, centroid), cluster in expected.items():
+        match = [(key, value) for key, value in result.items() if key[0] == name][0]
+        assert_that(numpy.allclose(match[0][1], centroid), equal_to(True))
+        assert_that(match[1], equal_to(cluster))
+
+
+def test_as_matrix_keeps_float32():
+    points = numpy.arange(6, dtype=numpy.float32).reshape((3, 2))
+    assert_that(as_matrix(points) is points, equal_to(True))
+    assert_that(as_matrix(points, numpy.float64).dtype, equal_to(numpy.float64))
+    assert_that(as_matrix([(1, 2)], numpy.float32).dtype, equal_to(numpy.float32))
+    assert_that(as_matrix(numpy.arange(4).reshape((2, 2))).dtype, equal_to(numpy.float64))
+    assert_that(calling(as_matrix).with_args(points, numpy.float16), raises(ValueError))
+
+
+def test_float32_clusterer_matches_float64():
+    two = read_csv(os.path.join(DATA, "two.csv"), delimiter=" ").values
+    start = (('c1', (2.0, 50.0)), ('c2', (4.0, 80.0)), ('c3', (3.0, 70.0)))
+
+    expected = ArrayKmeanClusterer(two, start)
+    clusterer = ArrayKmeanClusterer(two, start, dtype=numpy.float32)
+    assert_that(clusterer.final_result().tolist(), equal_to(expected.final_result().tolist()))
+    assert_that(clusterer.dtype, equal_to(numpy.float32))
+    assert_that(clusterer.assigned_centroids.dtype, equal_to(numpy.float32))
+    assert_that(numpy.allclose(clusterer.assigned_centroids, expected.assigned_centroids, rtol=1e-6),
+                equal_to(True))
+    assert_that(clusterer.inertia, close_to(expected.inertia, expected.inertia * 1e-6))
+    # The sums of the state are accumulated in float64
+    assert_that(clusterer.state.sums.dtype, equal_to(numpy.float64))
+
+    # float32 points are clustered in float32 unless told otherwise
+    assert_that(ArrayKmeanClusterer(two.astype(numpy.float32), start).dtype, equal_to(numpy.float32))
+    point_tuples = [tuple(point) for point in two.tolist()]
+    expected_clusters = kmeans(point_tuples, start)
+    result = kmeans(point_tuples, start, dtype=numpy.float32)
+    assert_that(sorted(result.values(), key=len), equal_to(sorted(expected_clusters.values(), key=len)))
+
+
 if __name__ == '__main__':
     test_no_double_solution()
     test_kmeans_final_ueb_1_2_c()
     test_kmeans_final_1()
+    test_no_points()
+    test_assign_labels_matches_scan()
+    test_assign_labels_matches_scan_far_from_origin()
+    test_assign_labels_custom_distance()
+    test_assign_and_sum_matches_separate_passes()
+    test_array_clusterer_ueb_1_2_c()
+    test_array_clusterer_iteration_is_repeatable()
+    test_weighted_simple_centroid()
+    test_deduplicate()
+    test_weighted_clusterer_matches_duplicated_points()
+    test_kmeans_collapse_duplicates()
+    test_as_matrix_keeps_float32()
+    test_float32_clusterer_matches_float64()
     print("Looks good for k-means")
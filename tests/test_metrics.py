@@ -0,0 +1,69 @@
+import numpy
+from hamcrest import assert_that, close_to, equal_to, none, same_instance, calling, raises
+
+from thb_dmc.kmeans import assign_labels
+from thb_dmc.metrics import get_metric, minkowski_metric, pairwise_distances, paired_distances, \
+    squared_pairwise_distances
+from thb_dmc.vector_util import euclidean_distance, block_distance, pq_distance, squared_euclidean_distance, \
+    chebyshev_distance, cosine_distance
+
+
+def _assert_all_close(actual, expected):
+    for actual_value, expected_value in zip(numpy.ravel(actual), numpy.ravel(expected)):
+        assert_that(actual_value, close_to(expected_value, 0.0000001))
+
+
+def test_batched_kernels_match_scalar_form():
+    rng = numpy.random.RandomState(2)
+    x = rng.normal(size=(20, 5))
+    y = rng.normal(size=(6, 5))
+    x[0] = 0.0
+
+    for name in ("euclidean", "squared_euclidean", "manhattan", "chebyshev", "cosine"):
+        metric = get_metric(name)
+        expected = [[metric.distance(tuple(a), tuple(b)) for b in y.tolist()] for a in x.tolist()]
+        _assert_all_close(pairwise_distances(x, y, metric.distance), expected)
+        _assert_all_close(paired_distances(x[:6], y, metric.distance),
+                          [expected[i][i] for i in range(6)])
+
+    cubic = minkowski_metric(3)
+    expected = [[pq_distance(a, b, 3) for b in y.tolist()] for a in x.tolist()]
+    _assert_all_close(pairwise_distances(x, y, cubic), expected)
+    assert_that(assign_labels(x, y, cubic).tolist(), equal_to(numpy.argmin(expected, axis=1).tolist()))
+
+
+def test_squared_distances_match_pairwise():
+    rng = numpy.random.RandomState(6)
+    x = rng.normal(size=(15, 3))
+    y = rng.normal(size=(4, 3))
+
+    for distance_function in (euclidean_distance, block_distance, minkowski_metric(3), lambda a, b: abs(a[0] - b[0])):
+        _assert_all_close(squared_pairwise_distances(x, y, distance_function),
+                          pairwise_distances(x, y, distance_function) ** 2)
+
+
+def test_scalar_fast_paths_match_pq_distance():
+    x, y = (1.5, -2.0, 3.0), (0.5, 4.0, -1.0)
+    assert_that(euclidean_distance(x, y), close_to(pq_distance(x, y, 2), 0.0000001))
+    assert_that(block_distance(x, y), close_to(pq_distance(x, y, 1), 0.0000001))
+
+
+def test_scalar_distances_reject_different_dimensions():
+    for distance in (euclidean_distance, squared_euclidean_distance, block_distance, chebyshev_distance,
+                     cosine_distance):
+        assert_that(calling(distance).with_args((1, 2, 3), (1, 2)), raises(ValueError))
+
+
+def test_registry_lookup():
+    assert_that(get_metric(euclidean_distance).name, equal_to("euclidean"))
+    assert_that(get_metric(block_distance), same_instance(get_metric("manhattan")))
+    assert_that(get_metric(lambda x, y: 0.0), none())
+
+
+if __name__ == '__main__':
+    test_batched_kernels_match_scalar_form()
+    test_squared_distances_match_pairwise()
+    test_scalar_fast_paths_match_pq_distance()
+    test_scalar_distances_reject_different_dimensions()
+    test_registry_lookup()
+    print("Looks good for the metrics")
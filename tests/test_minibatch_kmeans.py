@@ -0,0 +1,45 @@
+import os
+import tempfile
+
+import numpy
+from hamcrest import assert_that, equal_to, close_to
+
+from thb_dmc.minibatch_kmeans import MiniBatchKmeanClusterer, minibatch_kmeans
+
+
+def test_minibatch_centroids_are_running_means():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 8)))
+
+    result = minibatch_kmeans((points[i:i + 3] for i in range(0, len(points), 3)), start)
+
+    assert_that(result[0][0], equal_to('c1'))
+    assert_that(result[0][1][0], close_to(4.0, 0.0000001))
+    assert_that(result[0][1][1], close_to(17.0 / 6.0, 0.0000001))
+    assert_that(result[1][1][0], close_to(6.5, 0.0000001))
+    assert_that(result[1][1][1], close_to(7.5, 0.0000001))
+
+
+def test_minibatch_checkpoint_resume():
+    rng = numpy.random.RandomState(7)
+    batches = [rng.normal(size=(50, 3)) for _ in range(6)]
+    start = (('a', (-1.0, 0.0, 0.0)), ('b', (1.0, 0.0, 0.0)))
+
+    uninterrupted = MiniBatchKmeanClusterer(start).fit(batches)
+
+    first_half = MiniBatchKmeanClusterer(start).fit(batches[:3])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.npz")
+        first_half.save_checkpoint(path)
+        resumed = MiniBatchKmeanClusterer.from_checkpoint(path).fit(batches[3:])
+
+    assert_that(resumed.names, equal_to(('a', 'b')))
+    assert_that(resumed.batches_seen, equal_to(6))
+    assert_that(resumed.counts.tolist(), equal_to(uninterrupted.counts.tolist()))
+    assert_that(resumed.centroids.tolist(), equal_to(uninterrupted.centroids.tolist()))
+
+
+if __name__ == '__main__':
+    test_minibatch_centroids_are_running_means()
+    test_minibatch_checkpoint_resume()
+    print("Looks good for mini-batch k-means")
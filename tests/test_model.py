@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+import numpy
+from hamcrest import assert_that, equal_to
+
+from thb_dmc.kmeans import ArrayKmeanClusterer, KmeanClusterer, kmeans
+from thb_dmc.metrics import minkowski_metric
+from thb_dmc.model import KmeansModel
+from thb_dmc.vector_util import block_distance
+
+
+def test_predict_reproduces_clustering():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    clusterer = ArrayKmeanClusterer(points, start)
+    labels = clusterer.final_result()
+
+    model = KmeansModel.from_clusterer(clusterer)
+    assert_that(model.predict(points).tolist(), equal_to(labels.tolist()))
+    assert_that(model.predict_names([(0, 0), (9, 9)]), equal_to(["c1", "c2"]))
+    assert_that(KmeansModel.from_clusterer(KmeanClusterer(points, start)).named_centroids(),
+                equal_to(model.named_centroids()))
+    assert_that(set(KmeansModel.from_named_centroids(kmeans(points, start).keys()).named_centroids()),
+                equal_to(set(model.named_centroids())))
+
+
+def test_float32_model_predicts_clusterer_labels():
+    rng = numpy.random.RandomState(4)
+    points = (rng.normal(size=(3000, 3)) * 100.0 + 1000.0).astype(numpy.float32)
+    start = tuple(("c{}".format(i), tuple(point)) for i, point in enumerate(points[:6].tolist()))
+    clusterer = ArrayKmeanClusterer(points, start)
+    labels = clusterer.final_result()
+
+    model = KmeansModel.from_clusterer(clusterer)
+    assert_that(model.centroids.dtype, equal_to(numpy.float32))
+    assert_that(model.predict(points).tolist(), equal_to(labels.tolist()))
+
+    point_tuples = [tuple(point) for point in points.tolist()]
+    clusters = KmeanClusterer(point_tuples, start, dtype=numpy.float32)
+    assert_that(KmeansModel.from_clusterer(clusters).centroids.dtype, equal_to(numpy.float32))
+
+
+def test_predict_in_chunks_and_batches():
+    rng = numpy.random.default_rng(2)
+    points = rng.standard_normal((5000, 4))
+    model = KmeansModel(["a", "b", "c"], points[:3], block_distance, centroid_index="kd_tree")
+    expected = KmeansModel(["a", "b", "c"], points[:3], block_distance).predict(points)
+    assert_that(model.predict(points, chunk_size=333).tolist(), equal_to(expected.tolist()))
+    batches = numpy.concatenate(list(model.predict_batches(numpy.array_split(points, 7))))
+    assert_that(batches.tolist(), equal_to(expected.tolist()))
+
+
+def test_save_and_load():
+    rng = numpy.random.default_rng(3)
+    points = rng.standard_normal((1000, 3))
+    directory = tempfile.mkdtemp()
+    for distance_function in (block_distance, minkowski_metric(3)):
+        model = KmeansModel(["x", "y", "z", "w"], points[:4], distance_function)
+        path = os.path.join(directory, "model.npz")
+        model.save(path)
+        loaded = KmeansModel.load(path)
+        assert_that(loaded.names, equal_to(model.names))
+        assert_that(loaded.centroids.tolist(), equal_to(model.centroids.tolist()))
+        assert_that(loaded.centroids.dtype, equal_to(model.centroids.dtype))
+        assert_that(loaded.predict(points).tolist(), equal_to(model.predict(points).tolist()))
+        os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    test_predict_reproduces_clustering()
+    test_float32_model_predicts_clusterer_labels()
+    test_predict_in_chunks_and_batches()
+    test_save_and_load()
+    print("Looks good for the k-means model")
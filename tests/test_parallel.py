@@ -0,0 +1,60 @@
+import multiprocessing
+
+import numpy
+from hamcrest import assert_that, equal_to, close_to
+
+from thb_dmc.kmeans import ArrayKmeanClusterer, kmeans
+
+
+def test_sharded_matches_serial():
+    rng = numpy.random.RandomState(21)
+    centers = rng.uniform(-10, 10, size=(4, 2))
+    points = centers[rng.randint(4, size=2000)] + rng.normal(size=(2000, 2))
+    start = tuple(("c{}".format(i), tuple(point)) for i, point in enumerate(points[:4].tolist()))
+
+    serial = [labels.tolist() for labels in ArrayKmeanClusterer(points, start)]
+    with ArrayKmeanClusterer(points, start, n_jobs=3, chunk_size=100) as clusterer:
+        sharded = [labels.tolist() for labels in clusterer]
+        final = clusterer.final_result()
+        centroids = clusterer.centroids
+
+    assert_that(sharded, equal_to(serial))
+    assert_that(final.tolist(), equal_to(serial[-1]))
+    serial_centroids = ArrayKmeanClusterer(points, start)
+    serial_centroids.final_result()
+    for sharded_value, serial_value in zip(centroids.ravel(), serial_centroids.centroids.ravel()):
+        assert_that(sharded_value, close_to(serial_value, 0.0000001))
+
+
+def test_sharded_kmeans_ueb_1_2_c():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    assert_that(kmeans(points, start, n_jobs=2), equal_to(kmeans(points, start)))
+
+
+def test_copies_share_and_close_the_workers():
+    rng = numpy.random.RandomState(22)
+    points = rng.normal(size=(500, 2))
+    start = tuple(("c{}".format(i), tuple(point)) for i, point in enumerate(points[:3].tolist()))
+
+    clusterer = ArrayKmeanClusterer(points, start, n_jobs=2)
+    iterations = [iter(clusterer), iter(clusterer)]
+    for iteration in iterations:
+        next(iteration)
+    clusterer.final_result()
+    assert_that(len(multiprocessing.active_children()), equal_to(2))
+    # Closing any copy stops the workers of all of them
+    clusterer.close()
+    assert_that(multiprocessing.active_children(), equal_to([]))
+    assert_that(next(iterations[0]).tolist(), equal_to(next(iterations[1]).tolist()))
+    iterations[0].close()
+
+    kmeans([tuple(point) for point in points.tolist()], start, n_jobs=2)
+    assert_that(multiprocessing.active_children(), equal_to([]))
+
+
+if __name__ == '__main__':
+    test_sharded_matches_serial()
+    test_sharded_kmeans_ueb_1_2_c()
+    test_copies_share_and_close_the_workers()
+    print("Looks good for the sharded k-means")
@@ -0,0 +1,74 @@
+import os
+
+import numpy
+from hamcrest import assert_that, equal_to
+
+from thb_dmc.csv_reader import read_csv
+from thb_dmc.preprocessing import RunningStatistics, running_statistics, min_max_scale, standardize, \
+    scale_in_place
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+def _values(seed=1):
+    rng = numpy.random.RandomState(seed)
+    # Far from the origin, where sums of squares lose precision
+    return 1e6 + rng.normal(size=(1000, 3)) @ numpy.array(((1.0, 0.5, 0.0), (0.0, 2.0, 0.3), (0.0, 0.0, 0.1)))
+
+
+def test_statistics_of_chunks_match_numpy():
+    values = _values()
+    statistics = running_statistics(values[start:start + 77] for start in range(0, 1000, 77))
+
+    assert_that(statistics.count, equal_to(1000))
+    assert_that(statistics.minimum.tolist(), equal_to(values.min(axis=0).tolist()))
+    assert_that(statistics.maximum.tolist(), equal_to(values.max(axis=0).tolist()))
+    assert_that(numpy.allclose(statistics.mean, values.mean(axis=0), rtol=0, atol=1e-8), equal_to(True))
+    assert_that(numpy.allclose(statistics.variance(), values.var(axis=0)), equal_to(True))
+    assert_that(numpy.allclose(statistics.std(ddof=1), values.std(axis=0, ddof=1)), equal_to(True))
+    assert_that(numpy.allclose(statistics.covariance(ddof=1), numpy.cov(values.T)), equal_to(True))
+    assert_that(numpy.allclose(statistics.correlation(), numpy.corrcoef(values.T)), equal_to(True))
+
+
+def test_merged_statistics_match_one_pass():
+    values = _values(2)
+    first = RunningStatistics().update(values[:300])
+    second = RunningStatistics(3).update(values[300:])
+    merged = RunningStatistics().merge(first).merge(second).merge(RunningStatistics())
+
+    expected = RunningStatistics().update(values)
+    assert_that(merged.count, equal_to(1000))
+    assert_that(numpy.allclose(merged.mean, expected.mean, rtol=0, atol=1e-8), equal_to(True))
+    assert_that(numpy.allclose(merged.covariance(), expected.covariance()), equal_to(True))
+
+
+def test_scaling_in_place():
+    values = _values(3)
+    statistics = RunningStatistics().update(values)
+
+    scaled = min_max_scale(values.copy(), statistics)
+    assert_that(numpy.allclose(scaled.min(axis=0), 0.0) and numpy.allclose(scaled.max(axis=0), 1.0),
+                equal_to(True))
+    scaled = standardize(values.copy(), statistics)
+    assert_that(numpy.allclose(scaled.mean(axis=0), 0.0) and numpy.allclose(scaled.std(axis=0), 1.0),
+                equal_to(True))
+
+    constant = numpy.ones((5, 2))
+    assert_that(standardize(constant, RunningStatistics().update(constant)).tolist(), equal_to([[0.0, 0.0]] * 5))
+
+
+def test_scale_in_place_chunk_by_chunk():
+    two = read_csv(os.path.join(DATA, "two.csv"), delimiter=" ").values
+    expected = (two - two.mean(axis=0)) / two.std(axis=0)
+
+    statistics = scale_in_place(two, "z-score", chunk_rows=17)
+    assert_that(numpy.allclose(two, expected), equal_to(True))
+    assert_that(numpy.allclose(statistics.correlation(), numpy.corrcoef(expected.T)), equal_to(True))
+
+
+if __name__ == '__main__':
+    test_statistics_of_chunks_match_numpy()
+    test_merged_statistics_match_one_pass()
+    test_scaling_in_place()
+    test_scale_in_place_chunk_by_chunk()
+    print("Looks good for the preprocessing")
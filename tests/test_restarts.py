@@ -0,0 +1,65 @@
+import numpy
+from hamcrest import assert_that, equal_to, calling, raises
+
+from thb_dmc.kmeans import KmeanClusterer, kmeans
+from thb_dmc.restarts import best_of_n_kmeans, seed_centroids
+from thb_dmc.seeding import kmeans_plus_plus, kmeans_parallel
+
+
+def _blobs(seed, num_points=900):
+    rng = numpy.random.RandomState(seed)
+    centers = numpy.array(((0.0, 0.0), (20.0, 0.0), (0.0, 20.0)))
+    labels = rng.randint(3, size=num_points)
+    return centers[labels] + rng.normal(size=(num_points, 2)), labels
+
+
+def test_seedings_choose_distinct_points():
+    points, _ = _blobs(1)
+    for seeding in (kmeans_plus_plus, kmeans_parallel):
+        centroids = seeding(points, 3, random_state=4)
+        assert_that([name for name, _ in centroids], equal_to(['c1', 'c2', 'c3']))
+        assert_that(len({centroid for _, centroid in centroids}), equal_to(3))
+        assert_that(all(centroid in set(map(tuple, points.tolist())) for _, centroid in centroids), equal_to(True))
+
+
+def test_best_of_n_finds_blobs():
+    points, truth = _blobs(2)
+    result = best_of_n_kmeans(points, 3, n_init=4, random_state=8)
+
+    # The same partition as the generating blobs, whatever the order of the labels
+    pairs = set(zip(truth.tolist(), result.labels.tolist()))
+    assert_that(len(pairs), equal_to(3))
+    assert_that(result.restarts_finished + result.restarts_stopped_early, equal_to(4))
+
+
+def test_concurrent_restarts_match_serial():
+    points, _ = _blobs(3)
+    serial = best_of_n_kmeans(points, 4, n_init=4, random_state=5, early_stopping=False,
+                              selection="davies_bouldin_index")
+    concurrent = best_of_n_kmeans(points, 4, n_init=4, random_state=5, early_stopping=False,
+                                  selection="davies_bouldin_index", n_jobs=2)
+
+    assert_that(concurrent.restart, equal_to(serial.restart))
+    assert_that(concurrent.labels.tolist(), equal_to(serial.labels.tolist()))
+    assert_that(concurrent.davies_bouldin_index, equal_to(serial.davies_bouldin_index))
+
+
+def test_kmeans_seeds_the_best_restart():
+    points, _ = _blobs(4, num_points=300)
+    point_tuples = [tuple(point) for point in points.tolist()]
+    best = best_of_n_kmeans(points, 3, n_init=3, random_state=6, early_stopping=False)
+
+    clusters = kmeans(point_tuples, k=3, init="k-means++", n_init=3, random_state=6)
+    assert_that(sorted(len(cluster) for cluster in clusters.values()),
+                equal_to(sorted(numpy.bincount(best.labels).tolist())))
+    assert_that(seed_centroids(points, 3, random_state=7),
+                equal_to(best_of_n_kmeans(points, 3, n_init=1, random_state=7).initial_centroids))
+    assert_that(calling(KmeanClusterer).with_args(point_tuples, init="k-means++"), raises(ValueError))
+
+
+if __name__ == '__main__':
+    test_seedings_choose_distinct_points()
+    test_best_of_n_finds_blobs()
+    test_concurrent_restarts_match_serial()
+    test_kmeans_seeds_the_best_restart()
+    print("Looks good for the k-means restarts")
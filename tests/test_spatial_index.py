@@ -0,0 +1,64 @@
+import numpy
+from hamcrest import assert_that, equal_to, less_than, calling, raises
+
+from thb_dmc.kmeans import assign_labels, ArrayKmeanClusterer, assign_points_to_clusters
+from thb_dmc.metrics import minkowski_metric
+from thb_dmc.spatial_index import build_centroid_index, CentroidIndex, KDTree, BallTree
+from thb_dmc.vector_util import block_distance, chebyshev_distance, cosine_distance
+
+
+def test_same_labels_as_linear_scan():
+    rng = numpy.random.default_rng(5)
+    centroids = rng.uniform(-10, 10, size=(700, 3))
+    points = centroids[rng.integers(700, size=20000)] + 0.2 * rng.standard_normal((20000, 3))
+    for distance_function in (None, block_distance, chebyshev_distance, minkowski_metric(3)):
+        arguments = {} if distance_function is None else {"distance_function": distance_function}
+        expected = assign_labels(points, centroids, **arguments)
+        for kind in ("kd_tree", "ball_tree"):
+            index = build_centroid_index(centroids, kind=kind, leaf_size=8, **arguments)
+            assert_that(index.assign(points).tolist(), equal_to(expected.tolist()))
+            assert_that(index.distance_evaluations, less_than(points.shape[0] * centroids.shape[0]))
+
+
+def test_ties_go_to_lowest_index():
+    rng = numpy.random.default_rng(6)
+    centroids = rng.integers(0, 4, size=(200, 2)).astype(float)
+    points = rng.integers(0, 4, size=(3000, 2)).astype(float)
+    expected = assign_labels(points, centroids)
+    for kind in ("kd_tree", "ball_tree"):
+        labels, distances = build_centroid_index(centroids, kind=kind, leaf_size=4).query(points, chunk_size=1000)
+        assert_that(labels.tolist(), equal_to(expected.tolist()))
+        assert_that(distances.tolist(), equal_to(numpy.linalg.norm(points - centroids[labels], axis=1).tolist()))
+
+
+def test_clusterer_with_centroid_index():
+    points = ((1, 3), (3, 3), (3, 4), (4, 2), (5, 2), (5, 8), (8, 3), (8, 7))
+    start = (('c1', (3, 2),), ('c2', (6, 2)))
+    plain = ArrayKmeanClusterer(points, start)
+    indexed = ArrayKmeanClusterer(points, start, centroid_index="kd_tree")
+    assert_that([labels.tolist() for labels in indexed], equal_to([labels.tolist() for labels in plain]))
+    assert_that(assign_points_to_clusters(points, start, centroid_index="ball_tree"),
+                equal_to(assign_points_to_clusters(points, start)))
+
+
+def test_unsupported_distances():
+    centroids = numpy.eye(3)
+    assert_that(calling(KDTree).with_args(centroids, cosine_distance), raises(ValueError))
+    assert_that(calling(BallTree).with_args(centroids, cosine_distance), raises(ValueError))
+
+
+def test_incomplete_index_can_not_be_created():
+    class UnboundedTree(CentroidIndex):
+        def _bound_nodes(self):
+            pass
+
+    assert_that(calling(UnboundedTree).with_args(numpy.eye(3)), raises(TypeError))
+
+
+if __name__ == '__main__':
+    test_same_labels_as_linear_scan()
+    test_ties_go_to_lowest_index()
+    test_clusterer_with_centroid_index()
+    test_unsupported_distances()
+    test_incomplete_index_can_not_be_created()
+    print("Looks good for the centroid index")
@@ -1,3 +1,3 @@
 import sys
-if not (sys.version_info[0] == 3 and sys.version_info[1] >= 6):
-    raise Exception("Must be using Python 3.6 or higher")
+if not (sys.version_info[0] == 3 and sys.version_info[1] >= 8):
+    raise Exception("Must be using Python 3.8 or higher")
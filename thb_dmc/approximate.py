@@ -0,0 +1,248 @@
+"""
+Module implementing approximate k-means and an approximate Davies-Bouldin-Index for very large numbers of points.
+
+Both work on a weighted sample of the points instead of all of them and report how far off the answer may be
+as a confidence interval. The sample is either uniform, drawn in one pass over a matrix or a stream of batches,
+or a lightweight coreset, which prefers points far from the mean and weights them down accordingly.
+
+Based on:
+O. Bachem, M. Lucic and A. Krause. Scalable k-Means Clustering via Lightweight Coresets.
+Proceedings of the 24th ACM SIGKDD International Conference on Knowledge Discovery & Data Mining, 1119–1127, 2018.
+DOI: 10.1145/3219819.3219973
+
+"""
+import statistics
+from typing import Collection, Iterable, NamedTuple, Tuple, Union
+
+import numpy
+
+from thb_dmc.convergence import StoppingCriteria
+from thb_dmc.davies_bouldin_index import labelled_davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer
+from thb_dmc.metrics import paired_distances, pairwise_distances
+from thb_dmc.vector_util import Vector, NamedVector, Distance_Function, euclidean_distance, Matrix, as_matrix, \
+    chunk_bounds
+
+SAMPLINGS = ("uniform", "coreset")
+
+
+class Estimate(NamedTuple):
+    """
+    An approximate value with a confidence interval.
+    """
+    value: float
+    lower: float
+    upper: float
+    confidence: float
+
+
+class ApproximateClustering(NamedTuple):
+    """
+    The result of approximate_kmeans.
+    """
+    # Final centroids, e.g. the initial centroids of an exact KmeanClusterer run
+    centroids: Collection[NamedVector]
+    # (m, d) matrix of the sampled points
+    sample: Matrix
+    # Weight of every sampled point, the number of points it stands for
+    weights: numpy.ndarray
+    # Index of the centroid of every sampled point
+    labels: numpy.ndarray
+    # Estimated inertia of the centroids on all points
+    inertia: Estimate
+    # Number of points the sample was drawn from
+    num_points: int
+
+
+def uniform_sample(points: Union[Matrix, Iterable[Collection[Vector]]],
+                   size: int,
+                   random_state=None) -> Tuple[Matrix, numpy.ndarray, int]:
+    """
+    Draws a uniform sample without replacement in one pass over the points.
+
+    The rows of a matrix are read in ascending order, so a numpy.memmap is read sequentially. Batches, e.g. the
+    values of read_csv_chunks, are consumed one by one with reservoir sampling: every point gets a random key and
+    the points with the size largest keys are kept.
+
+    :param points: (n, d) matrix of points or iterable of batches of points
+    :param size: Number of points to sample. All points are kept if there are fewer.
+    :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+    :return: (m, d) matrix of sampled points, their weights n / m and the number of points n
+    """
+    rng = numpy.random.default_rng(random_state)
+    if isinstance(points, numpy.ndarray):
+        num_points = points.shape[0]
+        indices = numpy.sort(rng.choice(num_points, min(size, num_points), replace=False))
+        sample = as_matrix(points[indices])
+    else:
+        sample = None
+        keys = numpy.empty(0)
+        num_points = 0
+        for batch in points:
+            batch = as_matrix(batch)
+            num_points += batch.shape[0]
+            batch_keys = rng.random(batch.shape[0])
+            if sample is None:
+                sample = batch[:0]
+            sample = numpy.concatenate((sample, batch))
+            keys = numpy.concatenate((keys, batch_keys))
+            if len(keys) > size:
+                kept = numpy.argpartition(keys, len(keys) - size)[len(keys) - size:]
+                sample = sample[kept]
+                keys = keys[kept]
+        if sample is None:
+            sample = numpy.empty((0, 0))
+    weights = numpy.full(sample.shape[0], num_points / max(sample.shape[0], 1))
+    return sample, weights, num_points
+
+
+def lightweight_coreset(points: Matrix,
+                        size: int,
+                        distance_function: Distance_Function = euclidean_distance,
+                        random_state=None,
+                        chunk_size: int = None) -> Tuple[Matrix, numpy.ndarray, int]:
+    """
+    Draws a lightweight coreset of the points: size points with replacement, each one with probability
+    q(x) = 1 / (2n) + d(x, mean)^2 / (2 * sum of all d(x', mean)^2), weighted by 1 / (size * q(x)).
+
+    Outlying points, which change the centroids the most, are more likely to be sampled than with a uniform
+    sample. Needs two passes over the points, one for the mean and one for the distances to it.
+
+    :param points: (n, d) matrix of points, one point per row. A numpy.memmap is read chunk by chunk.
+    :param size: Number of points to sample
+    :param distance_function: Function used to calculate the distance between a point and the mean
+    :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+    :param chunk_size: Number of points whose distances are calculated at once
+    :return: (size, d) matrix of sampled points, their weights and the number of points n
+    """
+    rng = numpy.random.default_rng(random_state)
+    num_points = points.shape[0]
+    if num_points == 0:
+        return as_matrix(points), numpy.zeros(0), 0
+
+    mean = numpy.zeros(points.shape[1])
+    for start, stop in chunk_bounds(num_points, points.shape[1], chunk_size):
+        mean += as_matrix(points[start:stop]).sum(axis=0, dtype=float)
+    mean /= num_points
+    squared_distances = numpy.empty(num_points)
+    for start, stop in chunk_bounds(num_points, points.shape[1], chunk_size):
+        squared_distances[start:stop] = pairwise_distances(as_matrix(points[start:stop]), mean[numpy.newaxis, :],
+                                                           distance_function)[:, 0] ** 2
+
+    total = squared_distances.sum()
+    probabilities = numpy.full(num_points, 1.0 / num_points)
+    if total > 0.0:
+        probabilities = 0.5 * probabilities + 0.5 * squared_distances / total
+    indices = numpy.sort(rng.choice(num_points, size, p=probabilities / probabilities.sum()))
+    return as_matrix(points[indices]), 1.0 / (size * probabilities[indices]), num_points
+
+
+def approximate_kmeans(points: Union[Matrix, Iterable[Collection[Vector]]],
+                       initial_centroids: Collection[NamedVector],
+                       sample_size: int = 10000,
+                       sampling: str = "uniform",
+                       distance_function: Distance_Function = euclidean_distance,
+                       confidence: float = 0.95,
+                       random_state=None,
+                       stopping_criteria: StoppingCriteria = None) -> ApproximateClustering:
+    """
+    Clusters a weighted sample of the points instead of all of them.
+
+    The inertia of the resulting centroids on all points is estimated from the sample: as n times the mean
+    squared distance of the uniformly sampled points, or as the weighted sum over the coreset. The interval assumes
+    the estimate is normally distributed. It is measured on the points the centroids were fitted to, so it is
+    slightly optimistic for small samples.
+
+    The centroids are close to the ones of an exact run and make a good start for one:
+    KmeanClusterer(points, result.centroids) usually converges after a few iterations.
+
+    :param points: (n, d) matrix of points or, for uniform sampling, an iterable of batches of points
+    :param initial_centroids: Collection of initial centroids, also implicitly stating the k of k-means
+    :param sample_size: Number of points to sample
+    :param sampling: "uniform" or "coreset", see uniform_sample and lightweight_coreset
+    :param distance_function: Function to calculate the distance between vectors
+    :param confidence: Probability of the true inertia lying in the reported interval
+    :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+    :param stopping_criteria: Criteria ending the iterations on the sample early, see thb_dmc.convergence
+    :return: The centroids, the sample and the estimated inertia
+    """
+    if sampling not in SAMPLINGS:
+        raise ValueError("Unknown sampling {}, expected one of {}".format(sampling, SAMPLINGS))
+    if sampling == "coreset":
+        if not isinstance(points, numpy.ndarray):
+            raise ValueError("A coreset needs two passes over the points, it can not be drawn from batches")
+        sample, weights, num_points = lightweight_coreset(points, sample_size, distance_function, random_state)
+    else:
+        sample, weights, num_points = uniform_sample(points, sample_size, random_state)
+    if sample.shape[0] == 0:
+        raise ValueError("Can not cluster without any point")
+
+    clusterer = ArrayKmeanClusterer(sample, initial_centroids, distance_function,
+                                    stopping_criteria=stopping_criteria, weights=weights)
+    labels = clusterer.final_result()
+
+    squared_distances = paired_distances(sample, clusterer.assigned_centroids[labels], distance_function) ** 2
+    # Every sampled point contributes an unbiased estimate of the inertia of all points
+    contributions = sample.shape[0] * weights * squared_distances
+    finite_population = 1.0 - sample.shape[0] / num_points if sampling == "uniform" else 1.0
+    inertia = _normal_estimate(contributions, confidence, finite_population)
+    return ApproximateClustering(clusterer.named_centroids(), sample, weights, labels, inertia, num_points)
+
+
+def approximate_davies_bouldin_index(points: Matrix,
+                                     labels: numpy.ndarray,
+                                     sample_size: int = 10000,
+                                     bootstraps: int = 200,
+                                     confidence: float = 0.95,
+                                     random_state=None,
+                                     dispersion_distance_func: Distance_Function = euclidean_distance,
+                                     cluster_distance_func: Distance_Function = euclidean_distance,
+                                     q: int = 1) -> Estimate:
+    """
+    Estimates the Davies-Bouldin-Index of a clustering given as a label per point from a uniform sample of the
+    points, see labelled_davies_bouldin_index.
+
+    The index is not a mean over the points, so its interval is a bootstrap percentile interval: the index is
+    recalculated for resamples of the sample, drawn as multinomial weights of the sampled points.
+    If the sample holds all points, the index is exact and the interval has no width.
+
+    :param points: (n, d) matrix of points, one point per row. A numpy.memmap is read once, in ascending order.
+    :param labels: Integer array of length n, the cluster index of every point
+    :param sample_size: Number of points to sample
+    :param bootstraps: Number of resamples the interval is calculated from
+    :param confidence: Probability of the index of all points lying in the reported interval
+    :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+    :param dispersion_distance_func: Function used to calculate the distance for the dispersion.
+    :param cluster_distance_func: Function used to calculate the distance between two cluster centroids.
+    :param q: exponent q of the dispersion function.
+    :return: The estimated index
+    """
+    rng = numpy.random.default_rng(random_state)
+    num_points = points.shape[0]
+    indices = numpy.sort(rng.choice(num_points, min(sample_size, num_points), replace=False))
+    sample = as_matrix(points[indices])
+    sample_labels = numpy.asarray(labels)[indices]
+
+    def index(weights=None):
+        return labelled_davies_bouldin_index(sample, sample_labels, dispersion_distance_func=dispersion_distance_func,
+                                             cluster_distance_func=cluster_distance_func, q=q, weights=weights)
+
+    value = index()
+    if len(indices) == num_points:
+        return Estimate(value, value, value, confidence)
+    resampled = [index(rng.multinomial(len(indices), numpy.full(len(indices), 1.0 / len(indices))))
+                 for _ in range(bootstraps)]
+    lower, upper = numpy.quantile(resampled, [(1.0 - confidence) / 2.0, (1.0 + confidence) / 2.0])
+    return Estimate(value, float(lower), float(upper), confidence)
+
+
+def _normal_estimate(contributions: numpy.ndarray, confidence: float, finite_population: float) -> Estimate:
+    """
+    Mean of the contributions with a normal confidence interval.
+    """
+    value = float(contributions.mean())
+    if len(contributions) < 2:
+        return Estimate(value, value, value, confidence)
+    standard_error = float(contributions.std(ddof=1)) * (max(finite_population, 0.0) / len(contributions)) ** 0.5
+    z = statistics.NormalDist().inv_cdf((1.0 + confidence) / 2.0)
+    return Estimate(value, value - z * standard_error, value + z * standard_error, confidence)
@@ -0,0 +1,120 @@
+"""
+Module implementing the result of a clustering: a label per point and a centroid per cluster.
+"""
+from typing import Collection, Dict, Sequence
+
+import numpy
+
+from thb_dmc.vector_util import Vector, NamedVector, Matrix
+
+
+class Clustering:
+    """
+    A clustering of n points into k clusters, backed by an integer label array and a (k, d) centroid matrix.
+
+    Nothing is stored per point beyond its label. The clusters are only grouped when their members are
+    asked for: one stable sort of the labels gives the indices of all clusters at once, after which
+    the members of every cluster are a view into that index array. Duplicate points stay separate points.
+    """
+    __slots__ = ("labels", "centroids", "names", "points", "_sizes", "_order", "_bounds", "_grouped_points")
+
+    def __init__(self, labels: numpy.ndarray,
+                 centroids: Matrix,
+                 names: Sequence[str],
+                 points: Matrix = None,
+                 sizes: numpy.ndarray = None):
+        """
+
+        :param labels: Integer array of length n, the index of the cluster of every point. Not copied.
+        :param centroids: (k, d) matrix of centroids, one per cluster. Not copied.
+        :param names: Names of the clusters
+        :param points: (n, d) matrix of the clustered points. Only needed for member_points and to_dict.
+        :param sizes: Number of points per cluster, if already known. Counted from the labels otherwise.
+        """
+        self.labels = labels
+        self.centroids = centroids
+        self.names = tuple(names)
+        self.points = points
+        self._sizes = sizes
+        self._order = None
+        self._bounds = None
+        self._grouped_points = None
+
+    def __len__(self) -> int:
+        """
+        :return: Number of clusters, including empty ones
+        """
+        return len(self.names)
+
+    @property
+    def sizes(self) -> numpy.ndarray:
+        """Number of points per cluster. Counted once, on first access."""
+        if self._sizes is None:
+            self._sizes = numpy.bincount(self.labels, minlength=len(self.names))
+        return self._sizes
+
+    def size(self, cluster: int) -> int:
+        """
+        :param cluster: Index of the cluster
+        :return: Number of points of the cluster
+        """
+        return int(self.sizes[cluster])
+
+    def members(self, cluster: int) -> numpy.ndarray:
+        """
+        :param cluster: Index of the cluster
+        :return: Read-only view of the ascending indices of the points of the cluster
+        """
+        self._group()
+        return self._order[self._bounds[cluster]:self._bounds[cluster + 1]]
+
+    def member_points(self, cluster: int) -> Matrix:
+        """
+        The points of all clusters are copied once into one matrix ordered by cluster,
+        so the points of every cluster are a view of consecutive rows.
+
+        :param cluster: Index of the cluster
+        :return: Read-only (size, d) view of the points of the cluster
+        """
+        if self.points is None:
+            raise ValueError("The clustering holds no points")
+        self._group()
+        if self._grouped_points is None:
+            self._grouped_points = self.points[self._order]
+            self._grouped_points.flags.writeable = False
+        return self._grouped_points[self._bounds[cluster]:self._bounds[cluster + 1]]
+
+    def _group(self):
+        if self._order is None:
+            self._order = numpy.argsort(self.labels, kind="stable")
+            self._order.flags.writeable = False
+            self._bounds = numpy.concatenate(([0], numpy.cumsum(self.sizes)))
+
+    def named_centroids(self) -> Collection[NamedVector]:
+        """
+        :return: Tuple of NamedVectors, one per cluster
+        """
+        return tuple((name, tuple(centroid)) for name, centroid in zip(self.names, self.centroids.tolist()))
+
+    def to_dict(self, points: Sequence[Vector] = None,
+                named_centroids: Collection[NamedVector] = None) -> Dict[NamedVector, Collection[Vector]]:
+        """
+        Builds the dictionary of clusters used by kmeans and assign_points_to_clusters.
+
+        :param points: Vectors to put into the clusters, in the order of the labels.
+                        Defaults to tuples of the rows of the point matrix.
+        :param named_centroids: Keys of the clusters, in the order of the centroids. Defaults to named_centroids.
+        :return: Dictionary of clusters. Keys are NamedVectors, Values are sets of Vectors. Empty
+                        Clusters are contained as key with an empty set as value.
+        """
+        if points is None:
+            if self.points is None:
+                raise ValueError("The clustering holds no points")
+            points = [tuple(point) for point in self.points.tolist()]
+        if named_centroids is None:
+            named_centroids = self.named_centroids()
+        result = {}
+        for cluster, named_centroid in enumerate(named_centroids):
+            cluster_points = (points[index] for index in self.members(cluster).tolist())
+            result.setdefault(named_centroid, set()).update(cluster_points)
+        return result
@@ -0,0 +1,69 @@
+"""
+Module implementing the criteria that stop the iterations of k-means before the centroids stop changing exactly.
+"""
+from enum import Enum
+from typing import NamedTuple, Optional
+
+
+class StopReason(Enum):
+    """
+    Why a k-means clusterer stopped iterating.
+    """
+    # The new centroids are exactly the previous ones
+    CONVERGED = "converged"
+    MAX_CENTROID_SHIFT = "max_centroid_shift"
+    RELATIVE_INERTIA_IMPROVEMENT = "relative_inertia_improvement"
+    REASSIGNED_FRACTION = "reassigned_fraction"
+    MAX_ITERATIONS = "max_iterations"
+    TIME_BUDGET = "time_budget"
+
+
+class StoppingCriteria(NamedTuple):
+    """
+    Criteria ending k-means before the centroids are exactly the same as in the previous iteration.
+    Every criterion is disabled when None, the iterations stop as soon as one of the enabled ones is met.
+
+    The clustering of the last iteration is kept, so with a tolerance it can differ slightly from the exact one.
+    """
+    # Stop once no centroid moved further than this distance in an iteration
+    max_centroid_shift: float = None
+    # Stop once the inertia improved by at most this fraction of the previous inertia.
+    # Costs an extra pass over the points per iteration.
+    relative_inertia_improvement: float = None
+    # Stop once at most this fraction of the points changed their cluster
+    reassigned_fraction: float = None
+    # Stop after this many iterations
+    max_iterations: int = None
+    # Stop once the iterations took this many seconds of wall time
+    time_budget: float = None
+
+    def stop_reason(self,
+                    iteration: int,
+                    seconds: float,
+                    centroid_shift: float = None,
+                    inertia_improvement: float = None,
+                    reassigned_fraction: float = None) -> Optional[StopReason]:
+        """
+        Checks the criteria after an iteration. Measurements that are None are not checked.
+
+        :param iteration: Number of iterations calculated so far
+        :param seconds: Wall time in seconds of all iterations so far
+        :param centroid_shift: Largest distance a centroid moved in the iteration
+        :param inertia_improvement: Decrease of the inertia in the iteration relative to the previous inertia
+        :param reassigned_fraction: Fraction of the points that changed their cluster in the iteration
+        :return: The first criterion that is met, None if the iterations shall go on
+        """
+        if centroid_shift is not None and self.max_centroid_shift is not None \
+                and centroid_shift <= self.max_centroid_shift:
+            return StopReason.MAX_CENTROID_SHIFT
+        if inertia_improvement is not None and self.relative_inertia_improvement is not None \
+                and inertia_improvement <= self.relative_inertia_improvement:
+            return StopReason.RELATIVE_INERTIA_IMPROVEMENT
+        if reassigned_fraction is not None and self.reassigned_fraction is not None \
+                and reassigned_fraction <= self.reassigned_fraction:
+            return StopReason.REASSIGNED_FRACTION
+        if self.max_iterations is not None and iteration >= self.max_iterations:
+            return StopReason.MAX_ITERATIONS
+        if self.time_budget is not None and seconds >= self.time_budget:
+            return StopReason.TIME_BUDGET
+        return None
@@ -0,0 +1,189 @@
+"""
+Module implementing a reader of CSV files that parses them in one pass into typed arrays, chunk by chunk.
+
+Every chunk is converted as a whole: the fields of a chunk form one string array, the boolean words and empty
+fields are replaced in it and the array is converted to numbers at once. Empty fields become NaN, which can be
+replaced by the mean or median of their column afterwards.
+"""
+import csv
+from typing import Collection, Iterator, NamedTuple, Optional
+
+import numpy
+
+from thb_dmc.vector_util import Matrix
+
+DEFAULT_CHUNK_ROWS = 65536
+IMPUTATIONS = ("mean", "median")
+
+
+class CsvChunk(NamedTuple):
+    """
+    Consecutive rows of a CSV file.
+    """
+    # (m, d) array of the selected columns
+    values: Matrix
+    # Array of the m fields of the label column, None without a label column
+    labels: Optional[numpy.ndarray]
+
+
+class ColumnStatistics:
+    """
+    Number of present values and their sum per column, accumulated over the chunks of a CSV file.
+    Missing values (NaN) are left out.
+    """
+
+    def __init__(self):
+        self.counts = None
+        self.sums = None
+
+    def update(self, values: Matrix):
+        """
+        Adds the values of a chunk.
+
+        :param values: (m, d) array
+        """
+        present = ~numpy.isnan(values)
+        if self.counts is None:
+            self.counts = numpy.zeros(values.shape[1], dtype=numpy.int64)
+            self.sums = numpy.zeros(values.shape[1])
+        self.counts += present.sum(axis=0)
+        self.sums += numpy.where(present, values, 0.0).sum(axis=0)
+
+    @property
+    def means(self) -> numpy.ndarray:
+        """Mean of the present values per column, NaN for columns without any."""
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return self.sums / self.counts
+
+
+def read_csv_chunks(path: str,
+                    delimiter: str = ",",
+                    columns: Collection[int] = None,
+                    label_column: int = None,
+                    skip_rows: int = 0,
+                    encoding: str = "utf-8",
+                    dtype=numpy.float64,
+                    label_dtype=str,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                    true_values: Collection[str] = ("true", "True", "TRUE"),
+                    false_values: Collection[str] = ("false", "False", "FALSE"),
+                    statistics: ColumnStatistics = None) -> Iterator[CsvChunk]:
+    """
+    Reads a CSV file chunk by chunk.
+
+    :param path: CSV file to read
+    :param delimiter: Delimiter of the fields, " " for files like data/two.csv
+    :param columns: Indices of the columns to read as values. Defaults to all columns except the label column.
+    :param label_column: Index of a column read separately as labels, e.g. the class of a row
+    :param skip_rows: Number of rows to skip at the beginning, e.g. 1 for a header row
+    :param encoding: Encoding of the CSV file, e.g. "iso-8859-1" for data/zoo_german.csv
+    :param dtype: Type of the values. Empty fields are NaN, so only float types can hold them.
+    :param label_dtype: Type of the labels
+    :param chunk_rows: Number of rows per chunk, only the last chunk may be shorter
+    :param true_values: Fields read as 1
+    :param false_values: Fields read as 0
+    :param statistics: Per-column statistics updated with the values of every chunk, e.g. for impute_missing
+    :return: Generator of the chunks
+    """
+    replacements = {"": "nan"}
+    replacements.update((value, "1") for value in true_values)
+    replacements.update((value, "0") for value in false_values)
+
+    with open(path, "r", newline="", encoding=encoding) as csv_file:
+        reader = csv.reader(csv_file, delimiter=delimiter)
+        rows = []
+        num_fields = None
+        for line, row in enumerate(reader):
+            if line < skip_rows or not row:
+                continue
+            if num_fields is None:
+                num_fields = len(row)
+                if columns is None:
+                    columns = [column for column in range(num_fields) if column != label_column]
+                columns = list(columns)
+            elif len(row) != num_fields:
+                raise ValueError("Row {} of {} has {} fields instead of {}".format(line + 1, path, len(row),
+                                                                                  num_fields))
+            rows.append(row)
+            if len(rows) == chunk_rows:
+                yield _convert(rows, columns, label_column, dtype, label_dtype, replacements, statistics)
+                rows = []
+        if rows:
+            yield _convert(rows, columns, label_column, dtype, label_dtype, replacements, statistics)
+
+
+def read_csv(path: str,
+             delimiter: str = ",",
+             columns: Collection[int] = None,
+             label_column: int = None,
+             skip_rows: int = 0,
+             encoding: str = "utf-8",
+             dtype=numpy.float64,
+             label_dtype=str,
+             impute: str = None,
+             chunk_rows: int = DEFAULT_CHUNK_ROWS) -> CsvChunk:
+    """
+    Reads a whole CSV file in one pass, see read_csv_chunks.
+
+    :param impute: Replace missing values by the "mean" or the "median" of their column.
+                        The means are accumulated while reading, the medians are calculated afterwards
+                        from all values, which are in memory anyway.
+    :return: All rows as one chunk
+    """
+    if impute is not None and impute not in IMPUTATIONS:
+        raise ValueError("Unknown imputation {}, expected one of {}".format(impute, IMPUTATIONS))
+    statistics = ColumnStatistics() if impute == "mean" else None
+    chunks = list(read_csv_chunks(path, delimiter=delimiter, columns=columns, label_column=label_column,
+                                  skip_rows=skip_rows, encoding=encoding, dtype=dtype, label_dtype=label_dtype,
+                                  chunk_rows=chunk_rows, statistics=statistics))
+    if not chunks:
+        return CsvChunk(numpy.empty((0, 0), dtype=dtype), None if label_column is None else numpy.empty(0))
+
+    values = chunks[0].values if len(chunks) == 1 else numpy.concatenate([chunk.values for chunk in chunks])
+    labels = None
+    if label_column is not None:
+        labels = numpy.concatenate([chunk.labels for chunk in chunks])
+    if impute == "mean":
+        impute_missing(values, statistics.means)
+    elif impute == "median":
+        impute_missing(values, numpy.nanmedian(values, axis=0))
+    return CsvChunk(values, labels)
+
+
+def impute_missing(values: Matrix, fill: numpy.ndarray) -> Matrix:
+    """
+    Replaces the missing values (NaN) of every column in place.
+
+    :param values: (n, d) float array
+    :param fill: Value per column replacing its missing values
+    :return: The values
+    """
+    rows, columns = numpy.nonzero(numpy.isnan(values))
+    values[rows, columns] = numpy.asarray(fill)[columns]
+    return values
+
+
+def column_medians(values: Matrix) -> numpy.ndarray:
+    """
+    Calculates the median of the present values of every column, one column at a time, so of a numpy.memmap
+    only one column is held in memory at once.
+
+    :param values: (n, d) float array, e.g. a dataset opened with open_dataset
+    :return: Median per column, NaN for columns without any present value
+    """
+    return numpy.array([numpy.nanmedian(values[:, column]) for column in range(values.shape[1])])
+
+
+def _convert(rows, columns, label_column, dtype, label_dtype, replacements, statistics) -> CsvChunk:
+    fields = numpy.array(rows, dtype=str)
+    labels = None
+    if label_column is not None:
+        labels = fields[:, label_column].astype(label_dtype)
+    # Wide enough to hold the replacements
+    fields = fields[:, columns].astype("<U{}".format(max(3, fields.dtype.itemsize // 4)), copy=False)
+    for word, replacement in replacements.items():
+        fields[fields == word] = replacement
+    values = fields.astype(numpy.float64)
+    if statistics is not None:
+        statistics.update(values)
+    return CsvChunk(values.astype(dtype, copy=False), labels)
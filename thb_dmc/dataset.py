@@ -0,0 +1,131 @@
+"""
+Module implementing a binary file format for float matrices, which is memory mapped instead of read.
+
+A dataset file is a 64 byte header followed by the matrix in row-major order:
+
+    bytes 0-7    magic b"THBDMAT\\x01"
+    bytes 8-15   number of rows, unsigned little endian
+    bytes 16-23  number of columns, unsigned little endian
+    bytes 24-31  numpy dtype string, e.g. b"<f8", padded with zero bytes
+    bytes 32-63  reserved, zero
+
+Opening a dataset maps the file into memory, so it is available instantly and only the parts that are used
+are ever read from disk; datasets larger than the memory can be clustered chunk by chunk. The mapped matrix
+is an ordinary numpy array, which kmeans, the Davies-Bouldin-Index and the distance kernels use without copying.
+"""
+import struct
+from typing import Collection, Tuple
+
+import numpy
+
+from thb_dmc.csv_reader import read_csv_chunks, ColumnStatistics, impute_missing, column_medians, IMPUTATIONS, \
+    DEFAULT_CHUNK_ROWS
+from thb_dmc.vector_util import Matrix
+
+MAGIC = b"THBDMAT\x01"
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<8sQQ8s")
+
+
+def write_dataset(path: str, matrix: Matrix, dtype=numpy.float64):
+    """
+    Writes a matrix to a dataset file.
+
+    :param path: File to write to
+    :param matrix: (n, d) matrix
+    :param dtype: Float type the values are stored as
+    """
+    matrix = numpy.asarray(matrix, dtype=dtype)
+    if matrix.ndim != 2:
+        raise ValueError("Expected a matrix, got an array of shape {}".format(matrix.shape))
+    with open(path, "wb") as dataset:
+        dataset.write(_header(matrix.shape[0], matrix.shape[1], matrix.dtype))
+        dataset.write(numpy.ascontiguousarray(matrix).tobytes())
+
+
+def convert_csv(csv_path: str,
+                path: str,
+                delimiter: str = ",",
+                columns: Collection[int] = None,
+                skip_rows: int = 0,
+                encoding: str = "utf-8",
+                dtype=numpy.float64,
+                impute: str = None,
+                chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[int, int]:
+    """
+    Converts a CSV file of numbers into a dataset file, reading it once and chunk by chunk with
+    read_csv_chunks, so files larger than the memory can be converted. Empty fields become NaN.
+
+    :param csv_path: CSV file to read
+    :param path: Dataset file to write
+    :param delimiter: Delimiter of the fields, " " for files like data/two.csv
+    :param columns: Indices of the columns to convert. Defaults to all columns.
+    :param skip_rows: Number of rows to skip at the beginning, e.g. 1 for a header row
+    :param encoding: Encoding of the CSV file
+    :param dtype: Float type the values are stored as
+    :param impute: Replace missing values by the "mean" or the "median" of their column, in the written file.
+                        The means are accumulated while reading, the medians are calculated from the written file
+                        afterwards, one column at a time, see column_medians.
+    :param chunk_rows: Number of rows converted at once
+    :return: Number of rows and columns written
+    """
+    if impute is not None and impute not in IMPUTATIONS:
+        raise ValueError("Unknown imputation {}, expected one of {}".format(impute, IMPUTATIONS))
+    dtype = numpy.dtype(dtype)
+    statistics = ColumnStatistics() if impute == "mean" else None
+    num_rows = 0
+    num_columns = 0
+    with open(path, "wb") as dataset:
+        # The header is written again once the number of rows is known
+        dataset.write(bytes(HEADER_SIZE))
+        for chunk in read_csv_chunks(csv_path, delimiter=delimiter, columns=columns, skip_rows=skip_rows,
+                                     encoding=encoding, dtype=dtype, chunk_rows=chunk_rows, statistics=statistics):
+            dataset.write(numpy.ascontiguousarray(chunk.values).tobytes())
+            num_rows += chunk.values.shape[0]
+            num_columns = chunk.values.shape[1]
+        dataset.seek(0)
+        dataset.write(_header(num_rows, num_columns, dtype))
+
+    if impute is not None and num_rows * num_columns > 0:
+        matrix = open_dataset(path, mode="r+")
+        fill = statistics.means if impute == "mean" else column_medians(matrix)
+        for start in range(0, num_rows, chunk_rows):
+            impute_missing(matrix[start:start + chunk_rows], fill)
+        matrix.flush()
+        del matrix
+    return num_rows, num_columns
+
+
+def open_dataset(path: str, mode: str = "r") -> numpy.memmap:
+    """
+    Maps a dataset file into memory.
+
+    :param path: Dataset file to open
+    :param mode: "r" for a read-only matrix, "r+" to write changes back to the file,
+                        "c" to allow changes that are not written back
+    :return: (n, d) matrix backed by the file
+    """
+    num_rows, num_columns, dtype = read_header(path)
+    if num_rows * num_columns == 0:
+        # Empty files can not be mapped
+        return numpy.empty((num_rows, num_columns), dtype=dtype)
+    return numpy.memmap(path, dtype=dtype, mode=mode, offset=HEADER_SIZE, shape=(num_rows, num_columns))
+
+
+def read_header(path: str) -> Tuple[int, int, numpy.dtype]:
+    """
+    :param path: Dataset file
+    :return: Number of rows, number of columns and dtype of the stored matrix
+    """
+    with open(path, "rb") as dataset:
+        header = dataset.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError("{} is not a dataset file".format(path))
+    _, num_rows, num_columns, dtype = _HEADER.unpack_from(header)
+    return num_rows, num_columns, numpy.dtype(dtype.rstrip(b"\0").decode("ascii"))
+
+
+def _header(num_rows: int, num_columns: int, dtype: numpy.dtype) -> bytes:
+    header = _HEADER.pack(MAGIC, num_rows, num_columns, numpy.dtype(dtype).str.encode("ascii"))
+    return header + bytes(HEADER_SIZE - len(header))
+
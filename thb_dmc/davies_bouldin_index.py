@@ -9,7 +9,12 @@ DOI: 10.1109/TPAMI.1979.4766909
 """
 from typing import Collection
 
-from thb_dmc.vector_util import Vector, Distance_Function, euclidean_distance, simple_centroid, Centroid_Function
+import numpy
+
+from thb_dmc.kmeans import cluster_centroids
+from thb_dmc.metrics import pairwise_distances, paired_distances
+from thb_dmc.vector_util import Vector, Distance_Function, euclidean_distance, simple_centroid, Centroid_Function, \
+    Matrix, as_matrix, chunk_bounds
 
 
 def db_similarity(si, sj, mij: float) -> float:
@@ -30,7 +35,8 @@ def db_similarity(si, sj, mij: float) -> float:
 def db_dispersion(elements: Collection[Vector],
                   centroid_function: Centroid_Function,
                   distance_function: Distance_Function,
-                  q: int) -> float:
+                  q: int,
+                  weights: Collection[float] = None) -> float:
     """
     Implements the proposed dispersion measure of the paper of Davies and Bouldin. Below definition 5, S_i
 
@@ -38,24 +44,46 @@ def db_dispersion(elements: Collection[Vector],
 
     :param elements: Collection of Vectors that are in one cluster.
     :param centroid_function: Function used to calculate the centroid of the cluster.
+                        Called with the weights as keyword argument weights if weights are given.
     :param distance_function: Function used to calculate the distance between to points.
     :param q: Parameter q of the formula in Davies' and Bouldins paper.
+    :param weights: Weight of every element, in the order of the elements, e.g. the number of times it occurs.
+                        Defaults to a weight of one per element.
     :return: A positive float. The dispersion of the cluster.
     """
-    centroid = centroid_function(elements)
+    return _dispersion_around(elements, _centroid(centroid_function, elements, weights), distance_function, q,
+                              weights)
+
+
+def _centroid(centroid_function: Centroid_Function, elements: Collection[Vector], weights: Collection[float]):
+    if weights is None:
+        return centroid_function(elements)
+    return centroid_function(elements, weights=weights)
 
-    dist_sum = 0.0
-    for element in elements:
-        dist_sum += distance_function(element, centroid) ** q
 
-    return (dist_sum / float(len(elements))) ** (1.0 / q)
+def _dispersion_around(elements: Collection[Vector],
+                       centroid: Vector,
+                       distance_function: Distance_Function,
+                       q: int,
+                       weights: Collection[float] = None) -> float:
+    """
+    Dispersion S_i of the elements around an already known centroid, the weighted mean if weights are given.
+    The powered distances are summed up in float64, also for float32 elements.
+    """
+    elements = as_matrix(elements)
+    distances = pairwise_distances(elements, as_matrix([centroid], elements.dtype), distance_function)[:, 0]
+    if weights is None:
+        return float((distances ** q).sum(dtype=float) / float(len(distances))) ** (1.0 / q)
+    weights = numpy.asarray(weights, dtype=float)
+    return float(numpy.dot(distances ** q, weights) / weights.sum()) ** (1.0 / q)
 
 
 def davies_bouldin_index(clusters: Collection[Collection[Vector]],
                          centroid_func: Centroid_Function = simple_centroid,
                          dispersion_distance_func: Distance_Function = euclidean_distance,
                          cluster_distance_func: Distance_Function = euclidean_distance,
-                         q: int = 1) -> float:
+                         q: int = 1,
+                         weights: Collection[Collection[float]] = None) -> float:
     """
     Calculates the Davies-Bouldin-Index of a given clustering.
 
@@ -69,30 +97,178 @@ def davies_bouldin_index(clusters: Collection[Collection[Vector]],
     :param dispersion_distance_func: Function used to calculate the distance for the dispersion.
     :param cluster_distance_func: Function used to calculate the distance between two cluster centroids.
     :param q: exponent q of the dispersion function.
+    :param weights: Weights of the points of every cluster, in the order of the clusters and their points.
+                        Clusters of points that occur several times can be given with every point once and its
+                        count as weight, e.g. the clusters of kmeans with collapse_duplicates.
+                        Defaults to a weight of one per point.
+    :return: A positive float. Measure of similarity.
+    """
+    cluster_list = [list(cluster) for cluster in clusters]
+    weight_list = [None] * len(cluster_list) if weights is None else list(weights)
+    if len(weight_list) != len(cluster_list):
+        raise ValueError("Got weights for {} clusters instead of {}".format(len(weight_list), len(cluster_list)))
+
+    # Every centroid and dispersion is needed k-1 times, so they are calculated once up front
+    centroids = [_centroid(centroid_func, cluster, cluster_weights)
+                 for cluster, cluster_weights in zip(cluster_list, weight_list)]
+    dispersions = [_dispersion_around(cluster, centroid, dispersion_distance_func, q, cluster_weights)
+                   for cluster, centroid, cluster_weights in zip(cluster_list, centroids, weight_list)]
+
+    return _index(as_matrix(centroids), numpy.array(dispersions, dtype=float), cluster_distance_func)
+
+
+def labelled_davies_bouldin_index(points: Matrix,
+                                  labels: numpy.ndarray,
+                                  centroid_func: Centroid_Function = simple_centroid,
+                                  dispersion_distance_func: Distance_Function = euclidean_distance,
+                                  cluster_distance_func: Distance_Function = euclidean_distance,
+                                  q: int = 1,
+                                  chunk_size: int = None,
+                                  weights: numpy.ndarray = None) -> float:
+    """
+    Calculates the Davies-Bouldin-Index of a clustering given as a label per point, e.g. from an ArrayKmeanClusterer.
+
+    Calculates the same index as davies_bouldin_index, in O(k*n + k^2) distance evaluations.
+    Labels that no point has are ignored, like empty clusters. The centroids are calculated in the float type of
+    the points, their coordinate sums and the dispersions are accumulated in float64.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param labels: Integer array of length n, the cluster index of every point
+    :param centroid_func: Function used to calculate the centroid of the cluster.
+    :param dispersion_distance_func: Function used to calculate the distance for the dispersion.
+    :param cluster_distance_func: Function used to calculate the distance between two cluster centroids.
+    :param q: exponent q of the dispersion function.
+    :param chunk_size: Number of points whose distances are calculated at once.
+    :param weights: Float array of length n, the weight of every point, e.g. the counts returned by deduplicate.
+                        Defaults to a weight of one per point.
     :return: A positive float. Measure of similarity.
     """
-    cluster_list = list(clusters)
-    max_similarity_sum = 0
-    for i in range(0, len(cluster_list)):
-        max_similarity = 0
-        for j in range(0, len(cluster_list)):
-            if i == j:
-                continue
-            a_i = simple_centroid(cluster_list[i])
-            a_j = simple_centroid(cluster_list[j])
-            s_i = db_dispersion(elements=cluster_list[i],
-                                centroid_function=centroid_func,
-                                distance_function=dispersion_distance_func,
-                                q=q)
-            s_j = db_dispersion(elements=cluster_list[j],
-                                centroid_function=centroid_func,
-                                distance_function=dispersion_distance_func,
-                                q=q)
-            m_ij = cluster_distance_func(a_i, a_j)
-
-            r_ij = db_similarity(s_i, s_j, m_ij)
-
-            max_similarity = max(max_similarity, r_ij)
-        max_similarity_sum += max_similarity
-
-    return float(max_similarity_sum) / float(len(cluster_list))
+    points = as_matrix(points)
+    labels = numpy.asarray(labels)
+    if weights is not None:
+        weights = numpy.asarray(weights, dtype=float)
+    num_clusters = int(labels.max()) + 1 if labels.size > 0 else 0
+    centroids, counts = cluster_centroids(points, labels, numpy.zeros((num_clusters, points.shape[1]), points.dtype),
+                                          centroid_func, weights)
+
+    powered_dist_sums = numpy.zeros(num_clusters)
+    for start, stop in chunk_bounds(points.shape[0], points.shape[1], chunk_size):
+        powered_distances = paired_distances(points[start:stop], centroids[labels[start:stop]],
+                                             dispersion_distance_func) ** q
+        if weights is not None:
+            powered_distances *= weights[start:stop]
+        powered_dist_sums += numpy.bincount(labels[start:stop], weights=powered_distances, minlength=num_clusters)
+
+    filled = counts > 0
+    dispersions = (powered_dist_sums[filled] / counts[filled]) ** (1.0 / q)
+    return _index(centroids[filled], dispersions, cluster_distance_func)
+
+
+def _index(centroids: Matrix, dispersions: numpy.ndarray, cluster_distance_func: Distance_Function) -> float:
+    """
+    Calculates the index from the centroids and dispersions of all clusters, with all
+    centroid distances M_ij calculated in one batch.
+
+    Raises a ZeroDivisionError if two clusters have the same centroid, as db_similarity divides by their distance.
+    """
+    num_clusters = len(dispersions)
+    if num_clusters < 2:
+        return 0.0
+    centroid_distances = pairwise_distances(centroids, centroids, cluster_distance_func)
+    numpy.fill_diagonal(centroid_distances, numpy.inf)
+    if not centroid_distances.all():
+        first, second = numpy.argwhere(centroid_distances == 0.0)[0]
+        raise ZeroDivisionError("Clusters {} and {} have the same centroid".format(first, second))
+    similarities = db_similarity(dispersions[:, numpy.newaxis], dispersions[numpy.newaxis, :], centroid_distances)
+    numpy.fill_diagonal(similarities, -numpy.inf)
+    return float(similarities.max(axis=1).sum()) / float(num_clusters)
+
+
+class DaviesBouldinTracker:
+    """
+    Keeps track of the Davies-Bouldin-Index of a clustering that changes step by step, e.g. while iterating an
+    ArrayKmeanClusterer.
+
+    Holds per-cluster sufficient statistics - the number of points, their coordinate sums and the sum of their
+    squared norms - and only touches the points whose label changed on every update. For q = 2 the dispersions
+    follow from those statistics, so calculating the index costs O(k^2 + changed points). For any other q the
+    dispersions of the clusters that changed are recalculated from their points.
+
+    Uses the simple centroid and the euclidean distance for both the dispersion and the centroid distances.
+    """
+
+    def __init__(self, points: Matrix, num_clusters: int, q: int = 2):
+        """
+
+        :param points: (n, d) matrix of points, one point per row. Never modified or copied.
+        :param num_clusters: The number of clusters k, labels range from 0 to k-1
+        :param q: exponent q of the dispersion function.
+        """
+        self.points = as_matrix(points)
+        self._q = q
+        # Squared norms are taken relative to the mean of all points, which keeps
+        # sum(|x|^2)/n - |c|^2 from losing precision for points far from the origin
+        self._offset = self.points.mean(axis=0) if self.points.shape[0] > 0 else numpy.zeros(self.points.shape[1])
+        self._labels = None
+        self._counts = numpy.zeros(num_clusters, dtype=numpy.int64)
+        self._sums = numpy.zeros((num_clusters, self.points.shape[1]))
+        self._squared_sums = numpy.zeros(num_clusters)
+        self._dispersions = numpy.zeros(num_clusters)
+
+    def update(self, labels: numpy.ndarray) -> float:
+        """
+        Moves the points whose label differs from the previous update to their new clusters.
+
+        :param labels: Integer array of length n, the cluster index of every point. Not modified afterwards.
+        :return: The Davies-Bouldin-Index of the clustering given by the labels
+        """
+        labels = numpy.asarray(labels)
+        if self._labels is None:
+            changed = numpy.arange(len(labels))
+            touched = numpy.unique(labels)
+        else:
+            changed = numpy.flatnonzero(labels != self._labels)
+            touched = numpy.union1d(self._labels[changed], labels[changed])
+            self._accumulate(changed, self._labels[changed], -1.0)
+        self._accumulate(changed, labels[changed], 1.0)
+        self._labels = labels
+        if self._q != 2 and len(touched) > 0:
+            self._update_dispersions(touched)
+        return self.index()
+
+    def _accumulate(self, indices: numpy.ndarray, labels: numpy.ndarray, sign: float):
+        num_clusters = len(self._counts)
+        rows = self.points[indices] - self._offset
+        self._counts += int(sign) * numpy.bincount(labels, minlength=num_clusters)
+        for dimension in range(rows.shape[1]):
+            self._sums[:, dimension] += sign * numpy.bincount(labels, weights=rows[:, dimension],
+                                                              minlength=num_clusters)
+        self._squared_sums += sign * numpy.bincount(labels, weights=numpy.einsum("ij,ij->i", rows, rows),
+                                                    minlength=num_clusters)
+
+    def _centroids(self) -> Matrix:
+        # Relative to the offset, like the sums
+        return self._sums / numpy.maximum(self._counts, 1)[:, numpy.newaxis]
+
+    def _update_dispersions(self, touched: numpy.ndarray):
+        members = numpy.flatnonzero(numpy.isin(self._labels, touched))
+        member_labels = self._labels[members]
+        distances = paired_distances(self.points[members] - self._offset, self._centroids()[member_labels])
+        powered_dist_sums = numpy.bincount(member_labels, weights=distances ** self._q,
+                                           minlength=len(self._counts))
+        filled = touched[self._counts[touched] > 0]
+        self._dispersions[filled] = (powered_dist_sums[filled] / self._counts[filled]) ** (1.0 / self._q)
+
+    def index(self) -> float:
+        """
+        :return: The Davies-Bouldin-Index of the clustering of the last update. Empty clusters are ignored.
+        """
+        filled = self._counts > 0
+        centroids = self._centroids()[filled]
+        if self._q == 2:
+            mean_squared_distances = (self._squared_sums[filled] / self._counts[filled] -
+                                      numpy.einsum("ij,ij->i", centroids, centroids))
+            dispersions = numpy.sqrt(numpy.maximum(mean_squared_distances, 0.0))
+        else:
+            dispersions = self._dispersions[filled]
+        return _index(centroids, dispersions, euclidean_distance)
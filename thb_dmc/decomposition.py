@@ -0,0 +1,222 @@
+"""
+Module implementing principal component analysis on chunks of rows, to cluster wide data in fewer dimensions.
+
+Projecting the points once onto their top principal components and clustering the projections means every
+distance of every k-means iteration and of the Davies-Bouldin-Index costs the reduced instead of the original
+number of dimensions.
+
+Based on:
+N. Halko, P. G. Martinsson and J. A. Tropp. Finding Structure with Randomness: Probabilistic Algorithms for
+Constructing Approximate Matrix Decompositions. SIAM Review, 53(2):217–288, 2011.
+DOI: 10.1137/090771806
+
+"""
+from typing import Iterable, Iterator
+
+import numpy
+
+from thb_dmc.csv_reader import DEFAULT_CHUNK_ROWS
+from thb_dmc.preprocessing import RunningStatistics, running_statistics
+from thb_dmc.vector_util import Matrix, as_matrix
+
+
+class PrincipalComponents:
+    """
+    The mean and the top principal components of the rows of a matrix, with their variances.
+
+    The components are fitted either from the covariance matrix, accumulated chunk by chunk in one pass
+    (see fit), or for wide data, where the d x d covariance matrix is too expensive, with a randomized
+    sketch of the centered matrix (see fit_randomized). Both pick the signs of the components so that the
+    largest entry of every component is positive. Variances are sample variances, divided by n - 1.
+    """
+
+    def __init__(self, mean: numpy.ndarray,
+                 components: Matrix,
+                 explained_variance: numpy.ndarray,
+                 total_variance: float):
+        """
+
+        :param mean: Mean of every column of the fitted rows
+        :param components: (c, d) matrix of the principal components, one unit vector per row,
+                            ordered by decreasing variance
+        :param explained_variance: Variance of the rows along every component
+        :param total_variance: Sum of the variances of all columns of the fitted rows
+        """
+        self.mean = numpy.asarray(mean, dtype=float)
+        self.components = as_matrix(components)
+        self.explained_variance = numpy.asarray(explained_variance, dtype=float)
+        self.total_variance = float(total_variance)
+
+    @classmethod
+    def from_statistics(cls, statistics: RunningStatistics,
+                        num_components: int = None,
+                        explained_variance: float = None) -> 'PrincipalComponents':
+        """
+        Calculates the principal components from the covariance matrix of running statistics.
+
+        :param statistics: Statistics of the rows, see thb_dmc.preprocessing
+        :param num_components: Largest number of components to keep. Defaults to all of them.
+        :param explained_variance: Keep only as many components as needed to explain this fraction of the
+                            total variance, e.g. 0.95
+        :return: The principal components
+        """
+        _check_num_points(statistics.count)
+        covariance = statistics.covariance(ddof=1)
+        variances, vectors = numpy.linalg.eigh(covariance)
+        # eigh sorts ascending
+        variances = numpy.maximum(variances[::-1], 0.0)
+        components = vectors[:, ::-1].T
+        total_variance = float(numpy.trace(covariance))
+        count = _component_count(variances, total_variance, num_components, explained_variance)
+        return cls(statistics.mean, _with_positive_largest_entries(components[:count]), variances[:count],
+                   total_variance)
+
+    @classmethod
+    def fit(cls, chunks: Iterable[Matrix],
+            num_components: int = None,
+            explained_variance: float = None) -> 'PrincipalComponents':
+        """
+        Fits the principal components in one pass over chunks of rows, consuming them one by one.
+        Costs O(n * d^2) time and O(d^2) memory.
+
+        :param chunks: Iterable of (m, d) matrices, e.g. the values of read_csv_chunks
+        :param num_components: Largest number of components to keep. Defaults to all of them.
+        :param explained_variance: Keep only as many components as needed to explain this fraction of the
+                            total variance
+        :return: The principal components
+        """
+        return cls.from_statistics(running_statistics(chunks), num_components, explained_variance)
+
+    @classmethod
+    def fit_randomized(cls, points: Matrix,
+                       num_components: int,
+                       explained_variance: float = None,
+                       oversampling: int = 10,
+                       power_iterations: int = 2,
+                       random_state=None,
+                       chunk_rows: int = DEFAULT_CHUNK_ROWS) -> 'PrincipalComponents':
+        """
+        Fits the top principal components with a randomized range finder: the centered rows are multiplied with
+        num_components + oversampling random directions, which span the dominant components with high
+        probability, refined by power iterations. Costs O(n * d * (num_components + oversampling)) time per
+        pass over the points and 3 + 2 * power_iterations passes, reading chunk_rows rows at once.
+
+        :param points: (n, d) matrix of rows, e.g. a numpy.memmap
+        :param num_components: Largest number of components to calculate
+        :param explained_variance: Keep only as many of them as needed to explain this fraction of the
+                            total variance
+        :param oversampling: Number of additional random directions, more make the components more accurate
+        :param power_iterations: Number of power iterations, more help with slowly decaying variances
+        :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+        :param chunk_rows: Number of rows read at once
+        :return: The principal components
+        """
+        rng = numpy.random.default_rng(random_state)
+        num_points, num_dimensions = points.shape
+        _check_num_points(num_points)
+        bounds = [(start, min(start + chunk_rows, num_points)) for start in range(0, num_points, chunk_rows)]
+        mean = sum(as_matrix(points[start:stop]).sum(axis=0, dtype=float) for start, stop in bounds) / num_points
+
+        def centered(start, stop):
+            return as_matrix(points[start:stop]) - mean
+
+        def times(right):
+            # Centered points times a (d, l) matrix, one row per point
+            return numpy.concatenate([centered(start, stop) @ right for start, stop in bounds])
+
+        def transposed_times(left):
+            # Transposed centered points times a (n, l) matrix
+            return sum(centered(start, stop).T @ left[start:stop] for start, stop in bounds)
+
+        width = min(num_components + oversampling, num_dimensions, num_points)
+        sketch = numpy.empty((num_points, width))
+        total_variance = 0.0
+        directions = rng.standard_normal((num_dimensions, width))
+        for start, stop in bounds:
+            rows = centered(start, stop)
+            sketch[start:stop] = rows @ directions
+            total_variance += float(numpy.einsum("ij,ij->", rows, rows))
+        for _ in range(power_iterations):
+            basis, _ = numpy.linalg.qr(sketch)
+            directions, _ = numpy.linalg.qr(transposed_times(basis))
+            sketch = times(directions)
+        basis, _ = numpy.linalg.qr(sketch)
+        _, singular_values, components = numpy.linalg.svd(transposed_times(basis).T, full_matrices=False)
+
+        variances = singular_values ** 2 / (num_points - 1)
+        total_variance /= num_points - 1
+        count = _component_count(variances, total_variance, num_components, explained_variance)
+        return cls(mean, _with_positive_largest_entries(components[:count]), variances[:count], total_variance)
+
+    @property
+    def num_components(self) -> int:
+        """Number of components c the points are projected onto."""
+        return self.components.shape[0]
+
+    @property
+    def explained_variance_ratio(self) -> numpy.ndarray:
+        """Fraction of the total variance explained by every component."""
+        return self.explained_variance / self.total_variance
+
+    def transform(self, points: Matrix, chunk_rows: int = DEFAULT_CHUNK_ROWS, out: Matrix = None) -> Matrix:
+        """
+        Projects points onto the components, chunk by chunk.
+
+        :param points: (n, d) matrix of points, e.g. a numpy.memmap
+        :param chunk_rows: Number of rows projected at once
+        :param out: (n, c) matrix the projections are written to, e.g. a dataset opened with mode "r+".
+                        Defaults to a new matrix.
+        :return: (n, c) matrix of the projected points, ready to be clustered
+        """
+        if out is None:
+            out = numpy.empty((points.shape[0], self.num_components))
+        for start in range(0, points.shape[0], chunk_rows):
+            out[start:start + chunk_rows] = self._project(points[start:start + chunk_rows])
+        return out
+
+    def transform_chunks(self, chunks: Iterable[Matrix]) -> Iterator[Matrix]:
+        """
+        Projects chunks of points onto the components, consuming them one by one,
+        e.g. to feed a MiniBatchKmeanClusterer.
+
+        :param chunks: Iterable of (m, d) matrices
+        :return: Generator of one (m, c) matrix per chunk
+        """
+        for chunk in chunks:
+            yield self._project(chunk)
+
+    def inverse_transform(self, projections: Matrix) -> Matrix:
+        """
+        :param projections: (n, c) matrix of projected points
+        :return: (n, d) matrix of the points the projections stand for in the original space
+        """
+        return as_matrix(projections) @ self.components + self.mean
+
+    def _project(self, points: Matrix) -> Matrix:
+        return (as_matrix(points) - self.mean) @ self.components.T
+
+
+def _check_num_points(num_points: int):
+    # The variances are divided by num_points - 1
+    if num_points < 2:
+        raise ValueError("The principal components need at least two points, got {}".format(num_points))
+
+
+def _component_count(variances: numpy.ndarray, total_variance: float, num_components: int,
+                     explained_variance: float) -> int:
+    """
+    :return: Number of the leading components to keep
+    """
+    count = len(variances) if num_components is None else min(num_components, len(variances))
+    if explained_variance is not None and total_variance > 0.0:
+        explained = numpy.cumsum(variances[:count])
+        count = min(count, int(numpy.searchsorted(explained, explained_variance * total_variance)) + 1)
+    return count
+
+
+def _with_positive_largest_entries(components: Matrix) -> Matrix:
+    """
+    :return: The components, each one negated if its entry of the largest absolute value is negative
+    """
+    largest = components[numpy.arange(components.shape[0]), numpy.argmax(numpy.abs(components), axis=1)]
+    return components * numpy.where(largest < 0.0, -1.0, 1.0)[:, numpy.newaxis]
@@ -0,0 +1,180 @@
+"""
+Module implementing the assignment step of k-means accelerated by the triangle inequality.
+
+Based on:
+G. Hamerly. Making k-means even faster.
+Proceedings of the 2010 SIAM International Conference on Data Mining, 130–140, 2010.
+DOI: 10.1137/1.9781611972801.12
+
+"""
+import numpy
+
+from thb_dmc.metrics import pairwise_distances, paired_distances
+from thb_dmc.vector_util import Matrix, Distance_Function, euclidean_distance, chunk_bounds
+
+
+class HamerlyAssigner:
+    """
+    Assigns points to their closest centroid over successive k-means iterations, skipping distance
+    evaluations that provably can not change an assignment.
+
+    For every point it keeps an upper bound of the distance to its assigned centroid and a lower bound of the
+    distance to every other centroid. When the centroids move, the bounds are loosened by how far the centroids
+    moved. A point whose upper bound is below its lower bound, or below half the distance of its centroid to the
+    closest other centroid, keeps its assignment without any distance being calculated.
+
+    This is only correct if the distance function is a metric, i.e. satisfies the triangle inequality,
+    like the euclidean or the block distance. Then the assignments are the same as the ones of a full scan,
+    except for points that are equally close to two centroids.
+    """
+
+    def __init__(self, distance_function: Distance_Function = euclidean_distance, chunk_size: int = None):
+        """
+
+        :param distance_function: Metric used to calculate the distance between a point and a centroid
+        :param chunk_size: Number of points whose distances to all centroids are calculated at once.
+        """
+        self._distance_function = distance_function
+        self._chunk_size = chunk_size
+        self._centroids = None
+        self._labels = None
+        self._upper = None
+        self._lower = None
+        self.distance_evaluations = 0
+        self.skipped_distance_evaluations = 0
+
+    def assign(self, points: Matrix, centroids: Matrix) -> numpy.ndarray:
+        """
+        Assigns every point to its closest centroid.
+
+        The points have to be the same for every call, only the centroids may change between calls.
+
+        :param points: (n, d) matrix of points, one point per row
+        :param centroids: (k, d) matrix of centroids, one centroid per row
+        :return: Integer array of length n holding the index of the closest centroid for every point.
+                        A new array for every call.
+        """
+        num_points = points.shape[0]
+        num_centroids = centroids.shape[0]
+
+        if self._centroids is None:
+            self._labels = numpy.empty(num_points, dtype=numpy.intp)
+            self._upper = numpy.empty(num_points)
+            self._lower = numpy.empty(num_points)
+            self._assign_fully(points, centroids, numpy.arange(num_points))
+            self.distance_evaluations += num_points * num_centroids
+            self._centroids = centroids
+            return self._labels.copy()
+
+        labels = self._labels
+        shifts = paired_distances(self._centroids, centroids, self._distance_function)
+        self._upper += shifts[labels]
+        self._lower -= _largest_other_shift(shifts)[labels]
+
+        half_gaps = 0.5 * _closest_other_distance(centroids, self._distance_function)
+        bounds = numpy.maximum(half_gaps[labels], self._lower)
+
+        # Tighten the upper bound of the points whose bounds overlap, reassign those where it still overlaps
+        candidates = numpy.flatnonzero(self._upper > bounds)
+        self._upper[candidates] = paired_distances(points[candidates], centroids[labels[candidates]],
+                                                   self._distance_function)
+        reassigned = candidates[self._upper[candidates] > bounds[candidates]]
+        self._assign_fully(points, centroids, reassigned)
+
+        evaluations = len(candidates) + len(reassigned) * num_centroids
+        self.distance_evaluations += evaluations
+        self.skipped_distance_evaluations += num_points * num_centroids - evaluations
+        self._centroids = centroids
+        return labels.copy()
+
+    def restore(self, centroids: Matrix, labels: numpy.ndarray, upper_bounds: numpy.ndarray,
+                lower_bounds: numpy.ndarray):
+        """
+        Continues from an earlier assignment, e.g. one of another assigner, as if assign had been called
+        with those centroids.
+
+        :param centroids: (k, d) matrix of the centroids the points were assigned to
+        :param labels: Index of the assigned centroid of every point. Copied, like the bounds.
+        :param upper_bounds: Upper bound of the distance of every point to its assigned centroid
+        :param lower_bounds: Lower bound of the distance of every point to every other centroid
+        """
+        self._centroids = centroids
+        self._labels = numpy.array(labels, dtype=numpy.intp)
+        self._upper = numpy.array(upper_bounds, dtype=float)
+        self._lower = numpy.array(lower_bounds, dtype=float)
+
+    def extend(self, points: Matrix) -> numpy.ndarray:
+        """
+        Assigns points added after the last call to the centroids of the last call.
+
+        :param points: (n + m, d) matrix of the points of the last call followed by m new ones
+        :return: Integer array of length m holding the index of the closest centroid for every new point
+        """
+        num_centroids = self._centroids.shape[0]
+        num_previous = len(self._labels)
+        num_new = points.shape[0] - num_previous
+        self._labels = numpy.concatenate((self._labels, numpy.empty(num_new, dtype=numpy.intp)))
+        self._upper = numpy.concatenate((self._upper, numpy.empty(num_new)))
+        self._lower = numpy.concatenate((self._lower, numpy.empty(num_new)))
+        self._assign_fully(points, self._centroids, numpy.arange(num_previous, points.shape[0]))
+        self.distance_evaluations += num_new * num_centroids
+        return self._labels[num_previous:].copy()
+
+    def keep(self, kept: numpy.ndarray):
+        """
+        Drops the labels and bounds of points removed after the last call.
+
+        :param kept: Boolean array over the points of the last call, True for the points that are kept
+        """
+        self._labels = self._labels[kept]
+        self._upper = self._upper[kept]
+        self._lower = self._lower[kept]
+
+    @property
+    def upper_bounds(self) -> numpy.ndarray:
+        """Copy of the upper bound of the distance of every point to its assigned centroid, None before any call."""
+        return None if self._upper is None else self._upper.copy()
+
+    @property
+    def lower_bounds(self) -> numpy.ndarray:
+        """Copy of the lower bound of the distance of every point to every other centroid, None before any call."""
+        return None if self._lower is None else self._lower.copy()
+
+    def _assign_fully(self, points: Matrix, centroids: Matrix, indices: numpy.ndarray):
+        """
+        Calculates the distances of the given points to all centroids and resets their labels and bounds.
+        """
+        num_centroids = centroids.shape[0]
+        for start, stop in chunk_bounds(len(indices), num_centroids, self._chunk_size):
+            chunk = indices[start:stop]
+            distances = pairwise_distances(points[chunk], centroids, self._distance_function)
+            closest = numpy.argmin(distances, axis=1)
+            rows = numpy.arange(len(chunk))
+            self._labels[chunk] = closest
+            self._upper[chunk] = distances[rows, closest]
+            if num_centroids > 1:
+                distances[rows, closest] = numpy.inf
+                self._lower[chunk] = distances.min(axis=1)
+            else:
+                self._lower[chunk] = numpy.inf
+
+
+def _closest_other_distance(centroids: Matrix, distance_function: Distance_Function) -> numpy.ndarray:
+    """
+    :return: For every centroid the distance to the closest other centroid, infinity for a single one
+    """
+    distances = pairwise_distances(centroids, centroids, distance_function)
+    numpy.fill_diagonal(distances, numpy.inf)
+    return distances.min(axis=1)
+
+
+def _largest_other_shift(shifts: numpy.ndarray) -> numpy.ndarray:
+    """
+    :return: For every centroid the largest shift of all other centroids, zero for a single one
+    """
+    if len(shifts) == 1:
+        return numpy.zeros(1)
+    largest = int(numpy.argmax(shifts))
+    others = numpy.full(len(shifts), shifts[largest])
+    others[largest] = numpy.max(numpy.delete(shifts, largest))
+    return others
@@ -0,0 +1,256 @@
+"""
+Module implementing k-means that continues from a fitted state when points are added or removed,
+instead of clustering all points anew.
+"""
+from typing import Collection
+
+import numpy
+
+from thb_dmc.hamerly import HamerlyAssigner
+from thb_dmc.kmeans import KmeansState, centroids_from_sums
+from thb_dmc.metrics import get_metric
+from thb_dmc.vector_util import Vector, NamedVector, Distance_Function, euclidean_distance, Matrix, as_matrix, \
+    cluster_sums
+
+
+class IncrementalKmeanClusterer:
+    """
+    Keeps a k-means clustering up to date while points are added and removed.
+
+    The coordinate sums and point counts of the clusters are kept and only changed by the points that join
+    or leave a cluster, so the centroids follow without a pass over all points. Reconverging reuses the
+    HamerlyAssigner and its bounds: a point is only looked at again if the centroids moved far enough to
+    possibly change its assignment. After a small batch of changes the centroids move little, so few points
+    are touched and few iterations are needed.
+
+    A state without points, like one saved after a run on a dataset that is no longer at hand, is continued as
+    well: the points of the state stay in their clusters through the sums and counts, and only the points added
+    afterwards are reassigned.
+
+    A state of weighted points, e.g. of an ArrayKmeanClusterer with weights, keeps the weight of every point, so a
+    point that changes its cluster moves its whole weight. Points added to it weigh one unless given weights.
+
+    The sums are updated by adding and subtracting, so after very many changes they may drift from sums calculated
+    anew in the last bits. Only the simple centroid is supported and the distance function has to be a metric.
+    """
+
+    def __init__(self, state: KmeansState,
+                 points: Collection[Vector] = None,
+                 distance_function: Distance_Function = euclidean_distance,
+                 chunk_size: int = None):
+        """
+
+        :param state: Fitted state to continue from, e.g. ArrayKmeanClusterer.state or load_state.
+                            Not modified.
+        :param points: The points of the state, preferably a (n, d) float matrix, in the order of the labels of
+                            the state, and of its weights if it has any. Without labels, the points are assigned
+                            anew and the sums and counts are calculated from them. Without bounds, all their
+                            distances are calculated once. Defaults to no points, only the sums and counts of
+                            the state.
+        :param distance_function: Metric used to calculate the distance between a point and a centroid
+        :param chunk_size: Number of points whose distances are calculated at once
+        """
+        metric = get_metric(distance_function)
+        if metric is not None and not metric.triangle_inequality:
+            raise ValueError("The incremental assignment needs the triangle inequality, {} violates it"
+                             .format(metric.name))
+        self._names = tuple(state.names)
+        self._distance_function = distance_function
+        self._centroids = numpy.array(state.centroids, dtype=float)
+        self._sums = numpy.array(state.sums, dtype=float)
+        self._counts = numpy.array(state.counts)
+        self._assigner = HamerlyAssigner(distance_function, chunk_size)
+        # Weight of every point, None while every point weighs one
+        self._weights = None
+        if state.weights is not None:
+            self._weights = numpy.empty(0) if points is None else numpy.array(state.weights, dtype=float)
+            self._counts = self._counts.astype(float)
+        if points is None:
+            self.points = numpy.empty((0, self._centroids.shape[1]))
+            self._assigner.restore(self._centroids, numpy.empty(0, dtype=numpy.intp), numpy.empty(0), numpy.empty(0))
+            self._labels = numpy.empty(0, dtype=numpy.intp)
+        else:
+            self.points = as_matrix(points)
+            if self._weights is not None and self._weights.shape != (self.points.shape[0],):
+                raise ValueError("Got {} weights for {} points".format(len(self._weights), self.points.shape[0]))
+            if state.labels is not None and state.upper_bounds is not None and state.lower_bounds is not None:
+                self._assigner.restore(self._centroids, state.labels, state.upper_bounds, state.lower_bounds)
+                self._labels = numpy.array(state.labels, dtype=numpy.intp)
+            else:
+                self._labels = self._assigner.assign(self.points, self._centroids)
+                if state.labels is None:
+                    self._sums, self._counts = cluster_sums(self.points, self._labels, len(self._names),
+                                                            self._weights)
+                else:
+                    self._move(numpy.flatnonzero(self._labels != state.labels), numpy.asarray(state.labels))
+        self.iterations = 0
+
+    def add(self, points: Collection[Vector], weights: Collection[float] = None) -> numpy.ndarray:
+        """
+        Assigns new points to the current centroids and adds them to their clusters.
+        Call reconverge afterwards to move the centroids.
+
+        :param points: Collection of new points, preferably a (m, d) float matrix
+        :param weights: Non-negative weight of every new point. Defaults to a weight of one per point.
+                            The points known so far weigh one if the state had no weights.
+        :return: Integer array of length m, the index of the cluster of every new point
+        """
+        points = as_matrix(points)
+        if points.shape[0] == 0:
+            return numpy.empty(0, dtype=numpy.intp)
+        if weights is not None:
+            weights = numpy.array(weights, dtype=float)
+            if weights.shape != (points.shape[0],):
+                raise ValueError("Got {} weights for {} points".format(len(weights), points.shape[0]))
+            if (weights < 0.0).any():
+                raise ValueError("Weights must not be negative")
+            if self._weights is None:
+                self._weights = numpy.ones(self.points.shape[0])
+                self._counts = self._counts.astype(float)
+        if self._weights is not None:
+            if weights is None:
+                weights = numpy.ones(points.shape[0])
+            self._weights = numpy.concatenate((self._weights, weights))
+        self.points = numpy.concatenate((self.points, points))
+        labels = self._assigner.extend(self.points)
+        self._labels = numpy.concatenate((self._labels, labels))
+        sums, counts = cluster_sums(points, labels, len(self._names), weights)
+        self._sums += sums
+        self._counts += counts
+        return labels
+
+    def remove(self, indices: Collection[int]):
+        """
+        Removes points from their clusters. The remaining points keep their order, later indices shift down.
+        Call reconverge afterwards to move the centroids.
+
+        :param indices: Indices of the points to remove, in the order they were given or added.
+                            A point given more than once is removed once.
+        """
+        # Negative indices resolved and repeated ones dropped, so no point leaves its cluster twice
+        indices = numpy.unique(numpy.arange(self.points.shape[0])[numpy.asarray(indices, dtype=numpy.intp)])
+        sums, counts = cluster_sums(self.points[indices], self._labels[indices], len(self._names),
+                                    self._point_weights(indices))
+        self._sums -= sums
+        self._counts -= counts
+        kept = numpy.ones(self.points.shape[0], dtype=bool)
+        kept[indices] = False
+        self.points = self.points[kept]
+        self._labels = self._labels[kept]
+        if self._weights is not None:
+            self._weights = self._weights[kept]
+        self._assigner.keep(kept)
+
+    def reconverge(self, max_iterations: int = None) -> int:
+        """
+        Iterates k-means from the current state until the centroids stop changing.
+
+        :param max_iterations: Largest number of iterations. Defaults to no limit.
+        :return: Number of iterations calculated
+        """
+        iterations = 0
+        while max_iterations is None or iterations < max_iterations:
+            centroids = centroids_from_sums(self._sums, self._counts, self._centroids)
+            if numpy.array_equal(centroids, self._centroids):
+                break
+            previous_labels = self._labels
+            self._labels = self._assigner.assign(self.points, centroids)
+            self._move(numpy.flatnonzero(self._labels != previous_labels), previous_labels)
+            self._centroids = centroids
+            iterations += 1
+        self.iterations += iterations
+        return iterations
+
+    def _move(self, changed: numpy.ndarray, previous_labels: numpy.ndarray):
+        """
+        Moves the sums and counts of the changed points from their previous clusters to their current ones.
+        """
+        if len(changed) == 0:
+            return
+        points = self.points[changed]
+        weights = self._point_weights(changed)
+        sums, counts = cluster_sums(points, previous_labels[changed], len(self._names), weights)
+        self._sums -= sums
+        self._counts -= counts
+        sums, counts = cluster_sums(points, self._labels[changed], len(self._names), weights)
+        self._sums += sums
+        self._counts += counts
+
+    def _point_weights(self, indices: numpy.ndarray) -> numpy.ndarray:
+        """
+        :return: Weights of the points with the indices, None if every point weighs one
+        """
+        return None if self._weights is None else self._weights[indices]
+
+    @property
+    def state(self) -> KmeansState:
+        """Copy of the current state, e.g. to save with save_state."""
+        return KmeansState(self._names, self._centroids.copy(), self._sums.copy(), self._counts.copy(),
+                           self._labels.copy(), self._assigner.upper_bounds, self._assigner.lower_bounds,
+                           None if self._weights is None else self._weights.copy())
+
+    @property
+    def labels(self) -> numpy.ndarray:
+        """Index of the cluster of every point, assigned to the current centroids."""
+        return self._labels
+
+    @property
+    def centroids(self) -> Matrix:
+        """(k, d) matrix of the centroids the points are assigned to."""
+        return self._centroids
+
+    @property
+    def counts(self) -> numpy.ndarray:
+        """
+        Number of points per cluster, or their total weight if the points are weighted, including the ones only
+        known through the state.
+        """
+        return self._counts
+
+    @property
+    def names(self) -> Collection[str]:
+        """Names of the clusters."""
+        return self._names
+
+    @property
+    def distance_evaluations(self) -> int:
+        """Number of distances between a point and a centroid calculated so far."""
+        return self._assigner.distance_evaluations
+
+    def named_centroids(self) -> Collection[NamedVector]:
+        """
+        :return: Tuple of NamedVectors, one per cluster
+        """
+        return tuple((name, tuple(centroid)) for name, centroid in zip(self._names, self._centroids.tolist()))
+
+
+def save_state(state: KmeansState, path: str):
+    """
+    Writes a fitted state to a numpy .npz file.
+
+    :param state: The state
+    :param path: File to write to
+    """
+    arrays = {"names": numpy.array(state.names, dtype=str),
+              "centroids": state.centroids,
+              "sums": state.sums,
+              "counts": state.counts}
+    for field in ("labels", "upper_bounds", "lower_bounds", "weights"):
+        if getattr(state, field) is not None:
+            arrays[field] = getattr(state, field)
+    with open(path, "wb") as state_file:
+        numpy.savez(state_file, **arrays)
+
+
+def load_state(path: str) -> KmeansState:
+    """
+    Reads a state written by save_state.
+
+    :param path: File to read from
+    :return: The state
+    """
+    with numpy.load(path, allow_pickle=False) as state_file:
+        optional = {field: state_file[field] for field in ("labels", "upper_bounds", "lower_bounds", "weights")
+                    if field in state_file.files}
+        return KmeansState(tuple(state_file["names"].tolist()), state_file["centroids"], state_file["sums"],
+                           state_file["counts"], **optional)
@@ -0,0 +1,102 @@
+"""
+Module implementing the measurements reported by the k-means clusterers after every iteration,
+and a capture of the runtime profile and memory allocations of a run.
+"""
+import cProfile
+import pstats
+import tracemalloc
+from typing import Callable, NamedTuple, List
+
+
+class IterationStats(NamedTuple):
+    """
+    Measurements of one k-means iteration, passed to every hook of a clusterer.
+    """
+    # Number of the iteration, starting at 1
+    iteration: int
+    # Wall times in seconds of assigning the points, calculating the new centroids and checking for convergence
+    assignment_seconds: float
+    update_seconds: float
+    convergence_seconds: float
+    # Distances between a point and a centroid calculated in this iteration
+    distance_evaluations: int
+    # Points assigned to a different centroid than in the previous iteration, all points in the first one
+    points_changed: int
+    # Largest distance a centroid moved in this iteration
+    centroid_shift: float
+    # Sum of the squared distances of all points to the centroids they were assigned to in this iteration
+    inertia: float
+
+
+Iteration_Hook = Callable[[IterationStats], None]
+
+
+def print_iteration(stats: IterationStats):
+    """
+    Hook printing one line per iteration.
+
+    :param stats: Measurements of the iteration
+    """
+    print("Iteration {}: assignment {:.4f}s, update {:.4f}s, convergence {:.4f}s, {} distances, "
+          "{} points changed, centroid shift {:.6g}, inertia {:.6g}"
+          .format(stats.iteration, stats.assignment_seconds, stats.update_seconds, stats.convergence_seconds,
+                  stats.distance_evaluations, stats.points_changed, stats.centroid_shift, stats.inertia))
+
+
+class ProfileCapture:
+    """
+    Context manager capturing a cProfile profile and the memory allocations of the code run within it.
+
+    Usage:
+        with ProfileCapture() as capture:
+            clusterer.final_result()
+        capture.stats().sort_stats("cumulative").print_stats(20)
+        print(capture.peak_bytes, capture.top_allocations())
+    """
+
+    def __init__(self, memory: bool = True, frames: int = 1):
+        """
+
+        :param memory: Also trace the memory allocations with tracemalloc, which slows down the code considerably
+        :param frames: Number of frames stored per traced allocation
+        """
+        self._memory = memory
+        self._frames = frames
+        self._started_tracing = False
+        self.profile = None
+        self.snapshot = None
+        self.peak_bytes = None
+
+    def __enter__(self):
+        if self._memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start(self._frames)
+            else:
+                tracemalloc.clear_traces()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profile.disable()
+        if self._memory:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+
+    def stats(self) -> pstats.Stats:
+        """
+        :return: The captured profile
+        """
+        return pstats.Stats(self.profile)
+
+    def top_allocations(self, limit: int = 10) -> List[tracemalloc.Statistic]:
+        """
+        :param limit: Number of source lines to return
+        :return: The source lines holding the most memory at the end of the capture, largest first
+        """
+        if self.snapshot is None:
+            return []
+        return self.snapshot.statistics("lineno")[:limit]
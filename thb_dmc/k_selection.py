@@ -0,0 +1,229 @@
+"""
+Module implementing the search for the number of clusters k with the lowest Davies-Bouldin-Index.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Collection, List, NamedTuple
+
+import numpy
+
+from thb_dmc.approximate import uniform_sample
+from thb_dmc.convergence import StoppingCriteria
+from thb_dmc.davies_bouldin_index import labelled_davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer
+from thb_dmc.parallel import SharedArray, attach_array
+from thb_dmc.seeding import kmeans_plus_plus, extend_centroids
+from thb_dmc.vector_util import NamedVector, Distance_Function, euclidean_distance, Matrix, as_matrix
+
+
+class KScore(NamedTuple):
+    """
+    The clustering found for one k.
+    """
+    k: int
+    davies_bouldin_index: float
+    inertia: float
+    # Seconds spent on seeding, clustering and scoring
+    seconds: float
+    iterations: int
+    centroids: Collection[NamedVector]
+
+
+class KSelection(NamedTuple):
+    """
+    The result of select_k.
+    """
+    # One score per k clustered, ordered by k
+    scores: List[KScore]
+    # The score with the lowest Davies-Bouldin-Index
+    best: KScore
+    # Whether the sweep ended before the largest k, because the index had bottomed out
+    stopped_early: bool
+
+
+def select_k(points: Matrix,
+             k_values: Collection[int] = range(2, 11),
+             distance_function: Distance_Function = euclidean_distance,
+             n_jobs: int = None,
+             sample_size: int = None,
+             patience: int = 2,
+             tolerance: float = 0.05,
+             max_iterations: int = 300,
+             restarts: int = 1,
+             random_state=None) -> KSelection:
+    """
+    Clusters the points for every k and scores every clustering by its Davies-Bouldin-Index and inertia.
+
+    The k values are clustered in ascending order, in waves of n_jobs values that run concurrently in worker
+    processes. The workers share the points (or the sample) through shared memory, so they are neither copied
+    nor pickled per k. Every k of a wave starts from the centroids of the largest k of the previous waves,
+    plus centroids added by k-means++ seeding (see extend_centroids), so it needs fewer iterations than a
+    start from scratch. The waves therefore depend on n_jobs, and so may the result. As a warm start can get
+    stuck, e.g. with one centroid of k - 1 between two clusters, every k is also clustered from restarts
+    k-means++ seedings and the clustering with the lowest inertia is kept.
+
+    The sweep ends early after a wave once the index has bottomed out: when at least patience k values larger
+    than the one with the lowest index were scored and all of their indices are more than tolerance (relative)
+    above that lowest one.
+
+    :param points: (n, d) matrix of points, one point per row, e.g. a numpy.memmap
+    :param k_values: Numbers of clusters to try, at least 2
+    :param distance_function: Function to calculate the distance between vectors, used for k-means and the index.
+                        Has to be picklable for n_jobs.
+    :param n_jobs: Number of worker processes clustering concurrently. Defaults to one k after the other, each
+                        starting from the solution of the previous one.
+    :param sample_size: Cluster and score a uniform sample of this many points instead of all of them,
+                        drawn once and shared by all k, see uniform_sample. The inertia is estimated for all points.
+    :param patience: Number of k values above the best one that have to be worse before the sweep ends early.
+                        None to always try every k.
+    :param tolerance: Relative amount by which the index of a k has to be worse than the best one to count
+    :param max_iterations: Maximal number of k-means iterations per start
+    :param restarts: Number of starts from k-means++ seeding per k, in addition to the warm start
+    :param random_state: Seed or numpy.random.SeedSequence
+    :return: The scores of all k clustered and the best one
+    """
+    k_values = sorted(set(k_values))
+    if not k_values or k_values[0] < 2:
+        raise ValueError("Expected numbers of clusters of at least 2, got {}".format(k_values))
+    seed_sequence = random_state if isinstance(random_state, numpy.random.SeedSequence) \
+        else numpy.random.SeedSequence(random_state)
+    seeds = dict(zip(k_values, seed_sequence.spawn(len(k_values))))
+
+    weights = None
+    if sample_size is not None:
+        points, weights, _ = uniform_sample(points, sample_size, numpy.random.default_rng(seed_sequence.spawn(1)[0]))
+    else:
+        points = as_matrix(points)
+    settings = (distance_function, max_iterations, restarts)
+    wave_size = 1 if n_jobs is None else max(1, n_jobs)
+
+    scores = []
+    stopped_early = False
+    if wave_size == 1:
+        for k in k_values:
+            scores.append(_score_k(points, weights, k, _previous_centroids(scores), seeds[k], *settings))
+            if _bottomed_out(scores, patience, tolerance):
+                stopped_early = k != k_values[-1]
+                break
+    else:
+        shared_points = SharedArray(points)
+        shared_weights = None if weights is None else SharedArray(weights)
+        try:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach,
+                                     initargs=(shared_points.spec,
+                                               None if shared_weights is None else shared_weights.spec)) as pool:
+                for start in range(0, len(k_values), wave_size):
+                    wave = k_values[start:start + wave_size]
+                    previous = _previous_centroids(scores)
+                    futures = [pool.submit(_score_shared_k, k, previous, seeds[k], *settings) for k in wave]
+                    scores.extend(future.result() for future in futures)
+                    if _bottomed_out(scores, patience, tolerance):
+                        stopped_early = wave[-1] != k_values[-1]
+                        break
+        finally:
+            shared_points.close()
+            if shared_weights is not None:
+                shared_weights.close()
+
+    best = min(scores, key=lambda score: (score.davies_bouldin_index, score.k))
+    return KSelection(scores, best, stopped_early)
+
+
+def format_scores(selection: KSelection) -> str:
+    """
+    :param selection: Result of select_k
+    :return: Table of the scores, one line per k, the best one marked with a star
+    """
+    lines = ["{:>5} {:>12} {:>14} {:>10} {:>10}".format("k", "DBI", "inertia", "seconds", "iterations")]
+    for score in selection.scores:
+        lines.append("{:>5} {:>12.6f} {:>14.6g} {:>10.3f} {:>10}{}".format(
+            score.k, score.davies_bouldin_index, score.inertia, score.seconds, score.iterations,
+            " *" if score is selection.best else ""))
+    return "\n".join(lines)
+
+
+def _previous_centroids(scores: List[KScore]) -> Matrix:
+    """
+    :return: Centroids of the largest k scored so far, None before the first one
+    """
+    if not scores:
+        return None
+    return as_matrix([centroid for _, centroid in scores[-1].centroids])
+
+
+def _bottomed_out(scores: List[KScore], patience: int, tolerance: float) -> bool:
+    if patience is None:
+        return False
+    best = min(range(len(scores)), key=lambda index: scores[index].davies_bouldin_index)
+    later = scores[best + 1:]
+    limit = scores[best].davies_bouldin_index * (1.0 + tolerance)
+    return len(later) >= patience and all(score.davies_bouldin_index > limit for score in later)
+
+
+# State of the worker process, set up by _attach
+_worker_state = {}
+
+
+def _attach(points_spec, weights_spec):
+    _worker_state["points"] = attach_array(points_spec)
+    _worker_state["weights"] = None if weights_spec is None else attach_array(weights_spec)
+
+
+def _score_shared_k(k: int, previous: Matrix, seed: numpy.random.SeedSequence, *settings) -> KScore:
+    return _score_k(_worker_state["points"], _worker_state["weights"], k, previous, seed, *settings)
+
+
+def _score_k(points: Matrix, weights: numpy.ndarray, k: int, previous: Matrix, seed: numpy.random.SeedSequence,
+             distance_function: Distance_Function, max_iterations: int, restarts: int) -> KScore:
+    """
+    Clusters the points into k clusters, starting from the previous centroids if there are any and from
+    restarts k-means++ seedings, and scores the clustering with the lowest inertia.
+    """
+    started = time.perf_counter()
+    rng = numpy.random.default_rng(seed)
+    starts = [kmeans_plus_plus(points, k, distance_function, rng, weights) for _ in range(restarts)]
+    if previous is not None:
+        starts.insert(0, extend_centroids(points, previous, k, distance_function, rng, weights))
+    elif not starts:
+        starts.append(kmeans_plus_plus(points, k, distance_function, rng, weights))
+    iterations = 0
+    best = None
+    for initial_centroids in starts:
+        clusterer, labels, start_iterations = _cluster(points, weights, k, initial_centroids, rng,
+                                                       distance_function, max_iterations)
+        iterations += start_iterations
+        if best is None or clusterer.inertia < best[0].inertia:
+            best = clusterer, labels
+    clusterer, labels = best
+    index = labelled_davies_bouldin_index(points, labels, dispersion_distance_func=distance_function,
+                                          cluster_distance_func=distance_function, weights=weights)
+    return KScore(k=k,
+                  davies_bouldin_index=index,
+                  inertia=clusterer.inertia,
+                  seconds=time.perf_counter() - started,
+                  iterations=iterations,
+                  centroids=clusterer.named_centroids(clusterer.assigned_centroids))
+
+
+def _cluster(points: Matrix, weights: numpy.ndarray, k: int, initial_centroids: Collection[NamedVector],
+             rng: numpy.random.Generator, distance_function: Distance_Function, max_iterations: int):
+    """
+    Runs k-means from the initial centroids. Clusters that end up empty, e.g. a previous centroid whose points
+    all went to new ones, are seeded anew and the clustering continued, so the result has k clusters.
+
+    :return: The clusterer, the labels and the number of iterations of all runs
+    """
+    iterations = 0
+    for _ in range(k):
+        clusterer = ArrayKmeanClusterer(points, initial_centroids,
+                                        distance_function=distance_function,
+                                        stopping_criteria=StoppingCriteria(max_iterations=max_iterations),
+                                        weights=weights)
+        labels = clusterer.final_result()
+        iterations += clusterer.iteration
+        filled = clusterer.clustering.sizes > 0
+        if filled.all():
+            break
+        initial_centroids = extend_centroids(points, clusterer.assigned_centroids[filled], k, distance_function,
+                                             rng, weights)
+    return clusterer, labels, iterations
@@ -2,16 +2,38 @@
 Module implementing the k-means algorithm for simple vectors.
 """
 import copy
-from typing import Dict, Collection
+import time
+from typing import Dict, Collection, NamedTuple, Tuple
 
+import numpy
+
+from thb_dmc.clustering import Clustering
+from thb_dmc.convergence import StoppingCriteria, StopReason
+from thb_dmc.hamerly import HamerlyAssigner
+from thb_dmc.instrumentation import IterationStats, Iteration_Hook, print_iteration
+from thb_dmc.metrics import get_metric, paired_distances, ranking_distances
+from thb_dmc.spatial_index import build_centroid_index
 from thb_dmc.vector_util import Vector, NamedVector, Distance_Function, euclidean_distance, simple_centroid, \
-    Centroid_Function
+    Centroid_Function, Matrix, as_matrix, cluster_sums, chunk_bounds, deduplicate
 
 
 def kmeans(points: Collection[Vector],
            initial_centroids: Collection[NamedVector] = (("default", (0.0, 0.0)),),
            distance_function: Distance_Function = euclidean_distance,
-           centroid_function: Centroid_Function = simple_centroid) -> Dict[NamedVector, Collection[Vector]]:
+           centroid_function: Centroid_Function = simple_centroid,
+           accelerated: bool = False,
+           n_jobs: int = None,
+           hooks: Collection[Iteration_Hook] = (),
+           stopping_criteria: StoppingCriteria = None,
+           centroid_index: str = None,
+           weights: Collection[float] = None,
+           collapse_duplicates: bool = False,
+           dtype=None,
+           k: int = None,
+           init: str = None,
+           n_init: int = 1,
+           random_state=None,
+           state: "KmeansState" = None) -> Dict[NamedVector, Collection[Vector]]:
     """
     Applies the k-means algorithm to the given cluster and returns the final clustering.
 
@@ -21,20 +43,58 @@ def kmeans(points: Collection[Vector],
                         Defaults to the euclidean distance.
     :param centroid_function: Function to calculate a centroid of a set of vectors.
                         Defaults to the simple centroid function.
+    :param accelerated: Skip distance evaluations using the triangle inequality, see HamerlyAssigner.
+                        Only valid for distance functions that are metrics.
+    :param n_jobs: Number of worker processes the points are sharded across, see ShardedAssigner.
+                        Defaults to a single process.
+    :param hooks: Functions called with the IterationStats of every iteration
+    :param stopping_criteria: Criteria ending the iterations before the centroids stop changing exactly
+    :param centroid_index: Search tree over the centroids used to find the closest one, see build_centroid_index.
+                        Defaults to calculating the distances to all centroids.
+    :param weights: Weight of every point, in the order of the points, e.g. the number of times it occurs.
+                        Defaults to a weight of one per point.
+    :param collapse_duplicates: Cluster every distinct point once, weighted by the number of times it occurs,
+                        see deduplicate. Same clusters in time proportional to the number of distinct points.
+    :param dtype: Float type the points and centroids are stored and compared in, see ArrayKmeanClusterer.
+                        Defaults to float64.
+    :param k: Number of clusters, only with init
+    :param init: Seed k initial centroids instead of using initial_centroids, "k-means++" or "k-means||",
+                        see KmeanClusterer
+    :param n_init: Number of seeded restarts, the clustering of the best one by inertia is returned
+    :param random_state: Seed of the seeding, see seed_centroids
+    :param state: Fitted state to continue from instead of initial_centroids, e.g. the one of the previous run
+                        before points were added, see ArrayKmeanClusterer
     :return: Dictionary of clusters. Keys are NamedVectors, Values are sets of Vectors. Empty
-                        Clusters are contained as key with an empty Collection as value.
+                        Clusters are contained as key with an empty set as value. None if there are no points.
 
     """
-    return KmeanClusterer(points=points,
-                          initial_centroids=initial_centroids,
-                          distance_function=distance_function,
-                          centroid_function=centroid_function).final_result()
+    clusterer = KmeanClusterer(points=points,
+                               initial_centroids=initial_centroids,
+                               distance_function=distance_function,
+                               centroid_function=centroid_function,
+                               accelerated=accelerated,
+                               n_jobs=n_jobs,
+                               hooks=hooks,
+                               stopping_criteria=stopping_criteria,
+                               centroid_index=centroid_index,
+                               weights=weights,
+                               collapse_duplicates=collapse_duplicates,
+                               dtype=dtype,
+                               k=k,
+                               init=init,
+                               n_init=n_init,
+                               random_state=random_state,
+                               state=state)
+    try:
+        return clusterer.final_result()
+    finally:
+        clusterer.close()
 
 
 def assign_points_to_clusters(points: Collection[Vector],
                               centroids: Collection[NamedVector],
-                              distance_function: Distance_Function = euclidean_distance
-                              ) -> Dict[NamedVector, Collection[Vector]]:
+                              distance_function: Distance_Function = euclidean_distance,
+                              centroid_index: str = None) -> Dict[NamedVector, Collection[Vector]]:
     """
     Assigns each given point to its closest cluster/centroid.
 
@@ -46,33 +106,722 @@ def assign_points_to_clusters(points: Collection[Vector],
     will be assigned to one and only one of them. The is NO GUARANTEE for which of them a
     point will be assigned to or that this assignment is deterministic.
 
+    This is a thin adapter around assign_clustering, which does the actual work on arrays.
+
     :param points: Collection of points that will be clustered / assigned to centroids
     :param centroids: Centroid used for clustering
     :param distance_function: Function used to calculate the distance between a point and
                         centroid
-    :return: Positive float - relative measure of quality of a clustering, lower is better
-    """
-    result = {}
-    distance = distance_function
-    for point in points:
-        # Starts with no cluster associated and an positive infinite distance to the clusters center
-        associated_cluster = None
-        min_dist = float("inf")
-        for named_centroid in centroids:
-            d = distance(point, named_centroid[1])
-            if d < min_dist:
-                min_dist = d
-                associated_cluster = named_centroid
-        if associated_cluster not in result:
-            result[associated_cluster] = {point}
+    :param centroid_index: Search tree over the centroids used to find the closest one, see build_centroid_index.
+                        Pays off for thousands of centroids. Defaults to calculating the distances to all centroids.
+    :return: Dictionary of clusters. Keys are NamedVectors, Values are sets of Vectors. Empty
+                        Clusters are contained as key with an empty set as value.
+    """
+    point_list = list(points)
+    named_centroids = list(centroids)
+    return assign_clustering(point_list, named_centroids, distance_function, centroid_index).to_dict(point_list,
+                                                                                                 named_centroids)
+
+
+def assign_clustering(points: Collection[Vector],
+                      centroids: Collection[NamedVector],
+                      distance_function: Distance_Function = euclidean_distance,
+                      centroid_index: str = None) -> Clustering:
+    """
+    Assigns each given point to its closest centroid, like assign_points_to_clusters, but returns a
+    Clustering backed by arrays instead of a dictionary of sets.
+
+    :param points: Collection of points, preferably a (n, d) float matrix, which is used without copying
+    :param centroids: Named centroids used for clustering
+    :param distance_function: Function used to calculate the distance between a point and a centroid
+    :param centroid_index: Search tree over the centroids used to find the closest one, see build_centroid_index
+    :return: The clustering. Duplicate points are kept as separate points.
+    """
+    named_centroids = list(centroids)
+    points = as_matrix(points)
+    centroid_matrix = as_matrix([named_centroid[1] for named_centroid in named_centroids])
+    if points.shape[0] == 0:
+        labels = numpy.empty(0, dtype=numpy.intp)
+    else:
+        labels = assign_labels(points, centroid_matrix, distance_function=distance_function,
+                               centroid_index=centroid_index)
+    return Clustering(labels, centroid_matrix, [named_centroid[0] for named_centroid in named_centroids], points)
+
+
+def assign_labels(points: Matrix,
+                  centroids: Matrix,
+                  distance_function: Distance_Function = euclidean_distance,
+                  chunk_size: int = None,
+                  centroid_index: str = None) -> numpy.ndarray:
+    """
+    Assigns each row of a point matrix to its closest centroid and returns the index of that centroid.
+
+    For registered metrics (see thb_dmc.metrics) all distances of a chunk of points to all centroids are
+    calculated as one batched matrix operation. Chunking keeps the memory bounded to roughly
+    chunk_size * k distances at once. Any other distance function is called once per pair of
+    point and centroid, both passed as tuples.
+
+    If there are two or more centroids that have the same distance to a point, the point is assigned
+    to the one with the lowest index.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param centroids: (k, d) matrix of centroids, one centroid per row
+    :param distance_function: Function used to calculate the distance between a point and a centroid
+    :param chunk_size: Number of points whose distances are calculated at once.
+                        Defaults to a size that keeps the distance matrix of a chunk below
+                        DEFAULT_CHUNK_ELEMENTS entries.
+    :param centroid_index: Kind of search tree built over the centroids to find the closest one without
+                        calculating the distances to all of them, see build_centroid_index.
+                        Defaults to calculating all distances.
+    :return: Integer array of length n holding the index of the closest centroid for every point
+    """
+    points = as_matrix(points)
+    centroids = as_matrix(centroids)
+    num_points = points.shape[0]
+    num_centroids = centroids.shape[0]
+    if num_centroids == 0:
+        raise ValueError("Can not assign points without any centroid")
+    if centroid_index is not None:
+        return build_centroid_index(centroids, distance_function, centroid_index).assign(points)
+
+    labels = numpy.empty(num_points, dtype=numpy.intp)
+    for start, stop in chunk_bounds(num_points, num_centroids, chunk_size):
+        distances = ranking_distances(points[start:stop], centroids, distance_function)
+        numpy.argmin(distances, axis=1, out=labels[start:stop])
+    return labels
+
+
+def assign_and_sum(points: Matrix,
+                   centroids: Matrix,
+                   distance_function: Distance_Function = euclidean_distance,
+                   chunk_size: int = None,
+                   weights: numpy.ndarray = None,
+                   labels: numpy.ndarray = None) -> Tuple[numpy.ndarray, Matrix, numpy.ndarray]:
+    """
+    Assigns each row of a point matrix to its closest centroid, like assign_labels, and adds every point to the
+    coordinate sums and point counts of its cluster in the same pass.
+
+    Every chunk of points is summed up right after its labels are known, while it is still in the cache,
+    so the simple centroids follow from one pass over the points and a (k, d) division, see centroids_from_sums.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param centroids: (k, d) matrix of centroids, one centroid per row
+    :param distance_function: Function used to calculate the distance between a point and a centroid
+    :param chunk_size: Number of points whose distances are calculated at once, see assign_labels
+    :param weights: Float array of length n, the weight of every point. Defaults to a weight of one per point.
+    :param labels: Integer array of length n the labels are written to. Defaults to a new array.
+    :return: The labels, the (k, d) float64 matrix of the coordinate sums per cluster and the number of points
+                        per cluster, or the total weight per cluster if weights are given
+    """
+    points = as_matrix(points)
+    centroids = as_matrix(centroids)
+    num_points = points.shape[0]
+    num_centroids = centroids.shape[0]
+    if num_centroids == 0:
+        raise ValueError("Can not assign points without any centroid")
+    if labels is None:
+        labels = numpy.empty(num_points, dtype=numpy.intp)
+    sums = numpy.zeros((num_centroids, points.shape[1]))
+    counts = numpy.zeros(num_centroids, dtype=numpy.int64 if weights is None else float)
+    for start, stop in chunk_bounds(num_points, num_centroids, chunk_size):
+        chunk_labels = labels[start:stop]
+        numpy.argmin(ranking_distances(points[start:stop], centroids, distance_function), axis=1, out=chunk_labels)
+        chunk_sums, chunk_counts = cluster_sums(points[start:stop], chunk_labels, num_centroids,
+                                                None if weights is None else weights[start:stop])
+        sums += chunk_sums
+        counts += chunk_counts
+    return labels, sums, counts
+
+
+def inertia(points: Matrix,
+            labels: numpy.ndarray,
+            centroids: Matrix,
+            distance_function: Distance_Function = euclidean_distance,
+            chunk_size: int = None,
+            weights: numpy.ndarray = None) -> float:
+    """
+    Calculates the sum of the squared distances of all points to the centroids they are assigned to,
+    the quantity k-means minimizes.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param labels: Integer array of length n, the index of the centroid every point is assigned to
+    :param centroids: (k, d) matrix of centroids, one centroid per row
+    :param distance_function: Function used to calculate the distance between a point and a centroid
+    :param chunk_size: Number of points whose distances are calculated at once.
+    :param weights: Float array of length n, the weight of every point. Defaults to a weight of one per point.
+    :return: Non-negative float, lower is better. Accumulated in float64, also for float32 points.
+    """
+    total = 0.0
+    for start, stop in chunk_bounds(points.shape[0], points.shape[1], chunk_size):
+        distances = paired_distances(points[start:stop], centroids[labels[start:stop]], distance_function)
+        distances = distances.astype(float, copy=False)
+        if weights is None:
+            total += float(numpy.dot(distances, distances))
         else:
-            result[associated_cluster].add(point)
+            total += float(numpy.dot(distances * weights[start:stop], distances))
+    return total
+
+
+class KmeansState(NamedTuple):
+    """
+    Fitted state of k-means, enough to continue clustering after points were added or removed,
+    see ArrayKmeanClusterer and IncrementalKmeanClusterer.
+    """
+    # Names of the clusters
+    names: Collection[str]
+    # (k, d) matrix of the centroids the points were assigned to
+    centroids: Matrix
+    # (k, d) matrix of the coordinate sums of the points of every cluster
+    sums: Matrix
+    # Number of points of every cluster, or their total weight if the points are weighted
+    counts: numpy.ndarray
+    # Index of the centroid of every point, None if only the sums and counts are known
+    labels: numpy.ndarray = None
+    # Upper bound of the distance of every point to its centroid, see HamerlyAssigner
+    upper_bounds: numpy.ndarray = None
+    # Lower bound of the distance of every point to every other centroid, see HamerlyAssigner
+    lower_bounds: numpy.ndarray = None
+    # Weight of every point, in the order of the labels. None if every point weighs one.
+    weights: numpy.ndarray = None
+
+    def named_centroids(self) -> Collection[NamedVector]:
+        """
+        :return: Tuple of NamedVectors, one per cluster, e.g. to start another clusterer with
+        """
+        return tuple((name, tuple(centroid)) for name, centroid in zip(self.names, self.centroids.tolist()))
+
 
-    # Add Clusters to result that do not have any points associated with them
-    for named_centroid in centroids:
-        if named_centroid not in result:
-            result[named_centroid] = {}
-    return result
+class ArrayKmeanClusterer:
+    """
+    This class encapsulates the k-means algorithm working on arrays.
+
+    The points are kept in one (n, d) matrix, the state is a label vector plus a (k, d) centroid matrix.
+    Iterating it yields a read-only label array per iteration. Label arrays and centroid matrices are
+    never modified after they were handed out, so no copies are made. The Clustering of an iteration
+    and the dictionary of clusters are only built when asked for by clustering and to_dict.
+    """
+
+    def __init__(self, points: Collection[Vector],
+                 initial_centroids: Collection[NamedVector] = (("default", (0.0, 0.0)),),
+                 distance_function: Distance_Function = euclidean_distance,
+                 centroid_function: Centroid_Function = simple_centroid,
+                 chunk_size: int = None,
+                 accelerated: bool = False,
+                 n_jobs: int = None,
+                 hooks: Collection[Iteration_Hook] = (),
+                 stopping_criteria: StoppingCriteria = None,
+                 centroid_index: str = None,
+                 weights: Collection[float] = None,
+                 dtype=None,
+                 state: KmeansState = None):
+        """
+
+        :param points: Collection of points that shall be clustered, preferably a (n, d) float matrix,
+                            which is used without copying.
+        :param initial_centroids: Collection of initial centroids, also implicitly stating the k of k-means
+        :param distance_function: Function to calculate the distance between vectors.
+                            Defaults to the euclidean distance.
+        :param centroid_function: Function to calculate a centroid of a set of vectors.
+                            Defaults to the simple centroid function, which is calculated on the arrays directly.
+                            Any other function is called once per cluster with a list of its points.
+        :param chunk_size: Number of points whose distances are calculated at once, see assign_labels.
+        :param accelerated: Skip distance evaluations that can not change an assignment, see HamerlyAssigner.
+                            Only valid for distance functions that are metrics, like the euclidean or the block
+                            distance; registered ones without the triangle inequality are rejected.
+                            The final clustering is the same as without acceleration.
+        :param n_jobs: Number of worker processes the points are sharded across, see ShardedAssigner.
+                            The workers are started on the first iteration and shared by all copies of this
+                            clusterer until close is called. Defaults to a single process.
+                            The labels are the same as with a single process; the centroid sums are added up
+                            per shard, so the centroids may differ in the last bits.
+        :param hooks: Functions called with the IterationStats of every iteration, see thb_dmc.instrumentation.
+                            Without hooks nothing is measured. With hooks, the inertia and centroid shift cost
+                            an extra pass over the points and centroids per iteration.
+        :param stopping_criteria: Criteria ending the iterations before the centroids stop changing exactly,
+                            see thb_dmc.convergence. Defaults to iterating until they do.
+        :param centroid_index: Kind of search tree rebuilt over the centroids every iteration to find the closest
+                            one, see build_centroid_index. Pays off for thousands of centroids.
+                            Can not be combined with accelerated.
+        :param weights: Non-negative weight of every point, in the order of the points, e.g. the counts returned
+                            by deduplicate. Centroids and inertia are weighted, a centroid function other than the
+                            simple centroid is called with the weights of the cluster as keyword argument weights.
+                            Defaults to a weight of one per point.
+        :param dtype: Float type the points and centroids are stored and their distances calculated in, one of
+                            FLOAT_DTYPES. numpy.float32 halves the memory and bandwidth of numpy.float64, the
+                            coordinate sums of the clusters and the inertia are still accumulated in float64.
+                            Distances that differ in the last float32 bits may tip the assignment of points
+                            almost equally close to two centroids. Defaults to float32 for float32 point
+                            matrices, e.g. a dataset written with dtype float32, and to float64 for anything else.
+        :param state: Fitted state to continue from instead of initial_centroids, e.g. the state of the previous
+                            run on a dataset that points were appended to since. The first iteration assigns the
+                            points to the centroids of the state. If the state has labels, they belong to the first
+                            points, in order, and any further points are new. With accelerated and the bounds of
+                            the state, the first iterations then only calculate the distances of the new points and
+                            of the points the bounds can not settle, see HamerlyAssigner.restore. The weights of the
+                            points are given by weights, not by the state. To remove points from a state, see
+                            IncrementalKmeanClusterer.
+        """
+        metric = get_metric(distance_function)
+        if accelerated and metric is not None and not metric.triangle_inequality:
+            raise ValueError("The accelerated assignment needs the triangle inequality, {} violates it"
+                             .format(metric.name))
+        if accelerated and n_jobs is not None and n_jobs > 1:
+            raise ValueError("The accelerated assignment runs in a single process, it can not be sharded")
+        if accelerated and centroid_index is not None:
+            raise ValueError("The accelerated assignment can not be combined with a centroid index")
+        self.points = as_matrix(points, dtype)
+        self._weights = None
+        if weights is not None:
+            self._weights = _read_only(numpy.array(weights, dtype=float))
+            if self._weights.shape != (self.points.shape[0],):
+                raise ValueError("Got {} weights for {} points".format(len(self._weights), self.points.shape[0]))
+            if (self._weights < 0.0).any():
+                raise ValueError("Weights must not be negative")
+        if state is not None:
+            if state.labels is not None and len(state.labels) > self.points.shape[0]:
+                raise ValueError("The state has labels for {} points, got only {}"
+                                 .format(len(state.labels), self.points.shape[0]))
+            initial_centroids = zip(state.names, numpy.asarray(state.centroids).tolist())
+        self._state = state
+        named_centroids = list(initial_centroids)
+        self._names = tuple(named_centroid[0] for named_centroid in named_centroids)
+        self._initial_named_centroids = tuple((name, tuple(centroid)) for name, centroid in named_centroids)
+        self._initial_centroids = _read_only(as_matrix([named_centroid[1] for named_centroid in named_centroids],
+                                                       self.points.dtype))
+        if self.points.shape == (0, 0):
+            # An empty collection of points has no dimension, it takes the one of the centroids
+            self.points = numpy.empty((0, self._initial_centroids.shape[1]), dtype=self.points.dtype)
+        self._distance_function = distance_function
+        self._centroid_function = centroid_function
+        self._chunk_size = chunk_size
+        self._accelerated = accelerated
+        self._n_jobs = n_jobs
+        # Created here, so all copies start and close the same workers
+        self._sharded_assigner = _LazyShardedAssigner(self.points, n_jobs, chunk_size)
+        self._hooks = tuple(hooks)
+        self._stopping_criteria = stopping_criteria
+        self._centroid_index = centroid_index
+        self._reset()
+
+    def _reset(self):
+        self._assigner = self._new_assigner() if self._accelerated else None
+        self._distance_evaluations = 0
+        self._skipped_distance_evaluations = 0
+        self._is_converged = False
+        self._stop_reason = None
+        self._started = None
+        self._iteration = 0
+        self._centroids = self._initial_centroids
+        self._assigned_centroids = None
+        self._labels = None
+        self._sizes = None
+        self._inertia = None
+
+    def _new_assigner(self) -> HamerlyAssigner:
+        """
+        :return: A HamerlyAssigner, continuing from the labels and bounds of the state if it has them
+        """
+        assigner = HamerlyAssigner(self._distance_function, self._chunk_size)
+        state = self._state
+        if state is not None and state.labels is not None and state.upper_bounds is not None \
+                and state.lower_bounds is not None:
+            assigner.restore(self._initial_centroids, state.labels, state.upper_bounds, state.lower_bounds)
+            if len(state.labels) < self.points.shape[0]:
+                assigner.extend(self.points)
+        return assigner
+
+    def __copy__(self):
+        """
+        Shares the point matrix and initial centroids, which are never modified.
+
+        :return: A new clusterer in its initial state.
+        """
+        clone = ArrayKmeanClusterer.__new__(ArrayKmeanClusterer)
+        clone.__dict__.update(self.__dict__)
+        clone._reset()
+        return clone
+
+    def __iter__(self):
+        """
+
+        :return: A copy of itself reset to its initial state.
+        """
+        return copy.copy(self)
+
+    def __next__(self) -> numpy.ndarray:
+        """
+        Calculates the next step of the k-means algorithm. Stops iteration on convergence
+        or once a stopping criterion is met.
+        :return: Read-only integer array holding the index of the assigned centroid for every point.
+        """
+        if self._is_converged:
+            raise StopIteration
+
+        hooks = self._hooks
+        criteria = self._stopping_criteria
+        previous_labels = self._labels
+        previous_inertia = self._inertia
+        if hooks or criteria is not None:
+            started = time.perf_counter()
+            if self._started is None:
+                self._started = started
+        if hooks:
+            previous_evaluations = self._distance_evaluations
+        labels, sums_and_counts = self._assignment_step()
+        if hooks:
+            assigned = time.perf_counter()
+        new_centroids, sizes = self._update_step(labels, sums_and_counts)
+        if hooks:
+            updated = time.perf_counter()
+        labels = _read_only(labels)
+        new_centroids = _read_only(new_centroids)
+
+        # After calculating the new centroid, we see that we converged.
+        # However, we still want to show the previous solution, so we return the result of this iteration
+        # so that the next iteration shows the clustering with the final centroids
+        # We do no want the same result twice, therefor we stop the iteration.
+        self._is_converged = numpy.array_equal(new_centroids, self._centroids)
+        self._iteration += 1
+        self._assigned_centroids = self._centroids
+        self._centroids = new_centroids
+        self._labels = labels
+        # Weighted sizes are total weights, the number of points per cluster is counted when needed
+        self._sizes = _read_only(sizes) if self._weights is None else None
+        self._inertia = None
+        if self._is_converged:
+            self._stop_reason = StopReason.CONVERGED
+        elif criteria is not None:
+            self._stop_reason = self._check_criteria(criteria, previous_labels, previous_inertia)
+            self._is_converged = self._stop_reason is not None
+
+        if hooks:
+            checked = time.perf_counter()
+            stats = IterationStats(iteration=self._iteration,
+                                   assignment_seconds=assigned - started,
+                                   update_seconds=updated - assigned,
+                                   convergence_seconds=checked - updated,
+                                   distance_evaluations=self._distance_evaluations - previous_evaluations,
+                                   points_changed=self._points_changed(previous_labels),
+                                   centroid_shift=self._centroid_shift(),
+                                   inertia=self.inertia)
+            for hook in hooks:
+                hook(stats)
+        return labels
+
+    def _check_criteria(self, criteria: StoppingCriteria, previous_labels: numpy.ndarray,
+                        previous_inertia: float):
+        """
+        :return: The first stopping criterion met by the last iteration, None if none is met.
+                            Only the measurements the enabled criteria need are calculated.
+        """
+        centroid_shift = None
+        inertia_improvement = None
+        reassigned_fraction = None
+        if criteria.max_centroid_shift is not None:
+            centroid_shift = self._centroid_shift()
+        if criteria.relative_inertia_improvement is not None:
+            # Calculated now, so the next iteration has the previous inertia to compare to
+            current_inertia = self.inertia
+            if previous_inertia is not None and previous_inertia > 0.0:
+                inertia_improvement = (previous_inertia - current_inertia) / previous_inertia
+        if criteria.reassigned_fraction is not None and previous_labels is not None and len(self._labels) > 0:
+            reassigned_fraction = self._points_changed(previous_labels) / len(self._labels)
+        return criteria.stop_reason(iteration=self._iteration,
+                                    seconds=time.perf_counter() - self._started,
+                                    centroid_shift=centroid_shift,
+                                    inertia_improvement=inertia_improvement,
+                                    reassigned_fraction=reassigned_fraction)
+
+    def _centroid_shift(self) -> float:
+        """
+        :return: Largest distance a centroid moved in the last iteration
+        """
+        shifts = paired_distances(self._assigned_centroids, self._centroids, self._distance_function)
+        return float(shifts.max()) if len(shifts) else 0.0
+
+    def _points_changed(self, previous_labels: numpy.ndarray) -> int:
+        """
+        :return: Number of points assigned to a different centroid than in the previous iteration,
+                            all points in the first one
+        """
+        if previous_labels is None:
+            return len(self._labels)
+        return int(numpy.count_nonzero(self._labels != previous_labels))
+
+    def _assignment_step(self):
+        """
+        :return: Labels of the points for the current centroids. When the assignment summed up the clusters on the
+                            way, also their coordinate sums and point counts, otherwise None.
+        """
+        if self._n_jobs is None or self._n_jobs <= 1:
+            if self._assigner is None and self._centroid_index is None and self._centroid_function is simple_centroid:
+                # One fused pass instead of assigning all points and summing them up afterwards
+                self._distance_evaluations += self.points.shape[0] * self._centroids.shape[0]
+                labels, sums, counts = assign_and_sum(self.points, self._centroids, self._distance_function,
+                                                      self._chunk_size, self._weights)
+                return labels, (sums, counts)
+            return self._assign(), None
+
+        self._distance_evaluations += self.points.shape[0] * self._centroids.shape[0]
+        labels, sums, counts = self._sharded_assigner.assign(self._centroids, self._distance_function,
+                                                             self._centroid_index)
+        # The shards sum up the points unweighted
+        return labels, (sums, counts) if self._weights is None else None
+
+    def _update_step(self, labels: numpy.ndarray, sums_and_counts):
+        """
+        :return: The centroids of the clusters the labels form and the number of points per cluster
+        """
+        if sums_and_counts is not None and self._centroid_function is simple_centroid:
+            sums, counts = sums_and_counts
+            return centroids_from_sums(sums, counts, self._centroids), counts
+        return cluster_centroids(self.points, labels, self._centroids, self._centroid_function, self._weights)
+
+    def close(self):
+        """
+        Stops the worker processes, if any were started. Copies of this clusterer share them, so this stops the
+        workers of all copies; the next iteration of any of them starts new ones.
+        """
+        self._sharded_assigner.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _assign(self) -> numpy.ndarray:
+        if self._centroid_index is not None:
+            index = build_centroid_index(self._centroids, self._distance_function, self._centroid_index)
+            labels = index.assign(self.points)
+            self._distance_evaluations += index.distance_evaluations
+            self._skipped_distance_evaluations += \
+                self.points.shape[0] * self._centroids.shape[0] - index.distance_evaluations
+            return labels
+        if self._assigner is None:
+            self._distance_evaluations += self.points.shape[0] * self._centroids.shape[0]
+            return assign_labels(self.points, self._centroids,
+                                 distance_function=self._distance_function,
+                                 chunk_size=self._chunk_size)
+        labels = self._assigner.assign(self.points, self._centroids)
+        self._distance_evaluations = self._assigner.distance_evaluations
+        self._skipped_distance_evaluations = self._assigner.skipped_distance_evaluations
+        return labels
+
+    @property
+    def inertia(self) -> float:
+        """
+        Sum of the squared distances of all points to the centroids they were assigned to in the last iteration,
+        None before the first one. Calculated with an extra pass over the points on first access.
+        """
+        if self._inertia is None and self._labels is not None:
+            self._inertia = inertia(self.points, self._labels, self._assigned_centroids,
+                                    self._distance_function, self._chunk_size, self._weights)
+        return self._inertia
+
+    @property
+    def stop_reason(self) -> StopReason:
+        """Why the iterations stopped, None while they go on."""
+        return self._stop_reason
+
+    @property
+    def iteration(self) -> int:
+        """Number of iterations calculated so far."""
+        return self._iteration
+
+    @property
+    def distance_evaluations(self) -> int:
+        """Number of distances between a point and a centroid calculated so far."""
+        return self._distance_evaluations
+
+    @property
+    def skipped_distance_evaluations(self) -> int:
+        """Number of distances between a point and a centroid the acceleration skipped so far."""
+        return self._skipped_distance_evaluations
+
+    @property
+    def distance_function(self) -> Distance_Function:
+        """Function used to calculate the distance between a point and a centroid."""
+        return self._distance_function
+
+    @property
+    def weights(self) -> numpy.ndarray:
+        """Read-only weight of every point, None if every point weighs one."""
+        return self._weights
+
+    @property
+    def dtype(self) -> numpy.dtype:
+        """Float type of the points and centroids."""
+        return self.points.dtype
+
+    @property
+    def names(self) -> Collection[str]:
+        """Names of the centroids, in the order of the rows of the centroid matrices."""
+        return self._names
+
+    @property
+    def centroids(self) -> Matrix:
+        """Read-only (k, d) matrix of the current centroids, used by the next iteration."""
+        return self._centroids
+
+    @property
+    def assigned_centroids(self) -> Matrix:
+        """Read-only (k, d) matrix of the centroids the current labels were assigned to."""
+        return self._assigned_centroids
+
+    @property
+    def labels(self) -> numpy.ndarray:
+        """Read-only labels of the last iteration, None before the first one."""
+        return self._labels
+
+    def named_centroids(self, centroids: Matrix = None) -> Collection[NamedVector]:
+        """
+        :param centroids: Centroid matrix to name. Defaults to the current centroids.
+        :return: Tuple of NamedVectors, one per centroid.
+        """
+        if centroids is None:
+            centroids = self._centroids
+        return tuple((name, tuple(centroid)) for name, centroid in zip(self._names, centroids.tolist()))
+
+    @property
+    def state(self) -> KmeansState:
+        """
+        Fitted state of the last iteration, None before the first one. The sums are calculated with an extra pass
+        over the points. With acceleration, the state holds the bounds of the points as well.
+        """
+        if self._labels is None:
+            return None
+        sums, counts = cluster_sums(self.points, self._labels, len(self._names), self._weights)
+        upper_bounds = lower_bounds = None
+        if self._assigner is not None:
+            upper_bounds = self._assigner.upper_bounds
+            lower_bounds = self._assigner.lower_bounds
+        return KmeansState(self._names, self._assigned_centroids, sums, counts, self._labels,
+                           upper_bounds, lower_bounds, self._weights)
+
+    @property
+    def clustering(self) -> Clustering:
+        """The Clustering of the last iteration, None before the first one. Shares all arrays, nothing is copied."""
+        if self._labels is None:
+            return None
+        return Clustering(self._labels, self._assigned_centroids, self._names, self.points, self._sizes)
+
+    def to_dict(self, points: Collection[Vector] = None) -> Dict[NamedVector, Collection[Vector]]:
+        """
+        Builds the dictionary of clusters of the last iteration, as returned by KmeanClusterer.
+
+        :param points: Vectors to put into the clusters, in the order of the rows of the point matrix.
+                            Defaults to tuples of the matrix rows.
+        :return: Dictionary of clusters. Keys are NamedVectors, Values are sets of Vectors. Empty
+                        Clusters are contained as key with an empty set as value.
+        """
+        if self._labels is None:
+            raise ValueError("No iteration has been calculated yet")
+        if self._assigned_centroids is self._initial_centroids:
+            named_centroids = self._initial_named_centroids
+        else:
+            named_centroids = self.named_centroids(self._assigned_centroids)
+        return self.clustering.to_dict(points, named_centroids)
+
+    def final_result(self) -> numpy.ndarray:
+        """
+        Advances this clusterer until the k-means algorithm converged or a stopping criterion is met.
+
+        Afterwards labels, assigned_centroids and to_dict describe the final clustering.
+        :return: Read-only integer array holding the index of the assigned centroid for every point.
+        """
+        while not self._is_converged:
+            next(self)
+        return self._labels
+
+
+def cluster_centroids(points: Matrix,
+                      labels: numpy.ndarray,
+                      centroids: Matrix,
+                      centroid_function: Centroid_Function = simple_centroid,
+                      weights: numpy.ndarray = None):
+    """
+    Calculates the centroids of the clusters given by a label per point.
+
+    The simple centroid is calculated on the arrays directly. Any other centroid function is called
+    once per cluster with a list of the points of that cluster, and with a list of their weights as
+    keyword argument weights if weights are given.
+
+    :param points: (n, d) matrix of points
+    :param labels: Integer array of length n, the cluster index of every point
+    :param centroids: (k, d) matrix of the current centroids. Clusters without any point keep theirs.
+    :param centroid_function: Function to calculate a centroid of a set of vectors.
+    :param weights: Float array of length n, the weight of every point. Defaults to a weight of one per point.
+    :return: New (k, d) centroid matrix of the type of the current centroids and integer array of the number
+                        of points per cluster. With weights, a float array of the total weight per cluster instead.
+    """
+    num_centroids = centroids.shape[0]
+    if centroid_function is simple_centroid:
+        sums, counts = cluster_sums(points, labels, num_centroids, weights)
+        return centroids_from_sums(sums, counts, centroids), counts
+
+    new_centroids = numpy.array(centroids)
+
+    order = numpy.argsort(labels, kind="stable")
+    bounds = numpy.searchsorted(labels[order], numpy.arange(num_centroids + 1))
+    for j in range(num_centroids):
+        members = order[bounds[j]:bounds[j + 1]]
+        if len(members) > 0:
+            member_points = [tuple(point) for point in points[members].tolist()]
+            if weights is None:
+                new_centroids[j] = centroid_function(member_points)
+            else:
+                new_centroids[j] = centroid_function(member_points, weights=weights[members].tolist())
+    if weights is None:
+        return new_centroids, numpy.diff(bounds)
+    return new_centroids, numpy.bincount(labels, weights=weights, minlength=num_centroids)
+
+
+def centroids_from_sums(sums: Matrix, counts: numpy.ndarray, centroids: Matrix) -> Matrix:
+    """
+    Calculates the simple centroids of clusters from their coordinate sums and point counts.
+
+    :param sums: (k, d) matrix of the coordinate sums per cluster
+    :param counts: Number of points or total weight per cluster
+    :param centroids: (k, d) matrix of the current centroids. Clusters without any point keep theirs.
+    :return: New (k, d) centroid matrix of the type of the current centroids, rounded to it from the sums
+    """
+    new_centroids = numpy.array(centroids)
+    filled = counts > 0
+    new_centroids[filled] = sums[filled] / counts[filled, numpy.newaxis]
+    return new_centroids
+
+
+class _LazyShardedAssigner:
+    """
+    The ShardedAssigner of a clusterer and all its copies, started on the first assignment.
+    """
+
+    def __init__(self, points: Matrix, n_jobs: int, chunk_size: int):
+        self._points = points
+        self._n_jobs = n_jobs
+        self._chunk_size = chunk_size
+        self._assigner = None
+
+    def assign(self, centroids: Matrix, distance_function: Distance_Function, centroid_index: str):
+        """
+        :return: The labels, coordinate sums and point counts, see ShardedAssigner.assign
+        """
+        if self._assigner is None:
+            # Imported here, as it is only needed for sharding and imports this module itself
+            from thb_dmc.parallel import ShardedAssigner
+            self._assigner = ShardedAssigner(self._points, self._n_jobs, self._chunk_size)
+        return self._assigner.assign(centroids, distance_function, centroid_index)
+
+    def close(self):
+        if self._assigner is not None:
+            self._assigner.close()
+            self._assigner = None
+
+
+def _read_only(array: numpy.ndarray) -> numpy.ndarray:
+    array.flags.writeable = False
+    return array
 
 
 class KmeanClusterer:
@@ -81,13 +830,17 @@ class KmeanClusterer:
 
     It implements an iterator to allow the user to access the (non-final)
     result after each iteration of the k-means algorithm if she/he so desires.
+
+    The work is done by an ArrayKmeanClusterer; this class builds the dictionaries of clusters from its labels.
     """
 
     def __copy__(self):
-        return KmeanClusterer(self.points,
-                              initial_centroids=self._initial_clusters,
-                              distance_function=self._distance_function,
-                              centroid_function=self._centroid_function)
+        clone = KmeanClusterer.__new__(KmeanClusterer)
+        clone.__dict__.update(self.__dict__)
+        clone._engine = copy.copy(self._engine)
+        clone._stop_reason = None
+        clone._last_engine = None
+        return clone
 
     def __deepcopy__(self, memodict={}):
         """
@@ -98,12 +851,36 @@ class KmeanClusterer:
         return KmeanClusterer(copy.deepcopy(self.points),
                               initial_centroids=copy.deepcopy(self._initial_clusters),
                               distance_function=self._distance_function,
-                              centroid_function=self._centroid_function)
+                              centroid_function=self._centroid_function,
+                              accelerated=self._accelerated,
+                              n_jobs=self._n_jobs,
+                              print_steps=self._print_steps,
+                              hooks=self._hooks,
+                              stopping_criteria=self._stopping_criteria,
+                              centroid_index=self._centroid_index,
+                              weights=copy.deepcopy(self._weights),
+                              collapse_duplicates=self._collapse_duplicates,
+                              dtype=self._dtype,
+                              state=self._state)
 
     def __init__(self, points: Collection[Vector],
                  initial_centroids: Collection[NamedVector] = (("default", (0.0, 0.0)),),
                  distance_function: Distance_Function = euclidean_distance,
-                 centroid_function: Centroid_Function = simple_centroid):
+                 centroid_function: Centroid_Function = simple_centroid,
+                 accelerated: bool = False,
+                 n_jobs: int = None,
+                 print_steps: bool = False,
+                 hooks: Collection[Iteration_Hook] = (),
+                 stopping_criteria: StoppingCriteria = None,
+                 centroid_index: str = None,
+                 weights: Collection[float] = None,
+                 collapse_duplicates: bool = False,
+                 dtype=None,
+                 k: int = None,
+                 init: str = None,
+                 n_init: int = 1,
+                 random_state=None,
+                 state: KmeansState = None):
         """
 
         :param points: Collection of points that shall be clustered
@@ -112,67 +889,141 @@ class KmeanClusterer:
                             Defaults to the euclidean distance.
         :param centroid_function: Function to calculate a centroid of a set of vectors.
                             Defaults to the simple centroid function.
+        :param accelerated: Skip distance evaluations using the triangle inequality, see HamerlyAssigner.
+                            Only valid for distance functions that are metrics.
+        :param n_jobs: Number of worker processes the points are sharded across, see ShardedAssigner.
+                            Defaults to a single process.
+        :param print_steps: Print the measurements of every iteration, see print_iteration
+        :param hooks: Functions called with the IterationStats of every iteration, see thb_dmc.instrumentation
+        :param stopping_criteria: Criteria ending the iterations before the centroids stop changing exactly,
+                            see thb_dmc.convergence
+        :param centroid_index: Kind of search tree over the centroids used to find the closest one,
+                            see build_centroid_index
+        :param weights: Weight of every point, in the order of the points. Defaults to a weight of one per point.
+        :param collapse_duplicates: Cluster every distinct point once, weighted by the number of times it occurs.
+                            The clusters hold the distinct points as float tuples, which equal the given points.
+        :param dtype: Float type the points and centroids are stored and compared in, see ArrayKmeanClusterer.
+                            The clusters hold the given points either way. Defaults to float64.
+        :param k: Number of clusters, required with init
+        :param init: Seed k initial centroids among the points instead of using initial_centroids, "k-means++" or
+                            "k-means||", see seed_centroids. Can not be combined with weights or collapse_duplicates.
+        :param n_init: Number of seeded restarts run to choose the initial centroids. Iterating starts from the ones
+                            of the restart with the lowest inertia, so it ends in that restart's clustering.
+        :param random_state: Seed of the seeding, see seed_centroids
+        :param state: Fitted state to continue from instead of initial_centroids, e.g. the state of the previous
+                            run, before points were appended to the given ones, see ArrayKmeanClusterer. It can be
+                            kept with save_state and load_state. Can not be combined with init or
+                            collapse_duplicates.
         """
+        if state is not None and (init is not None or collapse_duplicates):
+            raise ValueError("A state can not be combined with seeding or collapsing duplicates")
+        if init is not None:
+            if k is None:
+                raise ValueError("Seeding with {} needs the number of clusters k".format(init))
+            if weights is not None or collapse_duplicates:
+                raise ValueError("Seeding does not support weighted points")
+            # Imported here, as the restarts import this module themselves
+            from thb_dmc.restarts import seed_centroids
+            initial_centroids = seed_centroids(as_matrix(points), k, init, n_init, distance_function,
+                                               centroid_function, n_jobs, random_state)
         self.points = points
-        self._print_steps = False
-        self._is_converged = False
+        self._print_steps = print_steps
+        self._hooks = tuple(hooks)
+        self._stopping_criteria = stopping_criteria
+        self._stop_reason = None
+        self._centroid_index = centroid_index
+        self._accelerated = accelerated
+        self._n_jobs = n_jobs
         self._initial_clusters = initial_centroids
-        self._current_clusters = self._initial_clusters
-        self._current_clustered_points = None
         self._distance_function = distance_function
         self._centroid_function = centroid_function
+        self._weights = weights
+        self._collapse_duplicates = collapse_duplicates
+        self._dtype = dtype
+        self._state = state
+        # The engine of the last iteration or final result
+        self._last_engine = None
+        self._point_list = list(points)
+        engine_points = self._point_list
+        if collapse_duplicates:
+            engine_points, weights = deduplicate(self._point_list, weights)
+            # The clusters are built from the rows of the distinct points
+            self._point_list = None
+        self._engine = ArrayKmeanClusterer(engine_points,
+                                           initial_centroids=initial_centroids,
+                                           distance_function=distance_function,
+                                           centroid_function=centroid_function,
+                                           accelerated=accelerated,
+                                           n_jobs=n_jobs,
+                                           hooks=self._hooks + ((print_iteration,) if print_steps else ()),
+                                           stopping_criteria=stopping_criteria,
+                                           centroid_index=centroid_index,
+                                           weights=weights,
+                                           dtype=dtype,
+                                           state=state)
 
     def __iter__(self):
         """
 
-        :return: A deep copy of itself reset to its initial state.
+        :return: A copy of itself reset to its initial state. The points are shared, not copied.
         """
-        return copy.deepcopy(self)
+        return copy.copy(self)
 
     def __next__(self) -> Dict[NamedVector, Collection[Vector]]:
         """
-        Calculates the next step of the k-means algorithm. Stops iteration on convergence.
+        Calculates the next step of the k-means algorithm. Stops iteration on convergence, and right away if there
+        are no points.
         :return: Dictionary of clusters. Keys are NamedVectors, Values are sets of Vectors. Empty
-                        Clusters are contained as key with an empty Collection as value.
+                        Clusters are contained as key with an empty set as value.
         """
-        if self._is_converged:
+        if self._engine.points.shape[0] == 0:
             raise StopIteration
+        self._last_engine = self._engine
+        try:
+            next(self._engine)
+        finally:
+            self._stop_reason = self._engine.stop_reason
+        return self._engine.to_dict(self._point_list)
 
-        old_clusters = copy.deepcopy(self._current_clusters)
-
-        # Assign points to current cluster
-        self._current_clustered_points = assign_points_to_clusters(self.points, self._current_clusters,
-                                                                   distance_function=self._distance_function)
-        result = copy.deepcopy(self._current_clustered_points)
+    def final_result(self) -> Dict[NamedVector, Collection[Vector]]:
+        """
+        Calculates the final clustering of the k-means algorithm based on its initial configuration.
+        :return: Dictionary of clusters. Keys are NamedVectors, Values are sets of Vectors. Empty
+                        Clusters are contained as key with an empty set as value. None if there are no points.
+        """
+        if self._engine.points.shape[0] == 0:
+            return None
+        engine = copy.copy(self._engine)
+        engine.final_result()
+        self._last_engine = engine
+        self._stop_reason = engine.stop_reason
+        return engine.to_dict(self._point_list)
 
-        # Calc new clusters based on previous assignment
-        new_clusters = set()
-        for cluster in self._current_clustered_points:
-            new_clusters.add((cluster[0], self._centroid_function(self._current_clustered_points[cluster])))
+    @property
+    def distance_function(self) -> Distance_Function:
+        """Function used to calculate the distance between a point and a centroid."""
+        return self._distance_function
 
-        # Check if newly calculated clusters are the same as the old ones
-        # if so, they converged and the previously returned clustering was already the final one
-        self._is_converged = True
-        for cluster in new_clusters:
-            if cluster not in old_clusters:
-                self._is_converged = False
-                break
+    @property
+    def stop_reason(self) -> StopReason:
+        """Why the last final_result or iteration stopped, None while the iterations go on."""
+        return self._stop_reason
 
-        # After calculating the new centroid, we see that we converged.
-        # However, we still want to show the previous solution, so we return the result of this iteration
-        # so that the next iteration shows the clustering with the final centroids
-        # We do no want the same result twice, therefor we stop the iteration.
+    @property
+    def dtype(self) -> numpy.dtype:
+        """Float type of the points and centroids."""
+        return self._engine.dtype
 
-        self._current_clusters = new_clusters
-        return result
+    @property
+    def state(self) -> KmeansState:
+        """
+        Fitted state of the last final_result or iteration, None before either, see ArrayKmeanClusterer.state.
+        Pass it as state to continue from it after points were appended.
+        """
+        return None if self._last_engine is None else self._last_engine.state
 
-    def final_result(self) -> Dict[NamedVector, Collection[Vector]]:
+    def close(self):
         """
-        Calculates the final clustering of the k-means algorithm based on its initial configuration.
-        :return: Dictionary of clusters. Keys are NamedVectors, Values are sets of Vectors. Empty
-                        Clusters are contained as key with an empty Collection as value.
+        Stops the worker processes, if any were started.
         """
-        result = None
-        for r in self:
-            result = r
-        return result
+        self._engine.close()
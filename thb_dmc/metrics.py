@@ -0,0 +1,259 @@
+"""
+Registry of named distance metrics, each with a scalar form and batched forms working on matrices.
+
+Functions working on matrices look up the distance function they are given in the registry and use its batched
+kernels. Any other distance function is called once per pair of vectors instead.
+"""
+import functools
+from typing import Callable, NamedTuple, Optional, Union
+
+import numpy
+
+from thb_dmc.vector_util import Vector, Distance_Function, Matrix, euclidean_distance, squared_euclidean_distance, \
+    block_distance, chebyshev_distance, cosine_distance, pq_distance
+
+Pairwise_Kernel = Callable[[Matrix, Matrix], Matrix]
+Paired_Kernel = Callable[[Matrix, Matrix], numpy.ndarray]
+
+
+class Metric(NamedTuple):
+    """
+    A named distance function together with its batched kernels.
+
+    A Metric can be used as distance function itself, so metrics that are not registered still get
+    the batched kernels when passed around directly.
+    """
+    name: str
+    # The distance of two vectors
+    distance: Distance_Function
+    # (n, d), (k, d) -> (n, k) distances of all rows of the first to all rows of the second matrix
+    pairwise: Pairwise_Kernel
+    # (n, d), (n, d) -> n distances of the rows with the same index
+    paired: Paired_Kernel
+    # Like pairwise, but may return any values in the same order, e.g. skipping a final root
+    ranking: Pairwise_Kernel
+    # Whether the distance satisfies the triangle inequality, which the accelerated k-means relies on
+    triangle_inequality: bool
+    # Like pairwise, but the squared distances, if they are cheaper than squaring the pairwise ones
+    squared: Optional[Pairwise_Kernel] = None
+
+    def __call__(self, x: Vector, y: Vector) -> float:
+        return self.distance(x, y)
+
+
+# Registered metrics by their name and by their distance function
+_metrics_by_name = {}
+_metrics_by_function = {}
+
+
+def register_metric(metric: Metric):
+    """
+    Adds a metric to the registry, so its distance function is recognized by get_metric.
+
+    :param metric: The metric to register. Replaces a registered metric of the same name.
+    """
+    _metrics_by_name[metric.name] = metric
+    _metrics_by_function[metric.distance] = metric
+
+
+def get_metric(distance_function: Union[Distance_Function, str]) -> Optional[Metric]:
+    """
+    :param distance_function: A distance function, a Metric or the name of a registered metric
+    :return: The matching Metric, None for distance functions that are not registered
+    """
+    if isinstance(distance_function, Metric):
+        return distance_function
+    if isinstance(distance_function, str):
+        return _metrics_by_name[distance_function]
+    return _metrics_by_function.get(distance_function)
+
+
+def pairwise_distances(x: Matrix, y: Matrix, distance_function: Distance_Function = euclidean_distance) -> Matrix:
+    """
+    Calculates the distances of all rows of x to all rows of y.
+
+    Registered metrics are calculated as batched array operations. Any other distance function is
+    called once per pair, with both rows passed as tuples.
+
+    :param x: (n, d) matrix
+    :param y: (k, d) matrix
+    :param distance_function: Function used to calculate the distance between two vectors
+    :return: (n, k) matrix of distances
+    """
+    metric = get_metric(distance_function)
+    if metric is not None:
+        return metric.pairwise(x, y)
+    y_tuples = [tuple(row) for row in y.tolist()]
+    distances = numpy.empty((x.shape[0], y.shape[0]))
+    for i, row in enumerate(x.tolist()):
+        row = tuple(row)
+        distances[i] = [distance_function(row, other) for other in y_tuples]
+    return distances
+
+
+def paired_distances(x: Matrix, y: Matrix, distance_function: Distance_Function = euclidean_distance) -> numpy.ndarray:
+    """
+    Calculates the distance of every row of x to the row of y with the same index.
+
+    :param x: (n, d) matrix
+    :param y: (n, d) matrix
+    :param distance_function: Function used to calculate the distance between two vectors
+    :return: Array of n distances
+    """
+    metric = get_metric(distance_function)
+    if metric is not None:
+        return metric.paired(x, y)
+    return numpy.array([distance_function(tuple(a), tuple(b)) for a, b in zip(x.tolist(), y.tolist())],
+                       dtype=float)
+
+
+def ranking_distances(x: Matrix, y: Matrix, distance_function: Distance_Function = euclidean_distance) -> Matrix:
+    """
+    Calculates values ordered like the distances of all rows of x to all rows of y, which is all finding the
+    closest row needs. For registered metrics this may skip work, e.g. the square root of the euclidean distance.
+
+    :param x: (n, d) matrix
+    :param y: (k, d) matrix
+    :param distance_function: Function used to calculate the distance between two vectors
+    :return: (n, k) matrix, ordered like the distances
+    """
+    metric = get_metric(distance_function)
+    if metric is not None:
+        return metric.ranking(x, y)
+    return pairwise_distances(x, y, distance_function)
+
+
+def squared_pairwise_distances(x: Matrix, y: Matrix,
+                               distance_function: Distance_Function = euclidean_distance) -> Matrix:
+    """
+    Calculates the squared distances of all rows of x to all rows of y, e.g. for the probabilities of k-means++.
+    For registered metrics this may skip work, e.g. the square root of the euclidean distance.
+
+    :param x: (n, d) matrix
+    :param y: (k, d) matrix
+    :param distance_function: Function used to calculate the distance between two vectors
+    :return: (n, k) matrix of squared distances
+    """
+    metric = get_metric(distance_function)
+    if metric is not None and metric.squared is not None:
+        return metric.squared(x, y)
+    return pairwise_distances(x, y, distance_function) ** 2
+
+
+def squared_euclidean_pairwise(x: Matrix, y: Matrix) -> Matrix:
+    """
+    Calculates the squared euclidean distances of all rows of x to all rows of y via
+    |x|^2 - 2 x*y + |y|^2, so the bulk of the work is a single matrix product.
+
+    Both matrices are first shifted to the mean of y. That leaves the distances unchanged, but far from the origin,
+    compared to the spread of the points, the three terms are so large that their difference is lost, in float64 as
+    well as in float32.
+
+    :param x: (n, d) matrix
+    :param y: (k, d) matrix
+    :return: (n, k) matrix of squared distances
+    """
+    if y.shape[0] > 0:
+        center = y.mean(axis=0, dtype=float)
+        if x.dtype == numpy.float32 and y.dtype == numpy.float32:
+            center = center.astype(numpy.float32)
+        x = x - center
+        y = y - center
+    distances = x @ y.T
+    distances *= -2.0
+    distances += numpy.einsum("ij,ij->i", x, x)[:, numpy.newaxis]
+    distances += numpy.einsum("ij,ij->i", y, y)[numpy.newaxis, :]
+    return numpy.maximum(distances, 0.0, out=distances)
+
+
+def _squared_euclidean_paired(x: Matrix, y: Matrix) -> numpy.ndarray:
+    difference = x - y
+    return numpy.einsum("ij,ij->i", difference, difference)
+
+
+def _euclidean_pairwise(x: Matrix, y: Matrix) -> Matrix:
+    return numpy.sqrt(squared_euclidean_pairwise(x, y))
+
+
+def _euclidean_paired(x: Matrix, y: Matrix) -> numpy.ndarray:
+    return numpy.sqrt(_squared_euclidean_paired(x, y))
+
+
+def _accumulate_dimensions(x: Matrix, y: Matrix, combine) -> Matrix:
+    # One dimension at a time, so no (n, k, d) intermediate is ever created.
+    distances = numpy.zeros((x.shape[0], y.shape[0]))
+    for dimension in range(x.shape[1]):
+        combine(distances, numpy.abs(x[:, dimension, numpy.newaxis] - y[numpy.newaxis, :, dimension]))
+    return distances
+
+
+def _block_pairwise(x: Matrix, y: Matrix) -> Matrix:
+    return _accumulate_dimensions(x, y, lambda distances, differences: numpy.add(distances, differences,
+                                                                                out=distances))
+
+
+def _block_paired(x: Matrix, y: Matrix) -> numpy.ndarray:
+    return numpy.abs(x - y).sum(axis=1)
+
+
+def _chebyshev_pairwise(x: Matrix, y: Matrix) -> Matrix:
+    return _accumulate_dimensions(x, y, lambda distances, differences: numpy.maximum(distances, differences,
+                                                                                    out=distances))
+
+
+def _chebyshev_paired(x: Matrix, y: Matrix) -> numpy.ndarray:
+    return numpy.abs(x - y).max(axis=1, initial=0.0)
+
+
+def _cosine_pairwise(x: Matrix, y: Matrix) -> Matrix:
+    x_norms = numpy.sqrt(numpy.einsum("ij,ij->i", x, x))
+    y_norms = numpy.sqrt(numpy.einsum("ij,ij->i", y, y))
+    norms = numpy.outer(x_norms, y_norms)
+    norms[norms == 0.0] = numpy.inf
+    return 1.0 - (x @ y.T) / norms
+
+
+def _cosine_paired(x: Matrix, y: Matrix) -> numpy.ndarray:
+    norms = numpy.sqrt(numpy.einsum("ij,ij->i", x, x) * numpy.einsum("ij,ij->i", y, y))
+    norms[norms == 0.0] = numpy.inf
+    return 1.0 - numpy.einsum("ij,ij->i", x, y) / norms
+
+
+def _powered_pairwise(x: Matrix, y: Matrix, q: float) -> Matrix:
+    return _accumulate_dimensions(x, y, lambda distances, differences: numpy.add(distances, differences ** q,
+                                                                                out=distances))
+
+
+def _minkowski_pairwise(x: Matrix, y: Matrix, q: float) -> Matrix:
+    return _powered_pairwise(x, y, q) ** (1.0 / q)
+
+
+def _minkowski_paired(x: Matrix, y: Matrix, q: float) -> numpy.ndarray:
+    return (numpy.abs(x - y) ** q).sum(axis=1) ** (1.0 / q)
+
+
+def minkowski_metric(q: float) -> Metric:
+    """
+    Creates the metric for the distance of pq_distance with exponent q, the q-th root of the sum of all
+    |x_i - y_i| ** q. q = 1 is the block distance, q = 2 the euclidean distance.
+
+    :param q: The exponent / degree of root, at least one for the triangle inequality to hold
+    :return: A metric named "minkowski_<q>", usable as distance function
+    """
+    return Metric(name="minkowski_{}".format(q),
+                  distance=functools.partial(pq_distance, q=q),
+                  pairwise=functools.partial(_minkowski_pairwise, q=q),
+                  paired=functools.partial(_minkowski_paired, q=q),
+                  ranking=functools.partial(_powered_pairwise, q=q),
+                  triangle_inequality=q >= 1)
+
+
+for _metric in (Metric("euclidean", euclidean_distance, _euclidean_pairwise, _euclidean_paired,
+                       squared_euclidean_pairwise, True, squared_euclidean_pairwise),
+                Metric("squared_euclidean", squared_euclidean_distance, squared_euclidean_pairwise,
+                       _squared_euclidean_paired, squared_euclidean_pairwise, False),
+                Metric("manhattan", block_distance, _block_pairwise, _block_paired, _block_pairwise, True),
+                Metric("chebyshev", chebyshev_distance, _chebyshev_pairwise, _chebyshev_paired, _chebyshev_pairwise,
+                       True),
+                Metric("cosine", cosine_distance, _cosine_pairwise, _cosine_paired, _cosine_pairwise, False)):
+    register_metric(_metric)
@@ -0,0 +1,184 @@
+"""
+Module implementing mini-batch k-means for points that come in batches and do not fit into memory at once.
+
+Based on:
+D. Sculley. Web-scale k-means clustering.
+Proceedings of the 19th International Conference on World Wide Web, 1177–1178, 2010.
+DOI: 10.1145/1772690.1772862
+
+"""
+from typing import Collection, Iterable
+
+import numpy
+
+from thb_dmc.kmeans import assign_labels, cluster_centroids
+from thb_dmc.vector_util import Vector, NamedVector, Distance_Function, euclidean_distance, simple_centroid, \
+    Centroid_Function, Matrix, as_matrix
+
+
+def minibatch_kmeans(batches: Iterable[Collection[Vector]],
+                     initial_centroids: Collection[NamedVector] = (("default", (0.0, 0.0)),),
+                     distance_function: Distance_Function = euclidean_distance,
+                     centroid_function: Centroid_Function = simple_centroid) -> Collection[NamedVector]:
+    """
+    Applies mini-batch k-means to the given batches of points and returns the final centroids.
+
+    Takes the same arguments as kmeans, except that the points come as an iterable of batches,
+    which is consumed exactly once. The points themselves are not kept, so only the centroids are returned.
+
+    :param batches: Iterable (e.g. a generator) of collections of points that shall be clustered
+    :param initial_centroids: Collection of initial centroids, also implicitly stating the k of k-means
+    :param distance_function: Function to calculate the distance between vectors.
+                        Defaults to the euclidean distance.
+    :param centroid_function: Function to calculate a centroid of a set of vectors.
+                        Defaults to the simple centroid function.
+    :return: Tuple of the final NamedVectors.
+    """
+    clusterer = MiniBatchKmeanClusterer(initial_centroids=initial_centroids,
+                                        distance_function=distance_function,
+                                        centroid_function=centroid_function)
+    clusterer.fit(batches)
+    return clusterer.named_centroids()
+
+
+class MiniBatchKmeanClusterer:
+    """
+    This class encapsulates the mini-batch k-means algorithm.
+
+    Every batch is assigned to the current centroids. Afterwards each centroid moves towards the centroid
+    of its points in the batch, by a learning rate of (points in the batch) / (points seen so far) of that
+    centroid. For the simple centroid this keeps every centroid the exact mean of all points ever assigned to it.
+
+    The state can be written to a checkpoint and resumed from it later.
+    """
+
+    def __init__(self, initial_centroids: Collection[NamedVector] = (("default", (0.0, 0.0)),),
+                 distance_function: Distance_Function = euclidean_distance,
+                 centroid_function: Centroid_Function = simple_centroid,
+                 chunk_size: int = None):
+        """
+
+        :param initial_centroids: Collection of initial centroids, also implicitly stating the k of k-means
+        :param distance_function: Function to calculate the distance between vectors.
+                            Defaults to the euclidean distance.
+        :param centroid_function: Function to calculate a centroid of a set of vectors.
+                            Defaults to the simple centroid function.
+        :param chunk_size: Number of points whose distances are calculated at once, see assign_labels.
+        """
+        named_centroids = list(initial_centroids)
+        self._names = tuple(named_centroid[0] for named_centroid in named_centroids)
+        self._centroids = numpy.array(as_matrix([named_centroid[1] for named_centroid in named_centroids]))
+        self._counts = numpy.zeros(len(self._names), dtype=numpy.int64)
+        self._batches_seen = 0
+        self._distance_function = distance_function
+        self._centroid_function = centroid_function
+        self._chunk_size = chunk_size
+
+    def partial_fit(self, batch: Collection[Vector]) -> numpy.ndarray:
+        """
+        Updates the centroids with one batch of points.
+
+        :param batch: Collection of points, preferably a (n, d) float matrix
+        :return: Integer array holding the index of the centroid every point of the batch was assigned to,
+                        before the centroids were moved.
+        """
+        batch = as_matrix(batch)
+        if batch.shape[0] == 0:
+            return numpy.empty(0, dtype=numpy.intp)
+
+        labels = assign_labels(batch, self._centroids,
+                               distance_function=self._distance_function,
+                               chunk_size=self._chunk_size)
+        batch_centroids, batch_counts = cluster_centroids(batch, labels, self._centroids, self._centroid_function)
+
+        self._counts += batch_counts
+        filled = batch_counts > 0
+        learning_rates = batch_counts[filled] / self._counts[filled]
+        self._centroids[filled] += learning_rates[:, numpy.newaxis] * (batch_centroids[filled] -
+                                                                       self._centroids[filled])
+        self._batches_seen += 1
+        return labels
+
+    def fit(self, batches: Iterable[Collection[Vector]]) -> 'MiniBatchKmeanClusterer':
+        """
+        Updates the centroids with every batch of the iterable, consuming it once.
+
+        :param batches: Iterable (e.g. a generator) of collections of points
+        :return: This clusterer
+        """
+        for batch in batches:
+            self.partial_fit(batch)
+        return self
+
+    @property
+    def distance_function(self) -> Distance_Function:
+        """Function used to calculate the distance between a point and a centroid."""
+        return self._distance_function
+
+    @property
+    def names(self) -> Collection[str]:
+        """Names of the centroids, in the order of the rows of the centroid matrix."""
+        return self._names
+
+    @property
+    def centroids(self) -> Matrix:
+        """Read-only view of the (k, d) matrix of the current centroids."""
+        view = self._centroids.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def counts(self) -> numpy.ndarray:
+        """Read-only view of the number of points assigned to every centroid so far."""
+        view = self._counts.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def batches_seen(self) -> int:
+        """Number of batches this clusterer was updated with."""
+        return self._batches_seen
+
+    def named_centroids(self) -> Collection[NamedVector]:
+        """
+        :return: Tuple of NamedVectors, one per current centroid.
+        """
+        return tuple((name, tuple(centroid)) for name, centroid in zip(self._names, self._centroids.tolist()))
+
+    def save_checkpoint(self, path: str):
+        """
+        Writes the state of this clusterer to a numpy .npz file.
+
+        Functions can not be stored, they have to be given again when resuming.
+
+        :param path: File to write to
+        """
+        with open(path, "wb") as checkpoint:
+            numpy.savez(checkpoint,
+                        names=numpy.array(self._names, dtype=str),
+                        centroids=self._centroids,
+                        counts=self._counts,
+                        batches_seen=self._batches_seen)
+
+    @classmethod
+    def from_checkpoint(cls, path: str,
+                        distance_function: Distance_Function = euclidean_distance,
+                        centroid_function: Centroid_Function = simple_centroid,
+                        chunk_size: int = None) -> 'MiniBatchKmeanClusterer':
+        """
+        Resumes a clusterer from a checkpoint written by save_checkpoint.
+
+        :param path: File to read from
+        :param distance_function: Function to calculate the distance between vectors.
+        :param centroid_function: Function to calculate a centroid of a set of vectors.
+        :param chunk_size: Number of points whose distances are calculated at once, see assign_labels.
+        :return: A clusterer in the state of the checkpoint
+        """
+        with numpy.load(path) as checkpoint:
+            clusterer = cls(initial_centroids=zip(checkpoint["names"].tolist(), checkpoint["centroids"]),
+                            distance_function=distance_function,
+                            centroid_function=centroid_function,
+                            chunk_size=chunk_size)
+            clusterer._counts = numpy.array(checkpoint["counts"], dtype=numpy.int64)
+            clusterer._batches_seen = int(checkpoint["batches_seen"])
+        return clusterer
@@ -0,0 +1,168 @@
+"""
+Module implementing a fitted k-means model, which assigns new points to the centroids of a clustering.
+"""
+from typing import Collection, Iterable, Iterator, List
+
+import numpy
+
+from thb_dmc.kmeans import assign_labels, ArrayKmeanClusterer, KmeanClusterer
+from thb_dmc.metrics import get_metric, minkowski_metric
+from thb_dmc.spatial_index import build_centroid_index
+from thb_dmc.vector_util import NamedVector, Vector, Distance_Function, euclidean_distance, Matrix, as_matrix
+
+
+class KmeansModel:
+    """
+    The centroids of a clustering together with their names and the distance function, ready to assign
+    new points to their closest centroid.
+
+    The model can be saved to a numpy .npz file and loaded again without clustering anew.
+    Only the name of the distance function is stored, so it has to be a registered metric (see thb_dmc.metrics)
+    or a minkowski metric.
+    """
+
+    def __init__(self, names: Collection[str],
+                 centroids: Matrix,
+                 distance_function: Distance_Function = euclidean_distance,
+                 centroid_index: str = None,
+                 dtype=None):
+        """
+
+        :param names: Names of the centroids
+        :param centroids: (k, d) matrix of centroids, one centroid per row. Copied.
+        :param distance_function: Function used to calculate the distance between a point and a centroid
+        :param centroid_index: Kind of search tree built once over the centroids to find the closest one,
+                            see build_centroid_index. Defaults to calculating the distances to all centroids.
+        :param dtype: Float type the centroids are stored and compared in, one of FLOAT_DTYPES. Defaults to
+                            float32 for float32 centroids, like the ones of a float32 ArrayKmeanClusterer, so the
+                            distances are rounded like the clusterer's, and to float64 for anything else.
+        """
+        self.names = tuple(names)
+        self.centroids = numpy.array(as_matrix(centroids, dtype))
+        self.centroids.flags.writeable = False
+        if len(self.names) != self.centroids.shape[0]:
+            raise ValueError("Got {} names for {} centroids".format(len(self.names), self.centroids.shape[0]))
+        self.distance_function = distance_function
+        self.centroid_index = centroid_index
+        self._index = None
+
+    @classmethod
+    def from_named_centroids(cls, named_centroids: Collection[NamedVector],
+                             distance_function: Distance_Function = euclidean_distance,
+                             centroid_index: str = None,
+                             dtype=None) -> 'KmeansModel':
+        """
+        Builds a model from named centroids, e.g. the keys of the dictionary returned by kmeans.
+
+        :param named_centroids: Collection of NamedVectors
+        :param distance_function: Function used to calculate the distance between a point and a centroid
+        :param centroid_index: Kind of search tree built over the centroids, see build_centroid_index
+        :param dtype: Float type of the centroids, e.g. the one kmeans was given. Defaults to float64.
+        :return: The model
+        """
+        named_centroids = list(named_centroids)
+        return cls([name for name, _ in named_centroids],
+                   [centroid for _, centroid in named_centroids],
+                   distance_function, centroid_index, dtype)
+
+    @classmethod
+    def from_clusterer(cls, clusterer, centroid_index: str = None) -> 'KmeansModel':
+        """
+        Builds a model from the centroids of a clusterer.
+
+        An ArrayKmeanClusterer gives the centroids its current labels were assigned to, so the model predicts
+        those labels for the clustered points. A KmeanClusterer is run to its final result first.
+        Any other clusterer, like the MiniBatchKmeanClusterer, gives its current centroids.
+        The centroids keep the float type of the clusterer.
+
+        :param clusterer: The clusterer
+        :param centroid_index: Kind of search tree built over the centroids, see build_centroid_index
+        :return: The model
+        """
+        if isinstance(clusterer, KmeanClusterer):
+            return cls.from_named_centroids(clusterer.final_result().keys(), clusterer.distance_function,
+                                            centroid_index, clusterer.dtype)
+        centroids = clusterer.centroids
+        if isinstance(clusterer, ArrayKmeanClusterer) and clusterer.assigned_centroids is not None:
+            centroids = clusterer.assigned_centroids
+        return cls(clusterer.names, centroids, clusterer.distance_function, centroid_index)
+
+    def predict(self, points: Matrix, chunk_size: int = None) -> numpy.ndarray:
+        """
+        Assigns every point to its closest centroid, see assign_labels.
+
+        :param points: (n, d) matrix of points, one point per row. A numpy.memmap is read chunk by chunk.
+        :param chunk_size: Number of points whose distances are calculated at once
+        :return: Integer array holding the index of the closest centroid for every point
+        """
+        if self.centroid_index is None:
+            return assign_labels(points, self.centroids, distance_function=self.distance_function,
+                                 chunk_size=chunk_size)
+        if self._index is None:
+            self._index = build_centroid_index(self.centroids, self.distance_function, self.centroid_index)
+        if chunk_size is None:
+            return self._index.assign(points)
+        return self._index.assign(points, chunk_size)
+
+    def predict_batches(self, batches: Iterable[Collection[Vector]]) -> Iterator[numpy.ndarray]:
+        """
+        Assigns the points of every batch to their closest centroid, consuming the batches one by one.
+
+        :param batches: Iterable (e.g. a generator) of collections of points
+        :return: Generator of one integer array of labels per batch
+        """
+        for batch in batches:
+            yield self.predict(as_matrix(batch))
+
+    def predict_names(self, points: Matrix, chunk_size: int = None) -> List[str]:
+        """
+        :param points: (n, d) matrix of points, one point per row
+        :param chunk_size: Number of points whose distances are calculated at once
+        :return: Name of the closest centroid for every point
+        """
+        return [self.names[label] for label in self.predict(points, chunk_size).tolist()]
+
+    def named_centroids(self) -> Collection[NamedVector]:
+        """
+        :return: Tuple of NamedVectors, one per centroid.
+        """
+        return tuple((name, tuple(centroid)) for name, centroid in zip(self.names, self.centroids.tolist()))
+
+    def save(self, path: str):
+        """
+        Writes this model to a numpy .npz file.
+
+        :param path: File to write to
+        """
+        metric = get_metric(self.distance_function)
+        if metric is None:
+            raise ValueError("Only models with a registered metric can be saved")
+        with open(path, "wb") as model_file:
+            numpy.savez(model_file,
+                        names=numpy.array(self.names, dtype=str),
+                        centroids=self.centroids,
+                        metric=numpy.array(metric.name),
+                        centroid_index=numpy.array(self.centroid_index or ""))
+
+    @classmethod
+    def load(cls, path: str) -> 'KmeansModel':
+        """
+        Reads a model written by save.
+
+        :param path: File to read from
+        :return: The model
+        """
+        with numpy.load(path, allow_pickle=False) as model_file:
+            metric_name = str(model_file["metric"])
+            if metric_name.startswith("minkowski_"):
+                # Not registered, the metric itself is passed on as distance function
+                distance_function = minkowski_metric(float(metric_name[len("minkowski_"):]))
+            else:
+                try:
+                    distance_function = get_metric(metric_name).distance
+                except KeyError:
+                    raise ValueError("The metric {} of the model is not registered".format(metric_name))
+            return cls(model_file["names"].tolist(),
+                       model_file["centroids"],
+                       distance_function,
+                       str(model_file["centroid_index"]) or None)
@@ -0,0 +1,143 @@
+"""
+Module implementing the assignment step of k-means sharded across a pool of processes.
+
+The points are copied once into shared memory, which every worker process attaches to. Per iteration only the
+centroids are sent to the workers, which write the labels of their shard into shared memory as well and send
+back the coordinate sums and point counts per centroid of their shard.
+"""
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy
+
+from thb_dmc.kmeans import assign_labels, assign_and_sum
+from thb_dmc.vector_util import Matrix, Distance_Function, euclidean_distance, cluster_sums
+
+# Shared arrays of the worker process, set up by _attach
+_worker_arrays = {}
+
+
+class ShardedAssigner:
+    """
+    Assigns points to their closest centroid using a pool of worker processes, one contiguous shard of points
+    per worker. The shards are fixed for the lifetime of the assigner, so results are reproducible.
+
+    Holds a process pool and shared memory until closed. It is closed when garbage collected as well.
+    """
+
+    def __init__(self, points: Matrix, n_jobs: int, chunk_size: int = None):
+        """
+
+        :param points: (n, d) float matrix of points, copied once into shared memory
+        :param n_jobs: Number of worker processes
+        :param chunk_size: Number of points whose distances are calculated at once within a worker
+        """
+        num_points = points.shape[0]
+        self.n_jobs = n_jobs
+        self._chunk_size = chunk_size
+        self._shared_points = SharedArray(points)
+        self._shared_labels = SharedArray(numpy.empty(num_points, dtype=numpy.intp))
+        self._labels = self._shared_labels.array
+
+        boundaries = numpy.linspace(0, num_points, n_jobs + 1).astype(int)
+        self._shards = [(int(start), int(stop)) for start, stop in zip(boundaries[:-1], boundaries[1:])
+                        if stop > start]
+        self._pool = ProcessPoolExecutor(max_workers=n_jobs,
+                                         initializer=_attach,
+                                         initargs=(self._shared_points.spec, self._shared_labels.spec))
+        self._finalizer = weakref.finalize(self, _release, self._pool, self._shared_points, self._shared_labels)
+
+    def assign(self, centroids: Matrix,
+               distance_function: Distance_Function = euclidean_distance,
+               centroid_index: str = None) -> Tuple[numpy.ndarray, Matrix, numpy.ndarray]:
+        """
+        Assigns every point to its closest centroid and sums up the points per centroid.
+
+        :param centroids: (k, d) matrix of centroids, one centroid per row
+        :param distance_function: Function used to calculate the distance between a point and a centroid.
+                            Has to be picklable, i.e. defined at module level.
+        :param centroid_index: Kind of search tree every worker builds over the centroids, see assign_labels
+        :return: New integer array of labels, (k, d) matrix of coordinate sums and integer array of point counts
+                            per centroid
+        """
+        futures = [self._pool.submit(_assign_shard, start, stop, centroids, distance_function, self._chunk_size,
+                                     centroid_index)
+                   for start, stop in self._shards]
+        sums = numpy.zeros(centroids.shape)
+        counts = numpy.zeros(centroids.shape[0], dtype=numpy.int64)
+        # Reduced in shard order, so the sums do not depend on which worker finishes first
+        for future in futures:
+            shard_sums, shard_counts = future.result()
+            sums += shard_sums
+            counts += shard_counts
+        return self._labels.copy(), sums, counts
+
+    def close(self):
+        """
+        Shuts down the worker processes and frees the shared memory.
+        """
+        # The shared memory can only be closed once no array uses its buffer anymore
+        self._labels = None
+        self._finalizer()
+
+
+class SharedArray:
+    """
+    A numpy array in shared memory, which other processes can attach to by its spec.
+    """
+
+    def __init__(self, array: numpy.ndarray):
+        """
+
+        :param array: Array to copy into shared memory
+        """
+        self._memory = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self.spec = (self._memory.name, array.shape, array.dtype.str)
+        self.array = numpy.ndarray(array.shape, dtype=array.dtype, buffer=self._memory.buf)
+        self.array[...] = array
+
+    def close(self):
+        """
+        Frees the shared memory. The array must not be used afterwards.
+        """
+        self.array = None
+        self._memory.close()
+        self._memory.unlink()
+
+
+def attach_array(spec: Tuple[str, Tuple[int, ...], str]) -> numpy.ndarray:
+    """
+    Attaches to the shared memory of a SharedArray from another process.
+
+    :param spec: The spec of the SharedArray
+    :return: Array backed by the shared memory. The memory stays attached for the lifetime of the process.
+    """
+    name, shape, dtype = spec
+    memory = shared_memory.SharedMemory(name=name)
+    _worker_arrays.setdefault("memories", []).append(memory)
+    return numpy.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def _release(pool: ProcessPoolExecutor, *arrays: SharedArray):
+    pool.shutdown(wait=True)
+    for array in arrays:
+        array.close()
+
+
+def _attach(points_spec, labels_spec):
+    _worker_arrays["points"] = attach_array(points_spec)
+    _worker_arrays["labels"] = attach_array(labels_spec)
+
+
+def _assign_shard(start: int, stop: int, centroids: Matrix, distance_function: Distance_Function,
+                  chunk_size: int, centroid_index: str) -> Tuple[Matrix, numpy.ndarray]:
+    points = _worker_arrays["points"][start:stop]
+    labels = _worker_arrays["labels"][start:stop]
+    if centroid_index is None:
+        _, sums, counts = assign_and_sum(points, centroids, distance_function, chunk_size, labels=labels)
+        return sums, counts
+    labels[...] = assign_labels(points, centroids, distance_function=distance_function, chunk_size=chunk_size,
+                                centroid_index=centroid_index)
+    return cluster_sums(points, labels, centroids.shape[0])
@@ -0,0 +1,191 @@
+"""
+Module implementing per-column statistics calculated in one streaming pass, and scaling of the columns in place.
+
+The statistics of every chunk are merged into the running ones with the pairwise update of Chan et al., the
+chunked form of Welford's algorithm, so they are numerically stable and statistics of separate parts of the data,
+e.g. calculated by different processes, can be merged.
+
+Based on:
+T. F. Chan, G. H. Golub and R. J. LeVeque. Updating Formulae and a Pairwise Algorithm for Computing Sample Variances.
+COMPSTAT 1982 5th Symposium held at Toulouse 1982, 30–41, 1982.
+DOI: 10.1007/978-3-642-51461-6_3
+
+"""
+from typing import Iterable, Tuple
+
+import numpy
+
+from thb_dmc.csv_reader import DEFAULT_CHUNK_ROWS
+from thb_dmc.vector_util import Matrix, as_matrix
+
+SCALINGS = ("min-max", "z-score")
+
+
+class RunningStatistics:
+    """
+    Number of rows and per-column minimum, maximum, mean and variance, plus the covariance and correlation of
+    all pairs of columns, of all rows seen so far. Missing values are not supported, see impute_missing.
+    """
+
+    def __init__(self, num_columns: int = None):
+        """
+
+        :param num_columns: Number of columns d. Defaults to the number of columns of the first update.
+        """
+        self.count = 0
+        self.minimum = None
+        self.maximum = None
+        self.mean = None
+        # Sums of the products of the deviations from the mean of every pair of columns
+        self._comoments = None
+        if num_columns is not None:
+            self._start(num_columns)
+
+    def _start(self, num_columns: int):
+        self.minimum = numpy.full(num_columns, numpy.inf)
+        self.maximum = numpy.full(num_columns, -numpy.inf)
+        self.mean = numpy.zeros(num_columns)
+        self._comoments = numpy.zeros((num_columns, num_columns))
+
+    def update(self, values: Matrix) -> 'RunningStatistics':
+        """
+        Adds the rows of a chunk.
+
+        :param values: (m, d) matrix of rows. Not modified.
+        :return: These statistics
+        """
+        values = as_matrix(values)
+        if values.shape[0] == 0:
+            return self
+        if self.mean is None:
+            self._start(values.shape[1])
+        # Accumulated in float64, also for float32 values
+        mean = values.mean(axis=0, dtype=float)
+        deviations = values - mean
+        self._merge(values.shape[0], values.min(axis=0), values.max(axis=0), mean, deviations.T @ deviations)
+        return self
+
+    def merge(self, other: 'RunningStatistics') -> 'RunningStatistics':
+        """
+        Adds the rows of other statistics, e.g. the ones of another part of the data.
+
+        :param other: Statistics over other rows with the same columns. Not modified.
+        :return: These statistics
+        """
+        if other.count == 0:
+            return self
+        if self.mean is None:
+            self._start(len(other.mean))
+        self._merge(other.count, other.minimum, other.maximum, other.mean, other._comoments)
+        return self
+
+    def _merge(self, count: int, minimum: numpy.ndarray, maximum: numpy.ndarray, mean: numpy.ndarray,
+               comoments: Matrix):
+        total = self.count + count
+        delta = mean - self.mean
+        self._comoments += comoments + numpy.outer(delta, delta) * (self.count * count / total)
+        self.mean += delta * (count / total)
+        numpy.minimum(self.minimum, minimum, out=self.minimum)
+        numpy.maximum(self.maximum, maximum, out=self.maximum)
+        self.count = total
+
+    def covariance(self, ddof: int = 0) -> Matrix:
+        """
+        :param ddof: Delta degrees of freedom, the covariance is divided by count - ddof.
+                        Defaults to the population covariance, like numpy.var.
+        :return: (d, d) covariance matrix of the columns
+        """
+        return self._comoments / (self.count - ddof)
+
+    def variance(self, ddof: int = 0) -> numpy.ndarray:
+        """
+        :param ddof: Delta degrees of freedom, the variance is divided by count - ddof
+        :return: Variance of every column
+        """
+        return numpy.diagonal(self._comoments) / (self.count - ddof)
+
+    def std(self, ddof: int = 0) -> numpy.ndarray:
+        """
+        :param ddof: Delta degrees of freedom, see variance
+        :return: Standard deviation of every column
+        """
+        return numpy.sqrt(self.variance(ddof))
+
+    def correlation(self) -> Matrix:
+        """
+        :return: (d, d) matrix of the pearson correlation coefficients of all pairs of columns, like numpy.corrcoef.
+                        NaN for columns without variance.
+        """
+        deviations = numpy.sqrt(numpy.diagonal(self._comoments))
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return self._comoments / numpy.outer(deviations, deviations)
+
+
+def running_statistics(chunks: Iterable[Matrix]) -> RunningStatistics:
+    """
+    Calculates the statistics of all rows of the chunks, consuming them one by one.
+
+    :param chunks: Iterable of (m, d) matrices, e.g. the values of read_csv_chunks
+    :return: The statistics
+    """
+    statistics = RunningStatistics()
+    for chunk in chunks:
+        statistics.update(chunk)
+    return statistics
+
+
+def min_max_scale(values: Matrix, statistics: RunningStatistics,
+                  feature_range: Tuple[float, float] = (0.0, 1.0)) -> Matrix:
+    """
+    Scales every column in place linearly, so its minimum becomes the lower and its maximum the upper end of
+    the feature range, like sklearn's MinMaxScaler. Constant columns are only shifted.
+
+    :param values: (m, d) float matrix, e.g. a chunk of the rows the statistics were calculated from
+    :param statistics: Statistics of the columns
+    :param feature_range: Lower and upper end of the scaled columns
+    :return: The values
+    """
+    spans = statistics.maximum - statistics.minimum
+    scales = (feature_range[1] - feature_range[0]) / numpy.where(spans > 0.0, spans, 1.0)
+    values -= statistics.minimum
+    values *= scales
+    values += feature_range[0]
+    return values
+
+
+def standardize(values: Matrix, statistics: RunningStatistics) -> Matrix:
+    """
+    Scales every column in place to a mean of zero and a variance of one (z-scores), like sklearn's
+    StandardScaler. Constant columns are only shifted.
+
+    :param values: (m, d) float matrix, e.g. a chunk of the rows the statistics were calculated from
+    :param statistics: Statistics of the columns
+    :return: The values
+    """
+    deviations = statistics.std()
+    values -= statistics.mean
+    values /= numpy.where(deviations > 0.0, deviations, 1.0)
+    return values
+
+
+def scale_in_place(values: Matrix, scaling: str = "z-score", chunk_rows: int = DEFAULT_CHUNK_ROWS) \
+        -> RunningStatistics:
+    """
+    Scales the columns of a matrix in place, with one pass over the rows for the statistics and one to scale
+    them. A numpy.memmap opened with mode "r+", see open_dataset, is read and written chunk by chunk.
+
+    :param values: (n, d) float matrix
+    :param scaling: "min-max" for min_max_scale or "z-score" for standardize
+    :param chunk_rows: Number of rows read at once
+    :return: The statistics of the columns before scaling
+    """
+    if scaling not in SCALINGS:
+        raise ValueError("Unknown scaling {}, expected one of {}".format(scaling, SCALINGS))
+    statistics = running_statistics(values[start:start + chunk_rows]
+                                    for start in range(0, values.shape[0], chunk_rows))
+    if statistics.count == 0:
+        return statistics
+    scale = min_max_scale if scaling == "min-max" else standardize
+    for start in range(0, values.shape[0], chunk_rows):
+        scale(values[start:start + chunk_rows], statistics)
+    return statistics
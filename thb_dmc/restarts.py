@@ -0,0 +1,232 @@
+"""
+Module implementing k-means with several randomly seeded restarts, keeping the best one.
+"""
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+from typing import Collection, NamedTuple
+
+import numpy
+
+from thb_dmc.davies_bouldin_index import labelled_davies_bouldin_index
+from thb_dmc.kmeans import ArrayKmeanClusterer
+from thb_dmc.parallel import SharedArray, attach_array
+from thb_dmc.seeding import kmeans_plus_plus, kmeans_parallel
+from thb_dmc.vector_util import NamedVector, Distance_Function, euclidean_distance, simple_centroid, \
+    Centroid_Function, Matrix, as_matrix
+
+SEEDINGS = {
+    "k-means++": kmeans_plus_plus,
+    "k-means||": kmeans_parallel,
+}
+
+
+class RestartResult(NamedTuple):
+    """
+    The best clustering of several k-means restarts.
+    """
+    centroids: Collection[NamedVector]
+    labels: numpy.ndarray
+    inertia: float
+    davies_bouldin_index: float
+    iterations: int
+    restart: int
+    restarts_finished: int
+    restarts_stopped_early: int
+    # The seeded centroids the best restart started from, a clusterer starting there repeats it
+    initial_centroids: Collection[NamedVector]
+
+
+def best_of_n_kmeans(points: Matrix,
+                     k: int,
+                     n_init: int = 10,
+                     init: str = "k-means++",
+                     distance_function: Distance_Function = euclidean_distance,
+                     centroid_function: Centroid_Function = simple_centroid,
+                     selection: str = "inertia",
+                     n_jobs: int = None,
+                     random_state=None,
+                     max_iterations: int = 300,
+                     early_stopping: bool = True) -> RestartResult:
+    """
+    Runs k-means n_init times from differently seeded initial centroids and returns the best clustering.
+
+    Every restart draws its seed from one numpy.random.SeedSequence, so a random_state reproduces all restarts,
+    no matter in which order worker processes finish them.
+
+    With selection by inertia, a restart may be abandoned early by a heuristic, not a bound: once its inertia is
+    above the best finished one and would stay above it even if its last improvement was repeated for every
+    remaining iteration. The inertia of k-means never increases, but it may still improve more than that later, so
+    a restart that would have won can be dropped. Improvements only that small are rare while many iterations
+    remain, so the heuristic mostly drops restarts that have stalled or are close to max_iterations.
+    Pass early_stopping=False to always finish every restart.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param k: Number of clusters
+    :param n_init: Number of restarts
+    :param init: Seeding of the initial centroids, "k-means++" or "k-means||" (for large numbers of points)
+    :param distance_function: Function to calculate the distance between vectors. Has to be picklable for n_jobs.
+    :param centroid_function: Function to calculate a centroid of a set of vectors. Has to be picklable for n_jobs.
+    :param selection: Criterion picking the winner, "inertia" or "davies_bouldin_index" (lower is better for both)
+    :param n_jobs: Number of worker processes running restarts concurrently. Defaults to running them one by one.
+    :param random_state: Seed or numpy.random.SeedSequence
+    :param max_iterations: Maximal number of iterations per restart
+    :param early_stopping: Abandon restarts that are not expected to beat the best one, only for selection by
+                        inertia
+    :return: The best restart
+    """
+    _check_seeding(init)
+    if selection not in ("inertia", "davies_bouldin_index"):
+        raise ValueError("Unknown selection {}".format(selection))
+
+    points = as_matrix(points)
+    seed_sequence = _seed_sequence(random_state)
+    settings = (k, init, distance_function, centroid_function, selection, max_iterations,
+                early_stopping and selection == "inertia")
+    restarts = list(enumerate(seed_sequence.spawn(n_init)))
+
+    if n_jobs is None or n_jobs <= 1:
+        best = SimpleNamespace(value=math.inf)
+        outcomes = []
+        for restart, seed in restarts:
+            outcome = _run_restart(points, best, restart, seed, *settings)
+            outcomes.append(outcome)
+            _record(best, outcome, selection)
+        return _select(outcomes, selection)
+
+    shared_points = SharedArray(points)
+    best = multiprocessing.RawValue("d", math.inf)
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach,
+                                 initargs=(shared_points.spec, best)) as pool:
+            futures = [pool.submit(_run_shared_restart, restart, seed, *settings) for restart, seed in restarts]
+            outcomes = []
+            for future in as_completed(futures):
+                outcome = future.result()
+                outcomes.append(outcome)
+                _record(best, outcome, selection)
+    finally:
+        shared_points.close()
+    return _select(outcomes, selection)
+
+
+def seed_centroids(points: Matrix,
+                   k: int,
+                   init: str = "k-means++",
+                   n_init: int = 1,
+                   distance_function: Distance_Function = euclidean_distance,
+                   centroid_function: Centroid_Function = simple_centroid,
+                   n_jobs: int = None,
+                   random_state=None) -> Collection[NamedVector]:
+    """
+    Chooses initial centroids for k-means, the ones of the best of n_init restarts, see best_of_n_kmeans.
+    A clusterer starting from them repeats the best restart. A single restart is only seeded, not clustered.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param k: Number of clusters
+    :param init: Seeding of the initial centroids, "k-means++" or "k-means||" (for large numbers of points)
+    :param n_init: Number of restarts, the best one by inertia is kept
+    :param distance_function: Function to calculate the distance between vectors. Has to be picklable for n_jobs.
+    :param centroid_function: Function to calculate a centroid of a set of vectors. Has to be picklable for n_jobs.
+    :param n_jobs: Number of worker processes running restarts concurrently. Defaults to running them one by one.
+    :param random_state: Seed or numpy.random.SeedSequence
+    :return: Tuple of k NamedVectors, named c1 to ck
+    """
+    if n_init > 1:
+        return best_of_n_kmeans(points, k, n_init, init, distance_function, centroid_function, n_jobs=n_jobs,
+                                random_state=random_state).initial_centroids
+    _check_seeding(init)
+    # The seed of the first restart, so this is the start best_of_n_kmeans with one restart uses
+    seed = _seed_sequence(random_state).spawn(1)[0]
+    return SEEDINGS[init](as_matrix(points), k, distance_function, numpy.random.default_rng(seed))
+
+
+def _check_seeding(init: str):
+    if init not in SEEDINGS:
+        raise ValueError("Unknown seeding {}, expected one of {}".format(init, sorted(SEEDINGS)))
+
+
+def _seed_sequence(random_state) -> numpy.random.SeedSequence:
+    if isinstance(random_state, numpy.random.SeedSequence):
+        return random_state
+    return numpy.random.SeedSequence(random_state)
+
+
+def _record(best, outcome: dict, selection: str):
+    if not outcome["stopped_early"]:
+        best.value = min(best.value, outcome[selection])
+
+
+def _select(outcomes, selection: str) -> RestartResult:
+    finished = [outcome for outcome in outcomes if not outcome["stopped_early"]]
+    winner = min(finished, key=lambda outcome: (outcome[selection], outcome["restart"]))
+    return RestartResult(centroids=winner["centroids"],
+                         labels=winner["labels"],
+                         inertia=winner["inertia"],
+                         davies_bouldin_index=winner["davies_bouldin_index"],
+                         iterations=winner["iterations"],
+                         restart=winner["restart"],
+                         restarts_finished=len(finished),
+                         restarts_stopped_early=len(outcomes) - len(finished),
+                         initial_centroids=winner["initial_centroids"])
+
+
+# State of the worker process, set up by _attach
+_worker_state = {}
+
+
+def _attach(points_spec, best):
+    _worker_state["points"] = attach_array(points_spec)
+    _worker_state["best"] = best
+
+
+def _run_shared_restart(restart: int, seed: numpy.random.SeedSequence, *settings) -> dict:
+    return _run_restart(_worker_state["points"], _worker_state["best"], restart, seed, *settings)
+
+
+def _run_restart(points: Matrix, best, restart: int, seed: numpy.random.SeedSequence, k: int, init: str,
+                 distance_function: Distance_Function, centroid_function: Centroid_Function, selection: str,
+                 max_iterations: int, early_stopping: bool) -> dict:
+    """
+    Runs one restart. best.value is the score of the best finished restart, updated concurrently.
+    """
+    initial_centroids = SEEDINGS[init](points, k, distance_function, numpy.random.default_rng(seed))
+    clusterer = ArrayKmeanClusterer(points, initial_centroids,
+                                    distance_function=distance_function,
+                                    centroid_function=centroid_function)
+    iterations = 0
+    stopped_early = False
+    previous_inertia = math.inf
+    for iterations in range(1, max_iterations + 1):
+        try:
+            next(clusterer)
+        except StopIteration:
+            iterations -= 1
+            break
+        if early_stopping:
+            current_inertia = clusterer.inertia
+            # Heuristic: the last improvement, repeated for every remaining iteration, does not reach the best one
+            improvement = previous_inertia - current_inertia
+            remaining = max_iterations - iterations
+            if current_inertia > best.value and current_inertia - improvement * remaining > best.value:
+                stopped_early = True
+                break
+            previous_inertia = current_inertia
+
+    outcome = {
+        "restart": restart,
+        "initial_centroids": initial_centroids,
+        "centroids": clusterer.named_centroids(clusterer.assigned_centroids),
+        "labels": clusterer.labels,
+        "inertia": clusterer.inertia,
+        "iterations": iterations,
+        "stopped_early": stopped_early,
+        "davies_bouldin_index": None,
+    }
+    if selection == "davies_bouldin_index" and not stopped_early:
+        outcome["davies_bouldin_index"] = labelled_davies_bouldin_index(points, clusterer.labels,
+                                                                        centroid_func=centroid_function,
+                                                                        dispersion_distance_func=distance_function,
+                                                                        cluster_distance_func=distance_function)
+    return outcome
@@ -0,0 +1,166 @@
+"""
+Module implementing ways to choose the initial centroids of k-means.
+
+Based on:
+D. Arthur and S. Vassilvitskii. k-means++: The advantages of careful seeding.
+Proceedings of the 18th Annual ACM-SIAM Symposium on Discrete Algorithms, 1027–1035, 2007.
+
+B. Bahmani, B. Moseley, A. Vattani, R. Kumar and S. Vassilvitskii. Scalable k-means++.
+Proceedings of the VLDB Endowment, 5(7):622–633, 2012.
+DOI: 10.14778/2180912.2180915
+
+"""
+from typing import Collection
+
+import numpy
+
+from thb_dmc.metrics import ranking_distances, squared_pairwise_distances
+from thb_dmc.vector_util import NamedVector, Distance_Function, euclidean_distance, Matrix, as_matrix, chunk_bounds
+
+
+def kmeans_plus_plus(points: Matrix,
+                     k: int,
+                     distance_function: Distance_Function = euclidean_distance,
+                     random_state=None,
+                     weights: numpy.ndarray = None) -> Collection[NamedVector]:
+    """
+    Chooses k initial centroids among the points by k-means++ seeding: the first one uniformly at random,
+    every further one with a probability proportional to its squared distance to the closest centroid chosen so far.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param k: Number of centroids to choose
+    :param distance_function: Function used to calculate the distance between two points
+    :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+    :param weights: Optional non-negative weight per point, multiplied into the probabilities
+    :return: Tuple of k NamedVectors, named c1 to ck
+    """
+    points = as_matrix(points)
+    rng = numpy.random.default_rng(random_state)
+    return _named(points[_plus_plus_indices(points, k, distance_function, rng, weights)])
+
+
+def extend_centroids(points: Matrix,
+                     centroids: Matrix,
+                     k: int,
+                     distance_function: Distance_Function = euclidean_distance,
+                     random_state=None,
+                     weights: numpy.ndarray = None) -> Collection[NamedVector]:
+    """
+    Adds centroids to existing ones until there are k, choosing every new one among the points like k-means++
+    does, with a probability proportional to its squared distance to the closest centroid so far.
+    Starts k-means for k from the solution for a smaller k, e.g. while searching for the best k.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param centroids: (j, d) matrix of the existing centroids, j <= k. They are kept as the first ones.
+    :param k: Number of centroids in the end
+    :param distance_function: Function used to calculate the distance between two points
+    :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+    :param weights: Optional non-negative weight per point, multiplied into the probabilities
+    :return: Tuple of k NamedVectors, named c1 to ck
+    """
+    points = as_matrix(points)
+    centroids = as_matrix(centroids)
+    if centroids.shape[0] == 0:
+        return kmeans_plus_plus(points, k, distance_function, random_state, weights)
+    rng = numpy.random.default_rng(random_state)
+    costs = _squared_distances_to(points, centroids, distance_function)
+    indices = _plus_plus_indices(points, k - centroids.shape[0], distance_function, rng, weights, costs)
+    return _named(numpy.concatenate((centroids, points[indices])))
+
+
+def kmeans_parallel(points: Matrix,
+                    k: int,
+                    distance_function: Distance_Function = euclidean_distance,
+                    random_state=None,
+                    oversampling: float = None,
+                    rounds: int = 5) -> Collection[NamedVector]:
+    """
+    Chooses k initial centroids by k-means|| seeding, for large numbers of points.
+
+    Instead of one pass over the points per centroid like k-means++, every one of a few rounds samples
+    about oversampling many candidates at once. The candidates, weighted by the number of points closest to them,
+    are then reduced to k centroids with k-means++.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param k: Number of centroids to choose
+    :param distance_function: Function used to calculate the distance between two points
+    :param random_state: Seed or numpy.random.Generator, see numpy.random.default_rng
+    :param oversampling: Expected number of candidates per round. Defaults to 2k.
+    :param rounds: Number of sampling rounds
+    :return: Tuple of k NamedVectors, named c1 to ck
+    """
+    points = as_matrix(points)
+    rng = numpy.random.default_rng(random_state)
+    if oversampling is None:
+        oversampling = 2.0 * k
+
+    candidates = [int(rng.integers(points.shape[0]))]
+    costs = _squared_distances_to(points, points[candidates], distance_function)
+    for _ in range(rounds):
+        total = costs.sum()
+        if total <= 0.0:
+            break
+        probabilities = numpy.minimum(1.0, oversampling * costs / total)
+        sampled = numpy.flatnonzero(rng.random(points.shape[0]) < probabilities)
+        if len(sampled) == 0:
+            continue
+        candidates.extend(sampled.tolist())
+        numpy.minimum(costs, _squared_distances_to(points, points[sampled], distance_function), out=costs)
+
+    candidate_points = points[numpy.unique(candidates)]
+    if candidate_points.shape[0] <= k:
+        return kmeans_plus_plus(points, k, distance_function, rng)
+
+    # Weight every candidate by the number of points closest to it
+    weights = numpy.zeros(candidate_points.shape[0])
+    for start, stop in chunk_bounds(points.shape[0], candidate_points.shape[0]):
+        closest = numpy.argmin(ranking_distances(points[start:stop], candidate_points, distance_function), axis=1)
+        weights += numpy.bincount(closest, minlength=candidate_points.shape[0])
+    return _named(candidate_points[_plus_plus_indices(candidate_points, k, distance_function, rng, weights)])
+
+
+def _plus_plus_indices(points: Matrix, k: int, distance_function: Distance_Function,
+                       rng: numpy.random.Generator, weights: numpy.ndarray = None,
+                       costs: numpy.ndarray = None) -> numpy.ndarray:
+    """
+    :param costs: Squared distance of every point to the closest of the centroids chosen before, if any.
+                        Without, the first centroid is chosen with a probability proportional to the weights.
+    :return: Indices of the k chosen points
+    """
+    num_points = points.shape[0]
+    if k > num_points:
+        raise ValueError("Can not choose {} centroids among {} points".format(k, num_points))
+    weights = numpy.ones(num_points) if weights is None else numpy.asarray(weights, dtype=float)
+
+    indices = []
+    if costs is None:
+        indices.append(int(rng.choice(num_points, p=weights / weights.sum())))
+        costs = _squared_distances_to(points, points[indices], distance_function)
+    else:
+        costs = costs.copy()
+    while len(indices) < k:
+        weighted_costs = weights * costs
+        total = weighted_costs.sum()
+        if total > 0.0:
+            index = int(rng.choice(num_points, p=weighted_costs / total))
+        else:
+            # All points coincide with a centroid already, any unused one will do
+            index = int(rng.choice(numpy.setdiff1d(numpy.arange(num_points), indices)))
+        indices.append(index)
+        numpy.minimum(costs, _squared_distances_to(points, points[[index]], distance_function), out=costs)
+    return numpy.array(indices)
+
+
+def _squared_distances_to(points: Matrix, centroids: Matrix, distance_function: Distance_Function) -> numpy.ndarray:
+    """
+    :return: Squared distance of every point to the closest of the given centroids
+    """
+    result = numpy.empty(points.shape[0])
+    for start, stop in chunk_bounds(points.shape[0], centroids.shape[0]):
+        distances = squared_pairwise_distances(points[start:stop], centroids, distance_function)
+        result[start:stop] = distances.min(axis=1)
+    return result
+
+
+def _named(centroids: Matrix) -> Collection[NamedVector]:
+    return tuple(("c{}".format(i + 1), tuple(centroid)) for i, centroid in enumerate(centroids.tolist()))
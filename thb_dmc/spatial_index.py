@@ -0,0 +1,283 @@
+"""
+Module implementing search trees over the centroids, answering which centroid is closest to a point
+without calculating the distances to all of them.
+
+The queries are batched: all points of a chunk descend the tree together, every node is visited once with the
+points whose lower bound of the distance to the node does not exceed the distance to the closest centroid found
+so far. Points are first sent straight to the leaf on their side of every split, which usually holds their
+closest centroid already, so most other nodes are pruned.
+
+Based on:
+J. L. Bentley. Multidimensional binary search trees used for associative searching.
+Communications of the ACM, 18(9):509–517, 1975.
+DOI: 10.1145/361002.361007
+
+S. M. Omohundro. Five balltree construction algorithms.
+International Computer Science Institute Technical Report TR-89-063, 1989.
+
+"""
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import numpy
+
+from thb_dmc.metrics import get_metric, pairwise_distances, paired_distances
+from thb_dmc.vector_util import Matrix, Distance_Function, euclidean_distance, as_matrix
+
+# Metrics whose distance grows with the coordinate differences alone, so the distance to a bounding box
+# is the distance to the box corner closest to the point
+BOX_BOUNDED_METRICS = {"euclidean", "squared_euclidean", "manhattan", "chebyshev"}
+
+DEFAULT_LEAF_SIZE = 64
+DEFAULT_QUERY_CHUNK = 2 ** 16
+
+# Bounds are loosened by this fraction, so rounding never prunes a centroid that is as close as the closest one
+_SLACK = 1e-9
+
+
+class CentroidIndex(ABC):
+    """
+    Base of the search trees over a fixed set of centroids.
+
+    The answers are those of the linear scan in assign_labels: the closest centroid, the one with the lowest
+    index of equally close ones. Distances are calculated with the pairwise kernel of the metric; for
+    the euclidean distance, which assign_labels ranks by a matrix product, this can only differ for
+    points whose two closest centroids are equally far away up to rounding.
+    """
+
+    def __init__(self, centroids: Matrix,
+                 distance_function: Distance_Function = euclidean_distance,
+                 leaf_size: int = DEFAULT_LEAF_SIZE):
+        """
+
+        :param centroids: (k, d) matrix of centroids, one centroid per row
+        :param distance_function: Function used to calculate the distance between a point and a centroid
+        :param leaf_size: Maximal number of centroids in a leaf of the tree
+        """
+        self.centroids = as_matrix(centroids)
+        if self.centroids.shape[0] == 0:
+            raise ValueError("Can not index an empty set of centroids")
+        self._distance_function = distance_function
+        self._leaf_size = max(1, leaf_size)
+        self.distance_evaluations = 0
+
+        # Nodes as flat arrays. The centroids of node i are _order[_start[i]:_stop[i]], leaves have no children.
+        self._order = numpy.arange(self.centroids.shape[0])
+        self._start = []
+        self._stop = []
+        self._left = []
+        self._right = []
+        self._split_dimension = []
+        self._split_value = []
+        self._build(0, self.centroids.shape[0])
+        for name in ("_start", "_stop", "_left", "_right", "_split_dimension"):
+            setattr(self, name, numpy.array(getattr(self, name), dtype=numpy.intp))
+        self._split_value = numpy.array(self._split_value)
+        self._bound_nodes()
+
+    def _build(self, start: int, stop: int) -> int:
+        node = len(self._start)
+        self._start.append(start)
+        self._stop.append(stop)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._split_dimension.append(0)
+        self._split_value.append(0.0)
+        members = self._order[start:stop]
+        coordinates = self.centroids[members]
+        spreads = coordinates.max(axis=0) - coordinates.min(axis=0)
+        if stop - start <= self._leaf_size or not spreads.any():
+            # Sorted, so the first of equally close centroids of a leaf has the lowest index
+            members.sort()
+            return node
+
+        dimension = int(numpy.argmax(spreads))
+        middle = (stop - start) // 2
+        partition = numpy.argpartition(coordinates[:, dimension], middle)
+        self._order[start:stop] = members[partition]
+        self._split_dimension[node] = dimension
+        self._split_value[node] = float(self.centroids[self._order[start + middle], dimension])
+        self._left[node] = self._build(start, start + middle)
+        self._right[node] = self._build(start + middle, stop)
+        return node
+
+    @abstractmethod
+    def _bound_nodes(self):
+        """
+        Calculates what the lower bounds of the distances to the nodes need.
+        """
+
+    @abstractmethod
+    def _lower_bounds(self, node: int, points: Matrix) -> numpy.ndarray:
+        """
+        :return: For every point a value no larger than its distance to any centroid of the node
+        """
+
+    def query(self, points: Matrix, chunk_size: int = DEFAULT_QUERY_CHUNK) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Finds the closest centroid of every point.
+
+        :param points: (n, d) matrix of points, one point per row
+        :param chunk_size: Number of points that descend the tree together
+        :return: Integer array of the index of the closest centroid and float array of the distance to it,
+                        one entry per point
+        """
+        points = as_matrix(points)
+        num_points = points.shape[0]
+        labels = numpy.empty(num_points, dtype=numpy.intp)
+        distances = numpy.empty(num_points)
+        for start in range(0, num_points, chunk_size):
+            stop = min(start + chunk_size, num_points)
+            labels[start:stop], distances[start:stop] = self._query_chunk(points[start:stop])
+        return labels, distances
+
+    def assign(self, points: Matrix, chunk_size: int = DEFAULT_QUERY_CHUNK) -> numpy.ndarray:
+        """
+        :param points: (n, d) matrix of points, one point per row
+        :param chunk_size: Number of points that descend the tree together
+        :return: Integer array holding the index of the closest centroid for every point
+        """
+        return self.query(points, chunk_size)[0]
+
+    def _query_chunk(self, points: Matrix) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        num_points = points.shape[0]
+        labels = numpy.full(num_points, self.centroids.shape[0], dtype=numpy.intp)
+        best = numpy.full(num_points, numpy.inf)
+
+        # Send every point to the leaf on its side of every split
+        leaves = numpy.zeros(num_points, dtype=numpy.intp)
+        inner = numpy.flatnonzero(self._left[leaves] >= 0)
+        while len(inner) > 0:
+            nodes = leaves[inner]
+            goes_left = points[inner, self._split_dimension[nodes]] < self._split_value[nodes]
+            leaves[inner] = numpy.where(goes_left, self._left[nodes], self._right[nodes])
+            inner = inner[self._left[leaves[inner]] >= 0]
+        order = numpy.argsort(leaves, kind="stable")
+        boundaries = numpy.flatnonzero(numpy.diff(leaves[order])) + 1
+        for group in numpy.split(order, boundaries):
+            if len(group) > 0:
+                self._scan_leaf(int(leaves[group[0]]), points, group, labels, best)
+
+        self._search(0, points, numpy.arange(num_points), leaves, labels, best)
+        return labels, best
+
+    def _search(self, node: int, points: Matrix, indices: numpy.ndarray, first_leaves: numpy.ndarray,
+                labels: numpy.ndarray, best: numpy.ndarray):
+        bounds = self._lower_bounds(node, points[indices])
+        indices = indices[bounds <= best[indices] * (1.0 + _SLACK)]
+        if len(indices) == 0:
+            return
+        if self._left[node] < 0:
+            # The leaf a point was sent to first has been scanned already
+            indices = indices[first_leaves[indices] != node]
+            if len(indices) > 0:
+                self._scan_leaf(node, points, indices, labels, best)
+            return
+        self._search(int(self._left[node]), points, indices, first_leaves, labels, best)
+        self._search(int(self._right[node]), points, indices, first_leaves, labels, best)
+
+    def _scan_leaf(self, node: int, points: Matrix, indices: numpy.ndarray, labels: numpy.ndarray,
+                   best: numpy.ndarray):
+        members = self._order[self._start[node]:self._stop[node]]
+        distances = pairwise_distances(points[indices], self.centroids[members], self._distance_function)
+        self.distance_evaluations += distances.size
+        closest = numpy.argmin(distances, axis=1)
+        candidate_distances = distances[numpy.arange(len(indices)), closest]
+        candidate_labels = members[closest]
+        current = best[indices]
+        better = (candidate_distances < current) | \
+                 ((candidate_distances == current) & (candidate_labels < labels[indices]))
+        improved = indices[better]
+        best[improved] = candidate_distances[better]
+        labels[improved] = candidate_labels[better]
+
+
+class KDTree(CentroidIndex):
+    """
+    Search tree bounding the centroids of every node by an axis aligned box.
+
+    Only for distances growing with the coordinate differences alone: the euclidean, squared euclidean, block,
+    chebyshev and minkowski distances. Best for few dimensions, with many dimensions the boxes overlap too much.
+    """
+
+    def __init__(self, centroids: Matrix,
+                 distance_function: Distance_Function = euclidean_distance,
+                 leaf_size: int = DEFAULT_LEAF_SIZE):
+        metric = get_metric(distance_function)
+        if metric is None or not (metric.name in BOX_BOUNDED_METRICS or metric.name.startswith("minkowski_")):
+            raise ValueError("A k-d tree needs a registered coordinate wise distance like {}"
+                             .format(sorted(BOX_BOUNDED_METRICS)))
+        super().__init__(centroids, distance_function, leaf_size)
+
+    def _bound_nodes(self):
+        self._lower = numpy.empty((len(self._start), self.centroids.shape[1]))
+        self._upper = numpy.empty((len(self._start), self.centroids.shape[1]))
+        for node, (start, stop) in enumerate(zip(self._start, self._stop)):
+            coordinates = self.centroids[self._order[start:stop]]
+            self._lower[node] = coordinates.min(axis=0)
+            self._upper[node] = coordinates.max(axis=0)
+
+    def _lower_bounds(self, node: int, points: Matrix) -> numpy.ndarray:
+        gaps = numpy.maximum(self._lower[node] - points, 0.0)
+        gaps += numpy.maximum(points - self._upper[node], 0.0)
+        return paired_distances(gaps, numpy.zeros_like(gaps), self._distance_function)
+
+
+class BallTree(CentroidIndex):
+    """
+    Search tree bounding the centroids of every node by a ball around their mean.
+
+    Works for every distance function that satisfies the triangle inequality; registered ones that do not
+    are rejected.
+    """
+
+    def __init__(self, centroids: Matrix,
+                 distance_function: Distance_Function = euclidean_distance,
+                 leaf_size: int = DEFAULT_LEAF_SIZE):
+        metric = get_metric(distance_function)
+        if metric is not None and not metric.triangle_inequality:
+            raise ValueError("A ball tree needs the triangle inequality, {} violates it".format(metric.name))
+        super().__init__(centroids, distance_function, leaf_size)
+
+    def _bound_nodes(self):
+        self._centers = numpy.empty((len(self._start), self.centroids.shape[1]))
+        self._radii = numpy.empty(len(self._start))
+        for node, (start, stop) in enumerate(zip(self._start, self._stop)):
+            coordinates = self.centroids[self._order[start:stop]]
+            self._centers[node] = coordinates.mean(axis=0)
+            radius = pairwise_distances(self._centers[node:node + 1], coordinates, self._distance_function).max()
+            self._radii[node] = radius * (1.0 + _SLACK)
+
+    def _lower_bounds(self, node: int, points: Matrix) -> numpy.ndarray:
+        distances = pairwise_distances(points, self._centers[node:node + 1], self._distance_function)[:, 0]
+        return distances - self._radii[node]
+
+
+CENTROID_INDEXES = {
+    "kd_tree": KDTree,
+    "ball_tree": BallTree,
+}
+
+
+def build_centroid_index(centroids: Matrix,
+                         distance_function: Distance_Function = euclidean_distance,
+                         kind: str = "auto",
+                         leaf_size: int = DEFAULT_LEAF_SIZE) -> CentroidIndex:
+    """
+    Builds a search tree over the centroids.
+
+    :param centroids: (k, d) matrix of centroids, one centroid per row
+    :param distance_function: Function used to calculate the distance between a point and a centroid
+    :param kind: "kd_tree", "ball_tree" or "auto", which picks the k-d tree for coordinate wise distances
+                        in up to 16 dimensions and the ball tree otherwise
+    :param leaf_size: Maximal number of centroids in a leaf of the tree
+    :return: The search tree
+    """
+    if kind == "auto":
+        metric = get_metric(distance_function)
+        box_bounded = metric is not None and (metric.name in BOX_BOUNDED_METRICS
+                                              or metric.name.startswith("minkowski_"))
+        kind = "kd_tree" if box_bounded and as_matrix(centroids).shape[1] <= 16 else "ball_tree"
+    if kind not in CENTROID_INDEXES:
+        raise ValueError("Unknown centroid index {}, expected one of {}".format(kind, sorted(CENTROID_INDEXES)))
+    return CENTROID_INDEXES[kind](centroids, distance_function, leaf_size)
@@ -1,10 +1,21 @@
 """
 Contains basic definitions for data and function types.
 """
+import math
 from typing import Tuple, Callable, Collection
 
+import numpy
+
 Vector = Tuple[float, ...]
 NamedVector = Tuple[str, Vector]
+Matrix = numpy.ndarray
+
+# Upper bound for the number of elements of a (chunk, k) distance matrix that is held in memory at once.
+DEFAULT_CHUNK_ELEMENTS = 2 ** 22
+
+# Float types matrices of points and centroids are stored and compared in. Sums over many points are
+# accumulated in float64 for either.
+FLOAT_DTYPES = (numpy.dtype(numpy.float32), numpy.dtype(numpy.float64))
 
 Distance_Function = Callable[[Vector, Vector], float]
 Centroid_Function = Callable[[Collection[Vector]], Vector]
@@ -35,7 +46,18 @@ def euclidean_distance(x, y: Vector) -> float:
     :param y: another point
     :return: The distance (positive scalar)
     """
-    return pq_distance(x, y, 2)
+    return math.dist(x, y)
+
+
+def squared_euclidean_distance(x, y: Vector) -> float:
+    """
+    Returns the squared euclidean distance between to points. Not a metric, it violates the triangle inequality.
+    :param x: a point
+    :param y: another point
+    :return: The distance (positive scalar)
+    """
+    _check_dimensions(x, y)
+    return sum((a - b) * (a - b) for a, b in zip(x, y))
 
 
 def block_distance(x, y: Vector) -> float:
@@ -45,25 +67,148 @@ def block_distance(x, y: Vector) -> float:
     :param y: another point
     :return: The distance (positive scalar)
     """
-    return pq_distance(x, y, 1)
+    _check_dimensions(x, y)
+    return sum(abs(a - b) for a, b in zip(x, y))
+
+
+def chebyshev_distance(x, y: Vector) -> float:
+    """
+    Returns the chebyshev distance between to points, the largest difference in any dimension.
+    :param x: a point
+    :param y: another point
+    :return: The distance (positive scalar)
+    """
+    _check_dimensions(x, y)
+    return max(abs(a - b) for a, b in zip(x, y))
+
+
+def cosine_distance(x, y: Vector) -> float:
+    """
+    Returns one minus the cosine of the angle between two vectors. Vectors of length zero have a distance of one
+    to everything. Not a metric, it violates the triangle inequality.
+    :param x: a vector
+    :param y: another vector
+    :return: The distance (scalar between zero and two)
+    """
+    _check_dimensions(x, y)
+    norms = math.sqrt(sum(a * a for a in x)) * math.sqrt(sum(b * b for b in y))
+    if norms == 0.0:
+        return 1.0
+    return 1.0 - sum(a * b for a, b in zip(x, y)) / norms
+
+
+def _check_dimensions(x, y: Vector):
+    """
+    Raises a ValueError for vectors of different dimensions, like math.dist does for the euclidean distance.
+    """
+    if len(x) != len(y):
+        raise ValueError("Expected vectors of the same dimension, got {} and {}".format(len(x), len(y)))
 
 
-def simple_centroid(points: Collection[Vector]) -> Vector:
+def simple_centroid(points: Collection[Vector], weights: Collection[float] = None) -> Vector:
     """
     Calculates and returns a center of points based on the linear average value of scalars
     for each given point per dimension.
 
     :param points: a set of vectors for which a centroid is searched
-    :return: the centroid of the points
+    :param weights: Weight of every point, in the order of the points, e.g. the number of times it occurs.
+                        Defaults to a weight of one per point.
+    :return: the centroid of the points, the weighted average if weights are given
     """
-    num_points = len(points)
+    if weights is None:
+        num_points = len(points)
+        weights = (1,) * num_points
+    else:
+        num_points = sum(weights)
     num_dimensions = len(next(iter(points)))
     sums = []
     for _ in range(0, num_dimensions):
         sums.append(0)
-    for point in points:
+    for point, weight in zip(points, weights):
         for i in range(0, len(point)):
-            sums[i] += point[i]
+            sums[i] += weight * point[i]
     for i in range(0, num_dimensions):
         sums[i] = float(sums[i]) / float(num_points)
     return tuple(sums.copy())
+
+
+def as_matrix(vectors: Collection[Vector], dtype=None) -> Matrix:
+    """
+    Converts a collection of vectors into a contiguous (n, d) float matrix.
+
+    Arrays that already have that layout and type are returned as they are, without copying.
+
+    :param vectors: a collection of vectors of the same dimension, or a (n, d) array
+    :param dtype: Float type of the matrix, one of FLOAT_DTYPES. Defaults to float32 for float32 arrays,
+                        so data stored in half the memory stays that way, and to float64 for anything else.
+    :return: (n, d) float matrix, one row per vector
+    """
+    if dtype is None:
+        dtype = vectors.dtype if isinstance(vectors, numpy.ndarray) and vectors.dtype == numpy.float32 \
+            else numpy.float64
+    elif numpy.dtype(dtype) not in FLOAT_DTYPES:
+        raise ValueError("Expected one of the float types {}, got {}".format(FLOAT_DTYPES, numpy.dtype(dtype)))
+    if not isinstance(vectors, numpy.ndarray):
+        vectors = list(vectors)
+    matrix = numpy.ascontiguousarray(vectors, dtype=dtype)
+    if matrix.ndim == 1 and matrix.size == 0:
+        matrix = matrix.reshape((0, 0))
+    if matrix.ndim != 2:
+        raise ValueError("Expected a collection of vectors, got an array of shape {}".format(matrix.shape))
+    return matrix
+
+
+def cluster_sums(points: Matrix, labels: numpy.ndarray, num_clusters: int,
+                 weights: numpy.ndarray = None) -> Tuple[Matrix, numpy.ndarray]:
+    """
+    Sums up the points of every cluster given by a label per point.
+
+    :param points: (n, d) matrix of points
+    :param labels: Integer array of length n, the cluster index of every point
+    :param num_clusters: The number of clusters k
+    :param weights: Float array of length n, the weight of every point. Defaults to a weight of one per point.
+    :return: (k, d) float64 matrix of the coordinate sums and integer array of the number of points per cluster.
+                        With weights, the weighted sums and a float array of the total weight per cluster.
+    """
+    counts = numpy.bincount(labels, weights=weights, minlength=num_clusters)
+    sums = numpy.empty((num_clusters, points.shape[1]))
+    for dimension in range(points.shape[1]):
+        column = points[:, dimension] if weights is None else points[:, dimension] * weights
+        sums[:, dimension] = numpy.bincount(labels, weights=column, minlength=num_clusters)
+    return sums, counts
+
+
+def deduplicate(points: Matrix, weights: numpy.ndarray = None) -> Tuple[Matrix, numpy.ndarray]:
+    """
+    Collapses identical points into one point and the number of times it occurs. Clustering the unique points
+    weighted by their counts gives the same centroids as clustering all points, in time proportional to the
+    number of unique points.
+
+    :param points: (n, d) matrix of points, one point per row
+    :param weights: Float array of length n, the weight of every point. The weights of identical points are added up.
+    :return: (m, d) matrix of the unique points in lexicographic order and integer array of their counts,
+                        or float array of their summed weights if weights are given
+    """
+    points = as_matrix(points)
+    if points.shape[0] == 0:
+        return points, numpy.zeros(0, dtype=numpy.int64 if weights is None else float)
+    unique, inverse, counts = numpy.unique(points, axis=0, return_inverse=True, return_counts=True)
+    if weights is not None:
+        counts = numpy.bincount(inverse.reshape(-1), weights=weights, minlength=unique.shape[0])
+    return unique, counts
+
+
+def chunk_bounds(num_points: int, num_centroids: int, chunk_size: int = None):
+    """
+    Splits the range of n points into consecutive chunks.
+
+    :param num_points: The number of points n
+    :param num_centroids: The number of centroids k the points are compared with
+    :param chunk_size: Number of points per chunk. Defaults to a size that keeps the distance matrix
+                        of a chunk below DEFAULT_CHUNK_ELEMENTS entries.
+    :return: Generator of (start, stop) index pairs
+    """
+    if chunk_size is None:
+        chunk_size = max(1, DEFAULT_CHUNK_ELEMENTS // max(1, num_centroids))
+    for start in range(0, num_points, chunk_size):
+        yield start, min(start + chunk_size, num_points)